@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import LoginToken, RegistrationToken
+from .models import LoginToken, RegistrationToken, Notification
 
 @admin.register(LoginToken)
 class LoginTokenAdmin(admin.ModelAdmin):
@@ -8,6 +8,13 @@ class LoginTokenAdmin(admin.ModelAdmin):
     search_fields = ('player__username', 'player__first_name', 'player__telegram_id')
     readonly_fields = ('token', 'created_at')
 
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'chat_id', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('chat_id', 'text')
+    readonly_fields = ('created_at', 'sent_at')
+
 @admin.register(RegistrationToken)
 class RegistrationTokenAdmin(admin.ModelAdmin):
     list_display = ('telegram_username', 'telegram_id', 'created_at', 'is_used')
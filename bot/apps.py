@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class BotConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "bot"
+
+    def ready(self):
+        from django.db.models.signals import post_save
+        from core.models import GameEvent
+        from .notifications import enqueue_for_event
+
+        post_save.connect(enqueue_for_event, sender=GameEvent, dispatch_uid='bot_notifications')
@@ -0,0 +1,98 @@
+import asyncio
+import functools
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from telegram.ext import BaseUpdateProcessor
+
+
+def pool_size():
+    """BOT_DB_THREADS, or a size that suits the database when it is 0"""
+    if settings.BOT_DB_THREADS:
+        return settings.BOT_DB_THREADS
+    if connections['default'].vendor == 'sqlite':
+        return 4
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+# ORM calls from the bot run here instead of asgiref's single shared
+# thread, so several handlers can wait on the database at once. Each
+# thread keeps its own DB connection.
+db_executor = ThreadPoolExecutor(max_workers=pool_size(), thread_name_prefix='bot-db')
+
+
+def _job(func):
+    """
+    Runs func the way Django runs a request: connections that broke or
+    outlived CONN_MAX_AGE are dropped before and after, so a pool thread
+    never holds on to a dead or stale one.
+    """
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return run
+
+
+def db(func):
+    """sync_to_async on the bot's DB pool: `await db(Model.objects.get)(id=1)`"""
+    return sync_to_async(_job(func), thread_sensitive=False, executor=db_executor)
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Handles up to `max_concurrent_updates` updates at once, but never two
+    from the same user: duplicate taps queue up behind each other in
+    arrival order instead of racing.
+
+    The base class takes its concurrency slot before do_process_update, so
+    a user's queued taps would each hold one while waiting for the user's
+    lock, and a burst from one user would stall everyone else. Its
+    semaphore is left unbounded; an update takes one of `slots` only once
+    it is at the front of its user's queue.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        if max_concurrent_updates < 1:
+            raise ValueError('max_concurrent_updates must be a positive integer')
+        super().__init__(sys.maxsize)
+        self.slots = asyncio.Semaphore(max_concurrent_updates)
+        self.locks = {}
+        self.waiting = {}
+
+    async def run(self, coroutine):
+        async with self.slots:
+            await coroutine
+
+    async def do_process_update(self, update, coroutine):
+        user = getattr(update, 'effective_user', None)
+        if user is None:
+            await self.run(coroutine)
+            return
+
+        lock = self.locks.setdefault(user.id, asyncio.Lock())
+        self.waiting[user.id] = self.waiting.get(user.id, 0) + 1
+        try:
+            async with lock:
+                await self.run(coroutine)
+        finally:
+            self.waiting[user.id] -= 1
+            if not self.waiting[user.id]:
+                del self.waiting[user.id]
+                del self.locks[user.id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+
+def update_processor():
+    return PerUserUpdateProcessor(settings.BOT_CONCURRENT_UPDATES)
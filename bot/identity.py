@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from core.models import Player
+from .concurrency import db
+
+
+class PlayerIdentity(NamedTuple):
+    id: int
+    name: str
+
+    def __str__(self):
+        return self.name
+
+
+def _load_identity(telegram_id):
+    """(PlayerIdentity or None, whether a miss may be cached)"""
+    player = Player.objects.filter(telegram_id=telegram_id).only(
+        'id', 'username', 'first_name'
+    ).first()
+    if player:
+        return PlayerIdentity(player.id, str(player)), True
+    # Mid-registration: bot_register may create the player in another
+    # process, whose invalidate() doesn't reach this cache
+    from .models import RegistrationToken
+    return None, not RegistrationToken.objects.active().filter(telegram_id=telegram_id).exists()
+
+
+class IdentityCache:
+    """
+    LRU cache of telegram_id -> PlayerIdentity for the bot handlers.
+
+    Misses for "not registered" are cached for a shorter time, and not at
+    all while the user holds a registration link: bot_register creates the
+    player in the web process. Concurrent misses for the same user share
+    one DB lookup.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300, negative_ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    async def get(self, telegram_id):
+        """Returns the PlayerIdentity, or raises Player.DoesNotExist"""
+        with self.lock:
+            entry = self.entries.get(telegram_id)
+            fresh = entry is not None and entry[1] > time.monotonic()
+            if fresh:
+                self.entries.move_to_end(telegram_id)
+
+        identity = entry[0] if fresh else await self._lookup(telegram_id)
+
+        if identity is None:
+            raise Player.DoesNotExist
+        return identity
+
+    async def _lookup(self, telegram_id):
+        loop = asyncio.get_running_loop()
+        future = self.pending.get(telegram_id)
+        if future is not None and future.get_loop() is loop:
+            return await future
+
+        future = loop.create_future()
+        self.pending[telegram_id] = future
+        try:
+            identity, cacheable = await db(_load_identity)(telegram_id)
+            if cacheable:
+                self.set(telegram_id, identity)
+            future.set_result(identity)
+            return identity
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise; mark retrieved so an unawaited future doesn't warn
+            future.exception()
+            raise
+        finally:
+            if self.pending.get(telegram_id) is future:
+                del self.pending[telegram_id]
+
+    def set(self, telegram_id, identity):
+        ttl = self.ttl if identity else self.negative_ttl
+        with self.lock:
+            self.entries[telegram_id] = (identity, time.monotonic() + ttl)
+            self.entries.move_to_end(telegram_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, telegram_id):
+        with self.lock:
+            self.entries.pop(telegram_id, None)
+
+
+identity_cache = IdentityCache()
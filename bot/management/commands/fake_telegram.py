@@ -0,0 +1,185 @@
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Player, Tournament
+
+
+class FakeBotAPI:
+    """
+    Minimal stand-in for api.telegram.org: answers every Bot API method the
+    handlers use with a plausible result and counts the calls.
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.message_id = 0
+        self.connections = set()
+
+    def result(self, method):
+        now = int(time.time())
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot'}
+        if method in ('sendMessage', 'editMessageReplyMarkup', 'editMessageText'):
+            self.message_id += 1
+            return {'message_id': self.message_id, 'date': now, 'chat': {'id': 1, 'type': 'private'}, 'text': ''}
+        return True
+
+    async def handle(self, reader, writer):
+        self.connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode().partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                await reader.readexactly(int(headers.get('content-length', 0)))
+
+                method = request_line.split()[1].decode().rstrip('/').rsplit('/', 1)[-1]
+                self.calls[method] += 1
+                body = json.dumps({'ok': True, 'result': self.result(method)}).encode()
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    + f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+                )
+                await writer.drain()
+        except (ConnectionResetError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    def close_connections(self):
+        for writer in list(self.connections):
+            writer.close()
+
+
+def message_update(update_id, user_id, text):
+    update = {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'Load {user_id}'},
+            'text': text,
+        },
+    }
+    if text.startswith('/'):
+        update['message']['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+    return update
+
+
+def callback_update(update_id, user_id, data):
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'chat_instance': str(user_id),
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'Load {user_id}'},
+            'data': data,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'text': 'tournaments',
+            },
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = 'Offline load test of the webhook: runs a fake Telegram Bot API and posts synthetic updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=f'{settings.SITE_URL}/bot/webhook/', help='Webhook URL under test')
+        parser.add_argument('--port', type=int, default=8081, help='Port for the fake Bot API')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--rounds', type=int, default=3, help='Update bursts per user')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--tournament', type=int, help='Tournament to register users for via callbacks')
+        parser.add_argument('--create-players', action='store_true', help='Create Player rows for the fake users')
+        parser.add_argument('--serve-only', action='store_true', help='Only run the fake Bot API')
+
+    def handle(self, *args, **options):
+        if not settings.TELEGRAM_WEBHOOK_SECRET and not options['serve_only']:
+            raise CommandError('TELEGRAM_WEBHOOK_SECRET must be set (and match the web server)')
+
+        user_ids = [900000000 + i for i in range(options['users'])]
+        if options['create_players']:
+            existing = set(Player.objects.filter(
+                telegram_id__in=[str(u) for u in user_ids]
+            ).values_list('telegram_id', flat=True))
+            Player.objects.bulk_create([
+                Player(telegram_id=str(u), first_name=f'Load {u}') for u in user_ids if str(u) not in existing
+            ])
+        if options['tournament'] and not Tournament.objects.filter(id=options['tournament']).exists():
+            raise CommandError('Tournament not found')
+
+        asyncio.run(self.run(user_ids, options))
+
+    async def run(self, user_ids, options):
+        api = FakeBotAPI()
+        server = await asyncio.start_server(api.handle, '127.0.0.1', options['port'])
+        self.stdout.write(
+            f"Fake Bot API on http://127.0.0.1:{options['port']} - start the web server with "
+            f"TELEGRAM_API_BASE_URL=http://127.0.0.1:{options['port']}/bot"
+        )
+
+        if options['serve_only']:
+            async with server:
+                await server.serve_forever()
+            return
+
+        updates = []
+        update_id = 0
+        for _ in range(options['rounds']):
+            for user_id in user_ids:
+                update_id += 1
+                updates.append(message_update(update_id, user_id, '/tournaments'))
+                if options['tournament']:
+                    update_id += 1
+                    updates.append(callback_update(update_id, user_id, f"register_{options['tournament']}"))
+
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        latencies = []
+        statuses = Counter()
+        headers = {'X-Telegram-Bot-Api-Secret-Token': settings.TELEGRAM_WEBHOOK_SECRET}
+
+        async with httpx.AsyncClient(timeout=60) as client:
+            async def post(update):
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post(options['url'], json=update, headers=headers)
+                        statuses[response.status_code] += 1
+                    except httpx.HTTPError as e:
+                        statuses[type(e).__name__] += 1
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(post(update) for update in updates))
+            elapsed = time.perf_counter() - started
+
+        server.close()
+        api.close_connections()
+        await server.wait_closed()
+
+        latencies.sort()
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(updates)} updates in {elapsed:.2f}s ({len(updates) / elapsed:.1f}/s)'
+        ))
+        self.stdout.write(f'  latency ms: p50={quantiles[49]:.1f} p95={quantiles[94]:.1f} p99={quantiles[98]:.1f}')
+        self.stdout.write(f'  webhook responses: {dict(statuses)}')
+        self.stdout.write(f'  Bot API calls: {dict(api.calls)}')
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from bot.models import LoginToken, RegistrationToken
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired login and registration tokens in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        for model in (LoginToken, RegistrationToken):
+            deleted = 0
+            # One pass per is_used value so each batch is an (is_used, created_at) index range
+            for is_used in (True, False):
+                while True:
+                    ids = list(
+                        model.objects.expired().filter(is_used=is_used)
+                        .order_by('created_at').values_list('id', flat=True)[:options['batch_size']]
+                    )
+                    if not ids:
+                        break
+                    # Short autocommit deletes keep write locks brief
+                    deleted += model.objects.filter(id__in=ids).delete()[0]
+                    time.sleep(options['pause'])
+
+            self.stdout.write(self.style.SUCCESS(f'{model.__name__}: deleted {deleted} expired token(s)'))
@@ -1,46 +1,110 @@
 import os
+import asyncio
 import django
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, ContextTypes, filters
-from core.models import Player, Tournament, Registration
+from core.models import Player, Tournament, Registration, WaitlistEntry
+from core.registration import register, leave_waitlist, waitlist_position, RegistrationClosed
+from core.player_stats import career_stats
 from bot.models import LoginToken, RegistrationToken
-from asgiref.sync import sync_to_async
+from bot.notifications import NotificationDispatcher
+from bot.throttling import token_limiter
+from bot.identity import identity_cache
+from bot.concurrency import db, update_processor
 from django.utils import timezone
 
 class Command(BaseCommand):
     help = 'Runs the Telegram bot'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--webhook', action='store_true',
+            help='Register SITE_URL/bot/webhook/ with Telegram instead of polling; '
+                 'updates are then handled by the web app and this process only delivers notifications'
+        )
+
     def handle(self, *args, **options):
         token = settings.TELEGRAM_BOT_TOKEN
         if not token or token == 'YOUR_BOT_TOKEN_HERE':
             self.stdout.write(self.style.ERROR('TELEGRAM_BOT_TOKEN is not set in settings.py'))
             return
 
-        application = Application.builder().token(token).build()
+        if options['webhook']:
+            if not settings.TELEGRAM_WEBHOOK_SECRET:
+                self.stdout.write(self.style.ERROR('TELEGRAM_WEBHOOK_SECRET is not set'))
+                return
+            asyncio.run(self.run_webhook_mode(token))
+            return
+
+        application = self.build_application(token)
+
+        self.stdout.write(self.style.SUCCESS('Starting bot polling...'))
+        application.run_polling()
+
+    def build_application(self, token, webhook=False):
+        builder = (
+            Application.builder().token(token).base_url(settings.TELEGRAM_API_BASE_URL)
+            .concurrent_updates(update_processor())
+        )
+        if webhook:
+            # Updates are pushed to the web app, no long-polling updater
+            builder = builder.updater(None)
+        else:
+            builder = builder.post_init(self.post_init).post_shutdown(self.post_shutdown)
+        application = builder.build()
 
         # Commands
         application.add_handler(CommandHandler("start", self.start))
         application.add_handler(CommandHandler("login", self.login))
         application.add_handler(CommandHandler("register", self.register))
         application.add_handler(CommandHandler("tournaments", self.tournaments))
+        application.add_handler(CommandHandler("stats", self.stats))
 
         # Message handlers for keyboard buttons
         application.add_handler(MessageHandler(filters.Regex('^🎰 Турниры$'), self.tournaments))
+        application.add_handler(MessageHandler(filters.Regex('^📊 Моя статистика$'), self.stats))
         application.add_handler(MessageHandler(filters.Regex('^🔐 Логин$'), self.login))
         application.add_handler(MessageHandler(filters.Regex('^📝 Регистрация$'), self.register))
 
         # Callbacks
         application.add_handler(CallbackQueryHandler(self.button_handler))
 
-        self.stdout.write(self.style.SUCCESS('Starting bot polling...'))
-        application.run_polling()
+        return application
+
+    async def run_webhook_mode(self, token):
+        application = self.build_application(token, webhook=True)
+        async with application:
+            url = f"{settings.SITE_URL}/bot/webhook/"
+            await application.bot.set_webhook(
+                url, secret_token=settings.TELEGRAM_WEBHOOK_SECRET, allowed_updates=Update.ALL_TYPES
+            )
+            self.stdout.write(self.style.SUCCESS(f'Webhook set to {url}'))
+
+            if settings.TELEGRAM_NOTIFICATIONS_ENABLED:
+                self.stdout.write('Delivering notifications...')
+                await NotificationDispatcher(application.bot).run()
+
+    async def post_init(self, application):
+        self.dispatcher_task = None
+        if settings.TELEGRAM_NOTIFICATIONS_ENABLED:
+            # Deliver queued tournament notifications alongside polling
+            self.dispatcher_task = asyncio.create_task(NotificationDispatcher(application.bot).run())
+
+    async def post_shutdown(self, application):
+        if self.dispatcher_task:
+            self.dispatcher_task.cancel()
+
+    async def reply_throttled(self, update):
+        await update.message.reply_text(
+            "⏳ Слишком много запросов. Подождите немного и попробуйте снова."
+        )
 
     def get_main_keyboard(self):
         """Returns the main menu keyboard"""
         keyboard = [
-            [KeyboardButton("🎰 Турниры")],
+            [KeyboardButton("🎰 Турниры"), KeyboardButton("📊 Моя статистика")],
             [KeyboardButton("🔐 Логин"), KeyboardButton("📝 Регистрация")]
         ]
         return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
@@ -53,7 +117,7 @@ class Command(BaseCommand):
 
         # Check if player exists
         try:
-            player = await sync_to_async(Player.objects.get)(telegram_id=telegram_id)
+            player = await identity_cache.get(telegram_id)
             await update.message.reply_text(
                 f"С возвращением, {user.first_name}! 👋\n\n"
                 f"Используйте меню ниже для навигации:",
@@ -73,11 +137,15 @@ class Command(BaseCommand):
         user = update.effective_user
         telegram_id = str(user.id)
 
+        if not await token_limiter.aallow(telegram_id):
+            await self.reply_throttled(update)
+            return
+
         try:
-            player = await sync_to_async(Player.objects.get)(telegram_id=telegram_id)
+            player = await identity_cache.get(telegram_id)
 
-            # Create login token
-            token = await sync_to_async(LoginToken.objects.create)(player=player)
+            # Reuse a still-valid login token instead of creating one per tap
+            token = await db(LoginToken.objects.issue)(player_id=player.id)
 
             # Generate link using configured site URL
             link = f"{settings.SITE_URL}/bot/login/{token.token}/"
@@ -101,9 +169,13 @@ class Command(BaseCommand):
         user = update.effective_user
         telegram_id = str(user.id)
 
+        if not await token_limiter.aallow(telegram_id):
+            await self.reply_throttled(update)
+            return
+
         # Check if user already registered
         try:
-            player = await sync_to_async(Player.objects.get)(telegram_id=telegram_id)
+            player = await identity_cache.get(telegram_id)
             await update.message.reply_text(
                 f"ℹ️ Вы уже зарегистрированы как {player}!\n\n"
                 f"Для входа на сайт используйте команду /login"
@@ -112,14 +184,19 @@ class Command(BaseCommand):
         except Player.DoesNotExist:
             pass
 
-        # Create registration token
-        token = await sync_to_async(RegistrationToken.objects.create)(
+        # Reuse a still-valid registration token instead of creating one per tap
+        token = await db(RegistrationToken.objects.issue)(
             telegram_id=telegram_id,
-            telegram_username=user.username,
-            telegram_first_name=user.first_name,
-            telegram_last_name=user.last_name
+            defaults={
+                'telegram_username': user.username,
+                'telegram_first_name': user.first_name,
+                'telegram_last_name': user.last_name,
+            }
         )
 
+        # Looked up as unregistered above; don't let that answer outlive the link
+        identity_cache.invalidate(telegram_id)
+
         # Generate link using configured site URL
         link = f"{settings.SITE_URL}/bot/register/{token.token}/"
 
@@ -135,15 +212,70 @@ class Command(BaseCommand):
             parse_mode='Markdown'
         )
 
+    async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        telegram_id = str(update.effective_user.id)
+
+        try:
+            player = await identity_cache.get(telegram_id)
+        except Player.DoesNotExist:
+            await update.message.reply_text(
+                "❌ Вы не зарегистрированы. Пожалуйста, используйте /start сначала."
+            )
+            return
+
+        # One row from the stats rollup, however long the player's history
+        stats = await db(career_stats)(player.id)
+
+        if not stats.games:
+            await update.message.reply_text(
+                "📊 У вас пока нет завершённых турниров.\n\n"
+                "Статистика появится после первого турнира."
+            )
+            return
+
+        sign = "+" if stats.profit_loss >= 0 else "-"
+        await update.message.reply_text(
+            f"📊 *Статистика {player}:*\n\n"
+            f"🎰 Турниров: {stats.games}\n"
+            f"🏆 Побед: {stats.wins}\n"
+            f"⭐ Очков: {stats.points}\n"
+            f"📈 Среднее место: {stats.avg_place}\n\n"
+            f"💸 Потрачено: ${stats.spent}\n"
+            f"💰 Выиграно: ${stats.winnings}\n"
+            f"📊 Итог: {sign}${abs(stats.profit_loss)}",
+            parse_mode='Markdown'
+        )
+
+    def load_tournaments(self, player_id):
+        """Upcoming tournaments plus the ids this player is registered for, in one thread hop"""
+        tournaments = list(
+            Tournament.objects.filter(status__in=['SCHEDULED', 'RUNNING']).order_by('date')[:5]
+        )
+        registered_ids = set()
+        if player_id and tournaments:
+            registered_ids = set(Registration.objects.filter(
+                player_id=player_id,
+                tournament_id__in=[t.id for t in tournaments]
+            ).values_list('tournament_id', flat=True))
+        return tournaments, registered_ids
+
+    def tournament_button(self, tournament, is_registered):
+        if is_registered:
+            tournament_link = f"{settings.SITE_URL}/tournament/{tournament.id}/info/"
+            return InlineKeyboardButton(f"📊 {tournament.name}", url=tournament_link)
+        return InlineKeyboardButton(f"✅ {tournament.name}", callback_data=f"register_{tournament.id}")
+
     async def tournaments(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Fetch upcoming tournaments
         user = update.effective_user
         telegram_id = str(user.id)
 
-        now = timezone.now()
-        tournaments = await sync_to_async(list)(
-            Tournament.objects.filter(status__in=['SCHEDULED', 'RUNNING']).order_by('date')[:5]
-        )
+        try:
+            player_id = (await identity_cache.get(telegram_id)).id
+        except Player.DoesNotExist:
+            player_id = None
+
+        tournaments, registered_ids = await db(self.load_tournaments)(player_id)
 
         if not tournaments:
             await update.message.reply_text(
@@ -152,30 +284,11 @@ class Command(BaseCommand):
             )
             return
 
-        await update.message.reply_text("🎰 *Доступные турниры:*\n", parse_mode='Markdown')
-
-        try:
-            player = await sync_to_async(Player.objects.get)(telegram_id=telegram_id)
-        except Player.DoesNotExist:
-            player = None
-
+        # One message for the whole list, one keyboard row per tournament
+        lines = ["🎰 *Доступные турниры:*"]
+        keyboard = []
         for tournament in tournaments:
-            # Check if player is registered for this tournament
-            is_registered = False
-            if player:
-                is_registered = await sync_to_async(
-                    Registration.objects.filter(player=player, tournament=tournament).exists
-                )()
-
-            # Build keyboard based on registration status
-            keyboard = []
-            if is_registered:
-                tournament_link = f"{settings.SITE_URL}/tournament/{tournament.id}/info/"
-                keyboard.append([InlineKeyboardButton("📊 Открыть турнир", url=tournament_link)])
-            else:
-                keyboard.append([InlineKeyboardButton("✅ Зарегистрироваться", callback_data=f"register_{tournament.id}")])
-
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            is_registered = tournament.id in registered_ids
 
             status_emoji = "🟢" if tournament.status == 'RUNNING' else "📅"
             status_text = "Идёт" if tournament.status == 'RUNNING' else "Запланирован"
@@ -184,16 +297,35 @@ class Command(BaseCommand):
 
             registration_status = "\n✅ *Вы зарегистрированы*" if is_registered else ""
 
-            await update.message.reply_text(
-                f"{status_emoji} *{tournament.name}*\n\n"
+            lines.append(
+                f"{status_emoji} *{tournament.name}*\n"
                 f"📅 Дата: {tournament.date.strftime('%d.%m.%Y %H:%M')}\n"
                 f"📊 Статус: {status_text}\n"
                 f"💵 Тип: {tournament_type}\n"
                 f"💸 Бай-ин: ${tournament.buy_in if tournament.buy_in else 'Бесплатно'}"
-                f"{registration_status}",
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
+                f"{registration_status}"
             )
+            keyboard.append([self.tournament_button(tournament, is_registered)])
+
+        await update.message.reply_text(
+            "\n\n".join(lines),
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+
+    def registered_keyboard(self, reply_markup, tournament):
+        """Swap the register button of this tournament for its info link, keeping the other rows"""
+        rows = reply_markup.inline_keyboard if reply_markup else []
+        keyboard = [
+            [
+                self.tournament_button(tournament, True) if button.callback_data == f"register_{tournament.id}" else button
+                for button in row
+            ]
+            for row in rows
+        ]
+        if not keyboard:
+            keyboard = [[self.tournament_button(tournament, True)]]
+        return InlineKeyboardMarkup(keyboard)
 
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
@@ -207,16 +339,23 @@ class Command(BaseCommand):
             tournament_id = int(data.split("_")[1])
 
             try:
-                player = await sync_to_async(Player.objects.get)(telegram_id=telegram_id)
-                tournament = await sync_to_async(Tournament.objects.get)(id=tournament_id)
+                player = await identity_cache.get(telegram_id)
+                registration, created = await db(register)(tournament_id, player, waitlist=True)
+                tournament = registration.tournament
 
-                # Check if already registered
-                exists = await sync_to_async(Registration.objects.filter(player=player, tournament=tournament).exists)()
-
-                if exists:
-                    tournament_link = f"{settings.SITE_URL}/tournament/{tournament.id}/info/"
-                    keyboard = [[InlineKeyboardButton("📊 Открыть турнир", url=tournament_link)]]
-                    reply_markup = InlineKeyboardMarkup(keyboard)
+                if isinstance(registration, WaitlistEntry):
+                    position = await db(waitlist_position)(registration)
+                    await query.message.reply_text(
+                        f"⏳ Все места на турнир *{tournament.name}* заняты.\n\n"
+                        f"Вы в листе ожидания под номером {position}. "
+                        f"Как только место освободится, мы зарегистрируем вас и пришлём уведомление.",
+                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(
+                            "🚪 Покинуть лист ожидания", callback_data=f"leave_waitlist_{tournament.id}"
+                        )]]),
+                        parse_mode='Markdown'
+                    )
+                elif not created:
+                    reply_markup = self.registered_keyboard(query.message.reply_markup, tournament)
 
                     await query.edit_message_reply_markup(reply_markup=reply_markup)
                     await query.message.reply_text(
@@ -224,15 +363,7 @@ class Command(BaseCommand):
                         parse_mode='Markdown'
                     )
                 else:
-                    await sync_to_async(Registration.objects.create)(
-                        player=player,
-                        tournament=tournament,
-                        status='REGISTERED'
-                    )
-
-                    tournament_link = f"{settings.SITE_URL}/tournament/{tournament.id}/info/"
-                    keyboard = [[InlineKeyboardButton("📊 Открыть турнир", url=tournament_link)]]
-                    reply_markup = InlineKeyboardMarkup(keyboard)
+                    reply_markup = self.registered_keyboard(query.message.reply_markup, tournament)
 
                     await query.edit_message_reply_markup(reply_markup=reply_markup)
                     await query.message.reply_text(
@@ -247,3 +378,27 @@ class Command(BaseCommand):
                 )
             except Tournament.DoesNotExist:
                 await query.message.reply_text("❌ Турнир не найден.")
+            except RegistrationClosed:
+                await query.message.reply_text("🔒 Регистрация на этот турнир закрыта.")
+
+        elif data.startswith("leave_waitlist_"):
+            tournament_id = int(data.split("_")[2])
+
+            try:
+                player = await identity_cache.get(telegram_id)
+                left = await db(leave_waitlist)(tournament_id, player.id)
+            except Player.DoesNotExist:
+                await query.message.reply_text(
+                    "❌ Вы не зарегистрированы. Пожалуйста, используйте /start сначала."
+                )
+                return
+            except Tournament.DoesNotExist:
+                await query.message.reply_text("❌ Турнир не найден.")
+                return
+
+            await query.edit_message_reply_markup(reply_markup=None)
+            if left:
+                await query.message.reply_text("👋 Вы покинули лист ожидания.")
+            else:
+                # Already promoted, or left earlier
+                await query.message.reply_text("ℹ️ Вас нет в листе ожидания этого турнира.")
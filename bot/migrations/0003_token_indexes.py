@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0002_registrationtoken_notification'),
+        ('core', '0004_tournamentsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logintoken',
+            index=models.Index(fields=['is_used', 'created_at'], name='bot_loginto_is_used_67fc22_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrationtoken',
+            index=models.Index(fields=['is_used', 'created_at'], name='bot_registr_is_used_4609d6_idx'),
+        ),
+    ]
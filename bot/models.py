@@ -1,13 +1,43 @@
+from datetime import timedelta
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from core.models import Player
 import uuid
 
+def token_cutoff():
+    """Tokens created before this moment are expired"""
+    return timezone.now() - timedelta(minutes=settings.BOT_TOKEN_TTL_MINUTES)
+
+class TokenQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(is_used=False, created_at__gte=token_cutoff())
+
+    def expired(self):
+        return self.filter(created_at__lt=token_cutoff())
+
+    def issue(self, defaults=None, **lookup):
+        """Newest still-valid token matching lookup, or a new one if there is none"""
+        token = self.active().filter(**lookup).order_by('-created_at').first()
+        if token is None:
+            token = self.create(**lookup, **(defaults or {}))
+        return token
+
 class LoginToken(models.Model):
     token = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='login_tokens')
     created_at = models.DateTimeField(auto_now_add=True)
     is_used = models.BooleanField(default=False)
 
+    objects = TokenQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['is_used', 'created_at'])]
+
+    @property
+    def is_expired(self):
+        return self.created_at < token_cutoff()
+
     def __str__(self):
         return f"Login token for {self.player} ({'Used' if self.is_used else 'Active'})"
 
@@ -20,5 +50,38 @@ class RegistrationToken(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_used = models.BooleanField(default=False)
 
+    objects = TokenQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['is_used', 'created_at'])]
+
+    @property
+    def is_expired(self):
+        return self.created_at < token_cutoff()
+
     def __str__(self):
         return f"Registration token for TG user {self.telegram_username or self.telegram_id} ({'Used' if self.is_used else 'Active'})"
+
+class Notification(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),  # claimed by a dispatcher
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    chat_id = models.TextField()
+    kind = models.TextField()  # GameEvent type that produced it
+    text = models.TextField()
+    status = models.TextField(choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.kind} to {self.chat_id} ({self.status})"
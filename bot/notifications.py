@@ -0,0 +1,245 @@
+import asyncio
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from telegram.error import RetryAfter, Forbidden, BadRequest
+from telegram.helpers import escape_markdown
+from core.models import Registration, TournamentLevel
+from .models import Notification
+from .concurrency import db
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_RATE = 25            # messages per second across all chats (Telegram allows ~30)
+PER_CHAT_INTERVAL = 1.0     # seconds between messages to the same chat
+MAX_CONCURRENT_SENDS = 10
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 2            # seconds, doubled on every failed attempt
+BACKOFF_MAX = 300
+BATCH_SIZE = 300            # notifications claimed per dispatch round
+CLAIM_TIMEOUT = 300         # seconds before a batch claimed by a crashed dispatcher is due again
+POLL_INTERVAL = 1.0
+MESSAGE_LIMIT = 4000        # Telegram caps messages at 4096 characters
+
+
+def _is_telegram_chat(telegram_id):
+    # Players added from the control page get a uuid placeholder instead
+    return bool(telegram_id) and telegram_id.isdigit()
+
+
+def _active_chats(tournament_id):
+    return Registration.objects.filter(
+        tournament_id=tournament_id, status='REGISTERED'
+    ).values_list('player__telegram_id', flat=True)
+
+
+def _seat_messages(name, seats):
+    registrations = Registration.objects.filter(
+        id__in=[registration_id for registration_id, _, _ in seats]
+    ).select_related('player', 'table')
+
+    return [
+        (reg.player.telegram_id,
+         f"🪑 *{name}*\nВаше место: стол {reg.table.table_number}, место {reg.seat_number}")
+        for reg in registrations if reg.table
+    ]
+
+
+def build_notifications(event):
+    """Returns (chat_id, text) pairs for a journal event, or [] if nobody should be told"""
+    tournament = event.tournament
+    payload = event.payload
+    messages = []
+    # Sent as Markdown: a _ or * in the name would break the message
+    name = escape_markdown(tournament.name)
+
+    if event.type == 'level_changed':
+        if payload.get('is_break'):
+            text = f"☕ *{name}*\nПерерыв"
+        else:
+            level = TournamentLevel.objects.filter(
+                tournament_id=tournament.id, level_number=payload['level_number']
+            ).first()
+            blinds = f"{level.small_blind}/{level.big_blind}" if level else ''
+            if level and level.ante:
+                blinds += f" (анте {level.ante})"
+            text = f"⏫ *{name}*\nУровень {payload['level_number']}: блайнды {blinds}"
+        messages = [(chat_id, text) for chat_id in _active_chats(tournament.id)]
+
+    elif event.type == 'break_started':
+        text = f"☕ *{name}*\nПерерыв {payload.get('break_duration_minutes')} мин."
+        messages = [(chat_id, text) for chat_id in _active_chats(tournament.id)]
+
+    elif event.type in ('tables_generated', 'players_seated'):
+        messages = _seat_messages(name, payload['seats'])
+
+    elif event.type == 'player_moved' and payload.get('table_id'):
+        messages = _seat_messages(
+            name, [[payload['registration_id'], payload['table_id'], payload['seat_number']]]
+        )
+        messages = [(chat_id, text.replace('Ваше место', 'Вас пересадили')) for chat_id, text in messages]
+
+    elif event.type == 'player_eliminated':
+        reg = Registration.objects.select_related('player').filter(id=payload['registration_id']).first()
+        if reg:
+            text = f"🏁 *{name}*\nВы заняли {payload['place']} место"
+            if tournament.type == 'FREE':
+                text += f"\nОчки: {payload['points']}"
+            messages = [(reg.player.telegram_id, text)]
+
+    elif event.type == 'player_registered' and payload.get('from_waitlist'):
+        reg = Registration.objects.select_related('player').filter(id=payload['registration_id']).first()
+        if reg:
+            messages = [(reg.player.telegram_id,
+                         f"🎉 *{name}*\nОсвободилось место - вы зарегистрированы из листа ожидания!")]
+
+    elif event.type == 'payout_assigned':
+        reg = Registration.objects.select_related('player').filter(
+            tournament_id=tournament.id, player_id=payload['player_id']
+        ).first()
+        if reg:
+            messages = [(reg.player.telegram_id, f"💰 *{name}*\nВаш выигрыш: ${payload['amount']}")]
+
+    return [(chat_id, text) for chat_id, text in messages if _is_telegram_chat(chat_id)]
+
+
+def enqueue_for_event(sender, instance, created, **kwargs):
+    """post_save receiver for GameEvent; queues rows in the mutation's transaction"""
+    if not created or not settings.TELEGRAM_NOTIFICATIONS_ENABLED:
+        return
+
+    notifications = [
+        Notification(chat_id=chat_id, kind=instance.type, text=text)
+        for chat_id, text in build_notifications(instance)
+    ]
+    if notifications:
+        Notification.objects.bulk_create(notifications)
+
+
+class NotificationDispatcher:
+    """
+    Delivers queued notifications from the bot process.
+
+    Due rows are claimed (marked SENDING) before anything is sent, so several
+    dispatchers never send the same row. Pending rows for the same chat are
+    merged into as few messages as possible, sends run concurrently but are
+    paced globally and per chat, and failures are retried with exponential
+    backoff (or Telegram's retry_after). Only the rows of messages that didn't
+    go out are retried.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+        self.chat_ready_at = {}
+        self.next_slot = 0.0
+
+    async def run(self):
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except Exception:
+                logger.exception('Notification dispatch failed')
+                claimed = 0
+            if claimed < BATCH_SIZE:
+                await asyncio.sleep(POLL_INTERVAL)
+
+    async def dispatch_once(self):
+        due = await db(self._fetch_due)()
+        if not due:
+            return 0
+
+        by_chat = {}
+        for notification in due:
+            by_chat.setdefault(notification.chat_id, []).append(notification)
+
+        results = await asyncio.gather(*(
+            self._deliver(chat_id, notifications) for chat_id, notifications in by_chat.items()
+        ))
+        await db(self._record)(results)
+        return len(due)
+
+    def _fetch_due(self):
+        """
+        Claims a batch of due rows. Rows another dispatcher has locked are
+        skipped rather than waited for. A SENDING row is due again only once its
+        claim expires, i.e. when the dispatcher that claimed it died.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            due = list(Notification.objects.select_for_update(skip_locked=True).filter(
+                status__in=['PENDING', 'SENDING'], next_attempt_at__lte=now
+            ).order_by('id')[:BATCH_SIZE])
+            Notification.objects.filter(id__in=[n.id for n in due]).update(
+                status='SENDING', next_attempt_at=now + timedelta(seconds=CLAIM_TIMEOUT)
+            )
+        return due
+
+    def _record(self, results):
+        now = timezone.now()
+        sent_ids = [n.id for sent, _, _, _ in results for n in sent]
+        Notification.objects.filter(id__in=sent_ids).update(status='SENT', sent_at=now)
+
+        for _, failed, error, retry_in in results:
+            if not failed:
+                continue
+            ids = [n.id for n in failed]
+            if retry_in is None:
+                Notification.objects.filter(id__in=ids).update(
+                    status='FAILED', attempts=F('attempts') + 1, last_error=error
+                )
+                continue
+            Notification.objects.filter(id__in=ids).update(
+                status='PENDING', attempts=F('attempts') + 1, last_error=error,
+                next_attempt_at=now + timedelta(seconds=retry_in)
+            )
+            Notification.objects.filter(id__in=ids, attempts__gte=MAX_ATTEMPTS).update(status='FAILED')
+
+    async def _wait_for_slot(self, chat_id):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self.next_slot, self.chat_ready_at.get(chat_id, 0.0))
+        self.next_slot = max(self.next_slot, slot) + 1 / GLOBAL_RATE
+        self.chat_ready_at[chat_id] = slot + PER_CHAT_INTERVAL
+        await asyncio.sleep(slot - now)
+
+    def _chunks(self, notifications):
+        """[(message text, notifications it carries)], in order"""
+        chunks = []
+        for notification in notifications:
+            if chunks and len(chunks[-1][0]) + 2 + len(notification.text) <= MESSAGE_LIMIT:
+                text, carried = chunks[-1]
+                chunks[-1] = (f"{text}\n\n{notification.text}", carried + [notification])
+            else:
+                chunks.append((notification.text, [notification]))
+        return chunks
+
+    async def _deliver(self, chat_id, notifications):
+        """
+        Returns (sent, failed, error, retry_in seconds or None to give up).
+        A failure stops the chat's remaining messages; the ones already sent
+        stay sent.
+        """
+        sent = []
+        async with self.semaphore:
+            try:
+                for text, carried in self._chunks(notifications):
+                    await self._wait_for_slot(chat_id)
+                    await self.bot.send_message(chat_id=int(chat_id), text=text, parse_mode='Markdown')
+                    sent += carried
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                return sent, notifications[len(sent):], str(e), retry_after
+            except (Forbidden, BadRequest) as e:
+                # Blocked bot or unknown chat - retrying won't help
+                return sent, notifications[len(sent):], str(e), None
+            except Exception as e:
+                failed = notifications[len(sent):]
+                attempts = max(n.attempts for n in failed)
+                return sent, failed, str(e), min(BACKOFF_BASE * 2 ** attempts, BACKOFF_MAX)
+        return sent, [], None, None
@@ -1,3 +1,435 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from telegram.error import NetworkError
+from core.models import Player, Tournament, Registration, GameEvent
+from core.player_stats import career_stats
+from core.registration import register
+from core.tests import seed_card_room, TEST_STORAGES
+from .identity import IdentityCache, PlayerIdentity, _load_identity as load_identity
+from .management.commands.runbot import Command
+from .models import LoginToken, RegistrationToken, Notification
+from .notifications import NotificationDispatcher, build_notifications
 
-# Create your tests here.
+
+@override_settings(STORAGES=TEST_STORAGES)
+class BotQueryBudgetTests(TestCase):
+    """Query budgets for the bot's web views and its hot ORM paths"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = seed_card_room()
+        cls.player = cls.room['players'][0]
+        call_command('rebuild_player_stats', stdout=StringIO())
+
+    def test_login(self):
+        token = LoginToken.objects.create(player=self.player)
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse('bot_login', args=[token.token]))
+        self.assertRedirects(response, reverse('profile'), fetch_redirect_response=False)
+
+    def test_register_form(self):
+        token = RegistrationToken.objects.create(telegram_id='999', telegram_first_name='New')
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('bot_register', args=[token.token]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_register_submit(self):
+        token = RegistrationToken.objects.create(telegram_id='999', telegram_username='new')
+        with self.assertNumQueries(8):
+            response = self.client.post(reverse('bot_register', args=[token.token]), {
+                'first_name': 'New', 'last_name': 'Player',
+            })
+        self.assertRedirects(response, reverse('profile'), fetch_redirect_response=False)
+        self.assertTrue(Player.objects.filter(telegram_id='999').exists())
+
+    def test_upcoming_tournaments(self):
+        finished = Tournament.objects.filter(status='FINISHED').order_by('-date')[:3]
+        Tournament.objects.filter(id__in=list(finished.values_list('id', flat=True))).update(status='SCHEDULED')
+        with self.assertNumQueries(2):
+            tournaments, registered_ids = Command().load_tournaments(self.player.id)
+        self.assertEqual(len(tournaments), 4)
+        self.assertIn(self.room['live'].id, registered_ids)
+
+    def test_upcoming_tournaments_unregistered_user(self):
+        with self.assertNumQueries(1):
+            Command().load_tournaments(None)
+
+    def test_registration_button(self):
+        # Bot and API registration share this path; it must not grow with the field size
+        tournament = Tournament.objects.create(name='Sunday', date=self.room['live'].date, type='FREE')
+        newcomer = Player.objects.create(first_name='Late', telegram_id='555')
+        with self.assertNumQueries(15):
+            reg, created = register(tournament.id, newcomer)
+        self.assertTrue(created)
+        with self.assertNumQueries(5):
+            again, created = register(tournament.id, newcomer)
+        self.assertEqual((again.id, created), (reg.id, False))
+
+    def test_my_stats(self):
+        # One row from the rollup, however long the history
+        with self.assertNumQueries(1):
+            stats = career_stats(self.player.id)
+        self.assertEqual(stats.games, Registration.objects.filter(player=self.player, status='ELIMINATED').count())
+
+    def test_identity_cache_hit(self):
+        cache = IdentityCache()
+        cache.set(self.player.telegram_id, PlayerIdentity(self.player.id, str(self.player)))
+        with self.assertNumQueries(0):
+            identity = async_to_sync(cache.get)(self.player.telegram_id)
+        self.assertEqual(identity.id, self.player.id)
+
+
+class TournamentsHandlerTests(TestCase):
+    def test_one_message_for_the_list(self):
+        player = Player.objects.create(telegram_id='1', first_name='Ann')
+        now = timezone.now()
+        sunday = Tournament.objects.create(name='Sunday', date=now + timedelta(days=2), type='FREE')
+        monday = Tournament.objects.create(name='Monday', date=now + timedelta(days=3), type='PAID', buy_in=50)
+        Tournament.objects.create(name='Last week', date=now - timedelta(days=7), type='FREE', status='FINISHED')
+        Registration.objects.create(tournament=sunday, player=player, status='REGISTERED')
+
+        identities = IdentityCache()
+        identities.set('1', PlayerIdentity(player.id, str(player)))
+        update = mock.Mock()
+        update.effective_user.id = 1
+        update.message.reply_text = mock.AsyncMock()
+        # The handler's DB hop on this thread, where the test's transaction is
+        with mock.patch('bot.management.commands.runbot.identity_cache', identities), \
+                mock.patch('bot.management.commands.runbot.db', lambda func: sync_to_async(func)), \
+                self.assertNumQueries(2):
+            async_to_sync(Command().tournaments)(update, None)
+
+        update.message.reply_text.assert_awaited_once()
+        text = update.message.reply_text.call_args.args[0]
+        self.assertIn('*Sunday*', text)
+        self.assertIn('*Monday*', text)
+        self.assertNotIn('Last week', text)
+        rows = update.message.reply_text.call_args.kwargs['reply_markup'].inline_keyboard
+        self.assertEqual([len(row) for row in rows], [1, 1])
+        self.assertIn(f'/tournament/{sunday.id}/info/', rows[0][0].url)
+        self.assertEqual(rows[1][0].callback_data, f'register_{monday.id}')
+
+class WebhookTests(TestCase):
+    @override_settings(TELEGRAM_WEBHOOK_SECRET='')
+    def test_disabled_without_secret(self):
+        self.assertEqual(self.client.post(reverse('bot_webhook')).status_code, 404)
+
+    @override_settings(TELEGRAM_WEBHOOK_SECRET='s3cret')
+    def test_rejects_bad_secret(self):
+        response = self.client.post(
+            reverse('bot_webhook'), '{}', content_type='application/json',
+            headers={'X-Telegram-Bot-Api-Secret-Token': 'wrong'}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(TELEGRAM_WEBHOOK_SECRET='s3cret')
+    def test_rejects_malformed_updates(self):
+        headers = {'X-Telegram-Bot-Api-Secret-Token': 's3cret'}
+        for body in ('{"update_id": 1', '[1, 2]', ''):
+            response = self.client.post(reverse('bot_webhook'), body, content_type='application/json', headers=headers)
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_application_initialized_once_per_loop(self):
+        import asyncio
+        from . import webhook
+
+        class FakeApplication:
+            async def initialize(self):
+                await asyncio.sleep(0.05)
+
+        async def first_burst():
+            return await asyncio.gather(*(webhook.get_application() for _ in range(5)))
+
+        with mock.patch.object(Command, 'build_application', return_value=FakeApplication()) as build:
+            applications = async_to_sync(first_burst)()
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(len({id(application) for application in applications}), 1)
+
+
+class FakeBot:
+    """Records sent messages; raises the queued errors first, in order"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+        self.sent.append((chat_id, text))
+
+
+@mock.patch('bot.notifications.PER_CHAT_INTERVAL', 0)
+class NotificationTests(TestCase):
+    def queue(self, *texts, chat_id='100'):
+        return Notification.objects.bulk_create([Notification(chat_id=chat_id, kind='test', text=text) for text in texts])
+
+    def deliver(self, bot):
+        """One dispatch round, run inline: the DB pool's threads can't see the test transaction"""
+        dispatcher = NotificationDispatcher(bot)
+        due = dispatcher._fetch_due()
+        by_chat = {}
+        for notification in due:
+            by_chat.setdefault(notification.chat_id, []).append(notification)
+        results = [async_to_sync(dispatcher._deliver)(chat_id, rows) for chat_id, rows in by_chat.items()]
+        dispatcher._record(results)
+        return due
+
+    def test_due_rows_are_claimed(self):
+        self.queue('one', 'two')
+        dispatcher = NotificationDispatcher(FakeBot())
+        self.assertEqual(len(dispatcher._fetch_due()), 2)
+        self.assertEqual(set(Notification.objects.values_list('status', flat=True)), {'SENDING'})
+        # A second dispatcher finds nothing to send
+        self.assertEqual(dispatcher._fetch_due(), [])
+
+        # ...until the claim of a dispatcher that died expires
+        Notification.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(dispatcher._fetch_due()), 2)
+
+    def test_partial_failure_retries_only_unsent_messages(self):
+        # Three messages too long to merge: the second one fails
+        first, second, third = self.queue('a' * 3000, 'b' * 3000, 'c' * 3000)
+        bot = FakeBot(None, NetworkError('timeout'))
+        self.deliver(bot)
+        self.assertEqual([text[0] for _, text in bot.sent], ['a'])
+        statuses = dict(Notification.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[n.id] for n in (first, second, third)], ['SENT', 'PENDING', 'PENDING'])
+        self.assertEqual(Notification.objects.get(id=second.id).attempts, 1)
+
+        Notification.objects.filter(status='PENDING').update(next_attempt_at=timezone.now())
+        retry = FakeBot()
+        self.deliver(retry)
+        self.assertEqual([text[0] for _, text in retry.sent], ['b', 'c'])
+        self.assertEqual(set(Notification.objects.values_list('status', flat=True)), {'SENT'})
+
+    def test_tournament_name_is_escaped(self):
+        tournament = Tournament.objects.create(name='Deep_Stack *Turbo*', date=timezone.now(), type='PAID')
+        player = Player.objects.create(telegram_id='100', first_name='Player')
+        Registration.objects.create(tournament=tournament, player=player)
+        event = GameEvent(tournament=tournament, sequence=1, type='break_started', payload={'break_duration_minutes': 10})
+        [(chat_id, text)] = build_notifications(event)
+        self.assertTrue(text.startswith('☕ *Deep\\_Stack \\*Turbo\\**'), text)
+
+
+class DatabasePoolTests(TestCase):
+    def test_jobs_drop_old_connections(self):
+        from .concurrency import db
+        with mock.patch('bot.concurrency.close_old_connections') as close:
+            self.assertEqual(async_to_sync(db(lambda: close.call_count))(), 1)
+        self.assertEqual(close.call_count, 2)
+
+    def test_pool_size(self):
+        from .concurrency import pool_size
+        with override_settings(BOT_DB_THREADS=0):
+            self.assertEqual(pool_size(), 4)  # the tests run on SQLite
+        with override_settings(BOT_DB_THREADS=12):
+            self.assertEqual(pool_size(), 12)
+
+
+class UpdateProcessorTests(TestCase):
+    def test_one_users_backlog_does_not_hold_up_others(self):
+        import asyncio
+        import time
+        from .concurrency import PerUserUpdateProcessor
+        processor = PerUserUpdateProcessor(4)
+        started = time.monotonic()
+        finished = {}
+        running = {'now': 0, 'max': 0}
+
+        async def handle(user_id, number):
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+            await asyncio.sleep(0.1)
+            running['now'] -= 1
+            finished[user_id, number] = time.monotonic() - started
+
+        def update(user_id):
+            return mock.Mock(effective_user=mock.Mock(id=user_id))
+
+        async def burst():
+            # Six taps from user 1, then one from user 2
+            taps = [processor.process_update(update(1), handle(1, i)) for i in range(6)]
+            await asyncio.gather(*taps, processor.process_update(update(2), handle(2, 0)))
+
+        async_to_sync(burst)()
+        # User 1's taps ran one after another, in order
+        self.assertEqual(sorted(range(6), key=lambda i: finished[1, i]), list(range(6)))
+        self.assertGreaterEqual(finished[1, 5], 0.6)
+        # User 2 didn't wait behind them
+        self.assertLess(finished[2, 0], 0.3)
+        self.assertEqual(running['max'], 2)
+
+    def test_concurrency_limit(self):
+        import asyncio
+        from .concurrency import PerUserUpdateProcessor
+        processor = PerUserUpdateProcessor(2)
+        running = {'now': 0, 'max': 0}
+
+        async def handle():
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+            await asyncio.sleep(0.01)
+            running['now'] -= 1
+
+        async def burst():
+            await asyncio.gather(*(
+                processor.process_update(mock.Mock(effective_user=mock.Mock(id=user_id)), handle())
+                for user_id in range(6)
+            ))
+
+        async_to_sync(burst)()
+        self.assertEqual(running['max'], 2)
+
+class TokenBucketTests(TestCase):
+    def test_in_memory_bucket(self):
+        from .throttling import TokenBucket
+        bucket = TokenBucket('test', capacity=3, refill_rate=1 / 20)
+        with mock.patch('bot.throttling.time.monotonic', return_value=1000):
+            self.assertEqual([bucket.allow('1') for _ in range(4)], [True, True, True, False])
+            self.assertTrue(bucket.allow('2'))
+        with mock.patch('bot.throttling.time.monotonic', return_value=1020):
+            self.assertEqual([bucket.allow('1') for _ in range(2)], [True, False])
+
+    @override_settings(CACHES={'limits': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_shared_budget_in_the_cache(self):
+        import asyncio
+        from .throttling import TokenBucket
+        bucket = TokenBucket('test', capacity=3, refill_rate=1 / 20, cache_alias='limits')
+
+        async def burst():
+            return await asyncio.gather(*(bucket.aallow('1') for _ in range(10)))
+
+        with mock.patch('bot.throttling.time.time', return_value=1000):
+            # Concurrent requests can't all read the last token
+            self.assertEqual(sum(async_to_sync(burst)()), 3)
+            self.assertFalse(bucket.allow('1'))
+            self.assertTrue(bucket.allow('2'))
+        # The burst's interval leaves the window after three refill intervals
+        with mock.patch('bot.throttling.time.time', return_value=1040):
+            self.assertFalse(bucket.allow('1'))
+        with mock.patch('bot.throttling.time.time', return_value=1060):
+            self.assertEqual([bucket.allow('1') for _ in range(4)], [True, True, True, False])
+
+
+class TokenTests(TestCase):
+    def setUp(self):
+        self.player = Player.objects.create(telegram_id='1', first_name='Ann')
+
+    def age(self, token, minutes):
+        LoginToken.objects.filter(id=token.id).update(created_at=timezone.now() - timedelta(minutes=minutes))
+
+    def test_issue_reuses_the_active_token(self):
+        token = LoginToken.objects.issue(player=self.player)
+        self.assertEqual(LoginToken.objects.issue(player=self.player), token)
+
+        token.is_used = True
+        token.save()
+        fresh = LoginToken.objects.issue(player=self.player)
+        self.assertNotEqual(fresh, token)
+
+        self.age(fresh, 31)
+        self.assertNotIn(LoginToken.objects.issue(player=self.player), (token, fresh))
+
+    def test_registration_token_keeps_its_defaults(self):
+        token = RegistrationToken.objects.issue(telegram_id='2', defaults={'telegram_username': 'ann'})
+        again = RegistrationToken.objects.issue(telegram_id='2', defaults={'telegram_username': 'renamed'})
+        self.assertEqual((again, again.telegram_username), (token, 'ann'))
+
+    @override_settings(STORAGES=TEST_STORAGES)
+    def test_expired_link_is_refused(self):
+        token = LoginToken.objects.create(player=self.player)
+        self.age(token, 31)
+        response = self.client.get(reverse('bot_login', args=[token.token]))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertNotIn('player_id', self.client.session)
+
+    def test_purge_deletes_only_expired_tokens(self):
+        active = LoginToken.objects.create(player=self.player)
+        for is_used in (True, False):
+            self.age(LoginToken.objects.create(player=self.player, is_used=is_used), 31)
+        call_command('purge_bot_tokens', pause=0, stdout=StringIO())
+        self.assertEqual(list(LoginToken.objects.all()), [active])
+
+
+class IdentityCacheTests(TestCase):
+    def setUp(self):
+        self.lookups = []
+
+        def load(telegram_id):
+            self.lookups.append(telegram_id)
+            if telegram_id == '1':
+                return PlayerIdentity(1, 'Ann'), True
+            # '3' is registering on the site
+            return None, telegram_id != '3'
+
+        patcher = mock.patch('bot.identity._load_identity', side_effect=load)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hits_and_unregistered_users(self):
+        cache = IdentityCache()
+        for _ in range(2):
+            self.assertEqual(async_to_sync(cache.get)('1'), PlayerIdentity(1, 'Ann'))
+            with self.assertRaises(Player.DoesNotExist):
+                async_to_sync(cache.get)('2')
+        self.assertEqual(self.lookups, ['1', '2'])
+
+    def test_unregistered_users_expire_sooner(self):
+        cache = IdentityCache(ttl=300, negative_ttl=30)
+        with mock.patch('bot.identity.time.monotonic', return_value=1000):
+            async_to_sync(cache.get)('1')
+            with self.assertRaises(Player.DoesNotExist):
+                async_to_sync(cache.get)('2')
+        with mock.patch('bot.identity.time.monotonic', return_value=1031):
+            async_to_sync(cache.get)('1')
+            with self.assertRaises(Player.DoesNotExist):
+                async_to_sync(cache.get)('2')
+        self.assertEqual(self.lookups, ['1', '2', '2'])
+
+    def test_invalidate_after_registration(self):
+        cache = IdentityCache()
+        with self.assertRaises(Player.DoesNotExist):
+            async_to_sync(cache.get)('2')
+        cache.invalidate('2')
+        with self.assertRaises(Player.DoesNotExist):
+            async_to_sync(cache.get)('2')
+        self.assertEqual(self.lookups, ['2', '2'])
+
+    def test_users_with_a_registration_link_are_not_cached(self):
+        cache = IdentityCache()
+        for _ in range(2):
+            with self.assertRaises(Player.DoesNotExist):
+                async_to_sync(cache.get)('3')
+        self.assertEqual(self.lookups, ['3', '3'])
+
+    def test_registration_link_makes_a_miss_uncacheable(self):
+        self.assertEqual(load_identity('3'), (None, True))
+        RegistrationToken.objects.issue(telegram_id='3')
+        self.assertEqual(load_identity('3'), (None, False))
+        player = Player.objects.create(telegram_id='3', first_name='Cy')
+        self.assertEqual(load_identity('3'), (PlayerIdentity(player.id, 'Cy'), True))
+
+    def test_concurrent_misses_share_a_lookup(self):
+        import asyncio
+        cache = IdentityCache()
+
+        async def burst():
+            return await asyncio.gather(*(cache.get('1') for _ in range(5)))
+
+        self.assertEqual(async_to_sync(burst)(), [PlayerIdentity(1, 'Ann')] * 5)
+        self.assertEqual(self.lookups, ['1'])
+
+    def test_least_recently_used_is_evicted(self):
+        cache = IdentityCache(maxsize=2)
+        for telegram_id in ('1', '2', '1', '3'):
+            cache.set(telegram_id, None)
+        self.assertEqual(list(cache.entries), ['1', '3'])
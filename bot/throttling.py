@@ -0,0 +1,78 @@
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+
+class TokenBucket:
+    """
+    Per-key token bucket: `capacity` requests in a burst, refilled at
+    `refill_rate` tokens per second.
+
+    State lives in process memory, or in a Django cache when `cache_alias`
+    is given so several bot/web processes share one budget per user. A
+    bucket in the cache would need a read-modify-write that two processes
+    can interleave, so there the budget is kept as one counter per refill
+    interval, updated with add/incr (atomic in Redis, Memcached and LocMem):
+    `capacity` requests within the last `capacity` intervals.
+    """
+
+    def __init__(self, name, capacity, refill_rate, cache_alias=None):
+        self.name = name
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.cache = caches[cache_alias] if cache_alias else None
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _prune(self):
+        now = time.monotonic()
+        full_after = self.capacity / self.refill_rate
+        self.buckets = {k: v for k, v in self.buckets.items() if now - v[1] < full_after}
+
+    def allow(self, key):
+        if self.cache is not None:
+            return self._allow_shared(key)
+        with self.lock:
+            now = time.monotonic()
+            tokens, updated = self.buckets.get(key) or (self.capacity, now)
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+            allowed = tokens >= 1
+            self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+            if len(self.buckets) > 10000:
+                self._prune()
+            return allowed
+
+    async def aallow(self, key):
+        """allow() for async handlers: the cache round trips don't block the event loop"""
+        if self.cache is None:
+            return self.allow(key)
+        # Not the cache's own aincr: by default that is a get and a set
+        return await sync_to_async(self._allow_shared, thread_sensitive=False)(key)
+
+    def _allow_shared(self, key):
+        interval = 1 / self.refill_rate
+        slot = int(time.time() // interval)
+        keys = [f'bucket:{self.name}:{key}:{s}' for s in range(slot - self.capacity + 1, slot + 1)]
+        current = keys[-1]
+        # Expire once the slot has left the window
+        timeout = int(self.capacity * interval) + 1
+        self.cache.add(current, 0, timeout=timeout)
+        try:
+            used = self.cache.incr(current)
+        except ValueError:  # expired between add and incr
+            self.cache.set(current, 1, timeout=timeout)
+            used = 1
+        used += sum(self.cache.get_many(keys[:-1]).values())
+        if used > self.capacity:
+            # Rejected requests don't use up the budget
+            self.cache.decr(current)
+            return False
+        return True
+
+
+# Login/registration link requests per telegram user: burst of 3, then one per 20 seconds
+token_limiter = TokenBucket(
+    'bot_tokens', capacity=3, refill_rate=1 / 20, cache_alias=settings.BOT_RATE_LIMIT_CACHE
+)
@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('login/<uuid:token>/', views.bot_login, name='bot_login'),
     path('register/<uuid:token>/', views.bot_register, name='bot_register'),
+    path('webhook/', views.telegram_webhook, name='bot_webhook'),
 ]
@@ -1,8 +1,16 @@
+import json
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, Http404
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from telegram import Update
 from .models import LoginToken, RegistrationToken
 from .forms import PlayerRegistrationForm
+from .webhook import get_application
+from .identity import identity_cache
 from core.models import Player
 
 def bot_login(request, token):
@@ -16,7 +24,9 @@ def bot_login(request, token):
         messages.error(request, 'This login link has already been used. Please request a new one from the bot.')
         return redirect('dashboard')
 
-    # In a real app, check expiration time here
+    if login_token.is_expired:
+        messages.error(request, 'This login link has expired. Please request a new one from the bot.')
+        return redirect('dashboard')
 
     # Log the user in by setting session
     request.session['player_id'] = login_token.player.id
@@ -36,6 +46,10 @@ def bot_register(request, token):
         messages.error(request, 'This registration link has already been used.')
         return redirect('dashboard')
 
+    if reg_token.is_expired:
+        messages.error(request, 'This registration link has expired. Please request a new one from the bot.')
+        return redirect('dashboard')
+
     # Check if player already exists with this telegram_id
     existing_player = Player.objects.filter(telegram_id=reg_token.telegram_id).first()
     if existing_player:
@@ -55,6 +69,8 @@ def bot_register(request, token):
             if not player.last_name:
                 player.last_name = reg_token.telegram_last_name
             player.save()
+            # The bot may have cached this user as unregistered
+            identity_cache.invalidate(player.telegram_id)
 
             # Mark token as used
             reg_token.is_used = True
@@ -78,3 +94,30 @@ def bot_register(request, token):
         'form': form,
         'telegram_username': reg_token.telegram_username,
     })
+
+@csrf_exempt
+async def telegram_webhook(request):
+    """Receives Telegram updates in webhook mode (see runbot --webhook)"""
+    secret = settings.TELEGRAM_WEBHOOK_SECRET
+    if not secret:
+        raise Http404
+
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    if not constant_time_compare(request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), secret):
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'Expected an update object'}, status=400)
+
+    application = await get_application()
+    update = Update.de_json(data, application.bot)
+    # Through the update processor so one user's updates still run one at a time
+    await application.update_processor.process_update(update, application.process_update(update))
+
+    return HttpResponse()
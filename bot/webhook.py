@@ -0,0 +1,27 @@
+import asyncio
+import weakref
+from django.conf import settings
+
+# One initialized Application per event loop: under ASGI that is one per
+# worker, shared by every webhook request the worker serves.
+_applications = weakref.WeakKeyDictionary()
+# Held while a loop's Application initializes, so the first burst of
+# requests doesn't build (and log in) several
+_locks = weakref.WeakKeyDictionary()
+
+
+async def get_application():
+    loop = asyncio.get_running_loop()
+    application = _applications.get(loop)
+    if application is not None:
+        return application
+
+    async with _locks.setdefault(loop, asyncio.Lock()):
+        application = _applications.get(loop)
+        if application is None:
+            from .management.commands.runbot import Command
+
+            application = Command().build_application(settings.TELEGRAM_BOT_TOKEN, webhook=True)
+            await application.initialize()
+            _applications[loop] = application
+    return application
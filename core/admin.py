@@ -1,10 +1,13 @@
 from django.contrib import admin
-from .models import Player, Tournament, TournamentTemplate, Registration, Table, Payout, SystemSettings
+from .models import Player, Tournament, TournamentTemplate, TournamentSeries, Registration, WaitlistEntry, Table, Payout, PlayerStats, SystemSettings
 
 admin.site.register(Player)
 admin.site.register(Tournament)
 admin.site.register(TournamentTemplate)
+admin.site.register(TournamentSeries)
 admin.site.register(Registration)
+admin.site.register(WaitlistEntry)
 admin.site.register(Table)
 admin.site.register(Payout)
+admin.site.register(PlayerStats)
 admin.site.register(SystemSettings)
@@ -1,14 +1,19 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from django.shortcuts import get_object_or_404
-from django.db import models
+from django.shortcuts import get_object_or_404, aget_object_or_404
+from django.db import models, transaction
 from .models import Tournament, Player
+from .events import record_event, mutates_tournament, timer_state, serialize_event
+from .serialization import api_response
+from .display import DisplayStream, field_stats, status_payload
+from .stats_cache import precompressed
 import json
 import random
 import math
 
 @csrf_exempt
+@mutates_tournament
 def start_timer(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -26,10 +31,13 @@ def start_timer(request, tournament_id):
     tournament.level_started_at = timezone.now()
     tournament.status = 'RUNNING'
     tournament.save()
+
+    record_event(tournament, 'timer_started', 'Timer started', **timer_state(tournament))
     
     return JsonResponse({'status': 'started'})
 
 @csrf_exempt
+@mutates_tournament
 def pause_timer(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -45,10 +53,13 @@ def pause_timer(request, tournament_id):
     tournament.level_started_at = None
     tournament.status = 'PAUSED'
     tournament.save()
+
+    record_event(tournament, 'timer_paused', 'Timer paused', **timer_state(tournament))
     
     return JsonResponse({'status': 'paused', 'remaining': tournament.timer_seconds})
 
 @csrf_exempt
+@mutates_tournament
 def next_level(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -67,11 +78,17 @@ def next_level(request, tournament_id):
             tournament.level_started_at = timezone.now()
             
         tournament.save()
+
+        record_event(
+            tournament, 'level_changed', f'Level {next_lvl.level_number} started',
+            level_number=next_lvl.level_number, is_break=next_lvl.is_break, **timer_state(tournament)
+        )
         return JsonResponse({'status': 'level_advanced', 'level': next_lvl.level_number})
     
     return JsonResponse({'status': 'max_level_reached'})
 
 @csrf_exempt
+@mutates_tournament
 def prev_level(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -90,11 +107,17 @@ def prev_level(request, tournament_id):
             tournament.level_started_at = timezone.now()
 
         tournament.save()
+
+        record_event(
+            tournament, 'level_changed', f'Back to level {prev_lvl.level_number}',
+            level_number=prev_lvl.level_number, is_break=prev_lvl.is_break, **timer_state(tournament)
+        )
         return JsonResponse({'status': 'level_decreased', 'level': prev_lvl.level_number})
 
     return JsonResponse({'status': 'min_level_reached'})
 
 @csrf_exempt
+@mutates_tournament
 def start_break(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -111,6 +134,8 @@ def start_break(request, tournament_id):
     tournament.status = 'BREAK'
     tournament.save()
 
+    record_event(tournament, 'break_started', f'{duration} minute break started', **timer_state(tournament))
+
     return JsonResponse({
         'status': 'break_started',
         'duration': duration,
@@ -118,6 +143,7 @@ def start_break(request, tournament_id):
     })
 
 @csrf_exempt
+@mutates_tournament
 def set_timer(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -136,9 +162,12 @@ def set_timer(request, tournament_id):
         
     tournament.save()
 
+    record_event(tournament, 'timer_set', f'Timer set to {minutes:02d}:{seconds:02d}', **timer_state(tournament))
+
     return JsonResponse({'status': 'timer_set', 'timer_seconds': tournament.timer_seconds})
 
 @csrf_exempt
+@mutates_tournament
 def finish_tournament(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -149,78 +178,75 @@ def finish_tournament(request, tournament_id):
     tournament.status = 'FINISHED'
     tournament.save()
 
+    record_event(tournament, 'tournament_finished', 'Tournament finished', **timer_state(tournament))
+
     return JsonResponse({
         'status': 'tournament_finished',
         'tournament_id': tournament_id
     })
 
-def get_status(request, tournament_id):
+async def get_status(request, tournament_id):
+    tournament = await aget_object_or_404(Tournament, id=tournament_id)
+    # Polled every few seconds by every open control page: one query for the levels, one for the stats
+    levels = [level async for level in tournament.levels.order_by('level_number')]
+    stats = await tournament.registrations.aaggregate(**field_stats())
+    return api_response(request, status_payload(tournament, levels, stats))
+
+def get_events(request, tournament_id):
+    """
+    Returns journal events with a sequence greater than ?after=,
+    so clients can sync incrementally instead of re-reading full state.
+    """
     tournament = get_object_or_404(Tournament, id=tournament_id)
-    levels = tournament.levels.order_by('level_number')
-    
-    remaining = 0
-    if tournament.status == 'RUNNING' and tournament.level_started_at:
-        elapsed = (timezone.now() - tournament.level_started_at).total_seconds()
-        remaining = max(0, int(tournament.timer_seconds - elapsed))
-    elif tournament.timer_seconds is not None:
-        remaining = tournament.timer_seconds
-    else:
-        # Fallback if timer_seconds is None (e.g. not started yet)
-        if levels.exists():
-            remaining = levels[tournament.current_level_index].duration * 60
-            
-    current_level = levels[tournament.current_level_index] if levels.exists() else None
 
-    # Get next level
-    next_level = None
-    if levels.exists() and tournament.current_level_index < levels.count() - 1:
-        next_level = levels[tournament.current_level_index + 1]
+    try:
+        after = int(request.GET.get('after', 0))
+        limit = int(request.GET.get('limit', 200))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid after/limit'}, status=400)
+    if not 1 <= limit <= 1000:
+        return JsonResponse({'error': 'limit must be between 1 and 1000'}, status=400)
 
-    # Calculate stats
-    registrations = tournament.registrations.all()
-    players_remaining = registrations.filter(status='REGISTERED').count()
-    total_entries = registrations.count() # Includes rebuys/addons in aggregation logic below if needed, but for now strict entries
-    
-    total_rebuys = registrations.aggregate(models.Sum('rebuys'))['rebuys__sum'] or 0
-    total_addons = registrations.aggregate(models.Sum('addons'))['addons__sum'] or 0
-    
-    # Total chip count
-    total_chips = (registrations.count() * tournament.stack) + \
-                  (total_rebuys * tournament.stack) + \
-                  (total_addons * tournament.stack)
-                  
-    average_stack = total_chips / players_remaining if players_remaining > 0 else 0
-
-    data = {
-        'status': tournament.status,
-        'remaining_seconds': remaining,
-        'level': {
-            'number': current_level.level_number if current_level else 0,
-            'small_blind': current_level.small_blind if current_level else 0,
-            'big_blind': current_level.big_blind if current_level else 0,
-            'ante': current_level.ante if current_level else 0,
-            'is_break': current_level.is_break if current_level else False,
-        } if current_level else None,
-        'next_level': {
-            'number': next_level.level_number if next_level else 0,
-            'small_blind': next_level.small_blind if next_level else 0,
-            'big_blind': next_level.big_blind if next_level else 0,
-            'ante': next_level.ante if next_level else 0,
-            'is_break': next_level.is_break if next_level else False,
-        } if next_level else None,
-        'players_remaining': players_remaining,
-        'total_entries': total_entries + total_rebuys + total_addons, # Total logical entries
-        'average_stack': round(average_stack),
-        'prize_pool': (total_entries + total_rebuys + total_addons) * (tournament.buy_in or 0)
-    }
-    
-    return JsonResponse(data)
+    # One extra row tells whether there is another page
+    events = list(tournament.events.filter(sequence__gt=after).order_by('sequence')[:limit + 1])
+    has_more = len(events) > limit
+    events = events[:limit]
+
+    return JsonResponse({
+        'events': [serialize_event(e) for e in events],
+        'last_sequence': events[-1].sequence if events else after,
+        'has_more': has_more
+    })
+
+async def display_stream(request, tournament_id):
+    """Server-sent display state for the lobby TV page (see display.DisplayStream)"""
+    from django.conf import settings
+    from django.core.handlers.asgi import ASGIRequest
+    from django.http import StreamingHttpResponse
+
+    await aget_object_or_404(Tournament.objects.only('id'), id=tournament_id)
+    asgi = isinstance(request, ASGIRequest)
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    stream = DisplayStream(
+        tournament_id,
+        last_sequence=int(last_event_id) if last_event_id.isdigit() else None,
+        # Under WSGI every open stream would hold a worker: short-poll instead
+        seconds=settings.DISPLAY_STREAM_SECONDS if asgi else 0,
+    )
+    response = StreamingHttpResponse(
+        stream.__aiter__() if asgi else iter(stream),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Don't let nginx buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 @csrf_exempt
-def get_players(request, tournament_id):
+async def get_players(request, tournament_id):
     from django.db.models import Case, When, Value, IntegerField, Q
 
-    tournament = get_object_or_404(Tournament, id=tournament_id)
+    tournament = await aget_object_or_404(Tournament, id=tournament_id)
 
     # Custom sorting:
     # 1. REGISTERED players with table and seat (actively playing)
@@ -249,7 +275,7 @@ def get_players(request, tournament_id):
     ).order_by('sort_priority', 'place', 'created_at')
 
     data = []
-    for reg in registrations:
+    async for reg in registrations:
         data.append({
             'id': reg.id,
             'player_id': reg.player.id,
@@ -266,7 +292,13 @@ def get_players(request, tournament_id):
             'points': reg.points or 0,
         })
 
-    return JsonResponse({'players': data})
+    entries = [entry async for entry in tournament.waitlist.select_related('player')]
+    waitlist = [
+        {'id': entry.id, 'player_id': entry.player_id, 'name': str(entry.player), 'position': number}
+        for number, entry in enumerate(entries, start=1)
+    ]
+
+    return api_response(request, {'players': data, 'waitlist': waitlist})
 
 @csrf_exempt
 def search_players(request):
@@ -302,6 +334,7 @@ def search_players(request):
     return JsonResponse({'results': results})
 
 @csrf_exempt
+@mutates_tournament
 def register_player(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -329,16 +362,16 @@ def register_player(request, tournament_id):
     else:
         return JsonResponse({'error': 'Player name is required'}, status=400)
 
-    # Check if already registered
-    if tournament.registrations.filter(player=player).exists():
-        return JsonResponse({'error': 'Player already registered'}, status=400)
+    from .registration import register, RegistrationError
+    try:
+        reg, created = register(tournament.id, player)
+    except RegistrationError as e:
+        # Don't keep a player created just for this refused registration
+        transaction.set_rollback(True)
+        return JsonResponse({'error': str(e)}, status=400)
 
-    from .models import Registration
-    reg = Registration.objects.create(
-        tournament=tournament,
-        player=player,
-        status='REGISTERED'
-    )
+    if not created:
+        return JsonResponse({'error': 'Player already registered'}, status=400)
 
     return JsonResponse({
         'status': 'registered',
@@ -361,19 +394,23 @@ def check_table_balance(tournament):
     if len(tables) <= 1:
         return None  # Only one table, no balancing needed
 
-    # Count players at each table
+    # Count players at each table (all seated players in one query)
+    seated_by_table = {table.id: [] for table in tables}
+    seated = Registration.objects.filter(
+        tournament=tournament,
+        table__isnull=False,
+        status='REGISTERED'
+    ).exclude(seat_number__isnull=True).select_related('player').order_by('id')
+    for reg in seated:
+        seated_by_table.setdefault(reg.table_id, []).append(reg)
+
     table_data = []
     for table in tables:
-        players = Registration.objects.filter(
-            tournament=tournament,
-            table=table,
-            status='REGISTERED'
-        ).exclude(seat_number__isnull=True).select_related('player')
-
+        players = seated_by_table[table.id]
         table_data.append({
             'table': table,
-            'count': players.count(),
-            'players': list(players)
+            'count': len(players),
+            'players': players
         })
 
     # Sort by player count
@@ -444,6 +481,7 @@ def check_table_balance(tournament):
     return None  # Tables are balanced
 
 @csrf_exempt
+@mutates_tournament
 def eliminate_player(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -453,7 +491,7 @@ def eliminate_player(request, tournament_id):
     bounty_count = data.get('bounty_count', 0)  # Number of players eliminated by this player
 
     from .models import Registration, Tournament
-    reg = get_object_or_404(Registration, id=registration_id, tournament_id=tournament_id)
+    reg = get_object_or_404(Registration.objects.select_related('player'), id=registration_id, tournament_id=tournament_id)
     tournament = get_object_or_404(Tournament, id=tournament_id)
 
     # Calculate place BEFORE changing status
@@ -508,6 +546,12 @@ def eliminate_player(request, tournament_id):
 
     reg.save()
 
+    record_event(
+        tournament, 'player_eliminated', f'{reg.player} eliminated in place {reg.place}',
+        registration_id=reg.id, player_id=reg.player_id, place=reg.place,
+        points=reg.points, bounty_count=reg.bounty_count
+    )
+
     # Check if player finished in a prize-paying position
     from .models import Payout
     payout_entry = Payout.objects.filter(tournament=tournament, place=reg.place).first()
@@ -522,6 +566,11 @@ def eliminate_player(request, tournament_id):
         payout_entry.player = reg.player
         payout_entry.save()
         payout_amount = payout_entry.amount
+
+        record_event(
+            tournament, 'payout_assigned', f'{reg.player} wins {payout_amount} for place {reg.place}',
+            payout_id=payout_entry.id, player_id=reg.player_id, place=reg.place, amount=payout_amount
+        )
         print(f"DEBUG: Assigned payout of ${payout_amount} to player {reg.player}")
 
     # For FREE tournaments, automatically advance to next level while preserving timer
@@ -550,6 +599,12 @@ def eliminate_player(request, tournament_id):
             tournament.save()
             level_advanced = True
 
+            new_level = levels[tournament.current_level_index]
+            record_event(
+                tournament, 'level_changed', f'Level {new_level.level_number} started',
+                level_number=new_level.level_number, is_break=new_level.is_break, **timer_state(tournament)
+            )
+
     # Check table balance after elimination
     balance_suggestion = check_table_balance(tournament)
 
@@ -565,6 +620,7 @@ def eliminate_player(request, tournament_id):
     })
 
 @csrf_exempt
+@mutates_tournament
 def rebuy_player(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -573,14 +629,23 @@ def rebuy_player(request, tournament_id):
     registration_id = data.get('registration_id')
     
     from .models import Registration
-    reg = get_object_or_404(Registration, id=registration_id, tournament_id=tournament_id)
+    reg = get_object_or_404(
+        Registration.objects.select_related('tournament', 'player'),
+        id=registration_id, tournament_id=tournament_id
+    )
     
     reg.rebuys += 1
     reg.save()
+
+    record_event(
+        reg.tournament, 'rebuy', f'{reg.player} rebuy #{reg.rebuys}',
+        registration_id=reg.id, player_id=reg.player_id, rebuys=reg.rebuys
+    )
     
     return JsonResponse({'status': 'rebuy_added', 'rebuys': reg.rebuys})
 
 @csrf_exempt
+@mutates_tournament
 def addon_player(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -589,14 +654,23 @@ def addon_player(request, tournament_id):
     registration_id = data.get('registration_id')
 
     from .models import Registration
-    reg = get_object_or_404(Registration, id=registration_id, tournament_id=tournament_id)
+    reg = get_object_or_404(
+        Registration.objects.select_related('tournament', 'player'),
+        id=registration_id, tournament_id=tournament_id
+    )
 
     reg.addons += 1
     reg.save()
 
+    record_event(
+        reg.tournament, 'addon', f'{reg.player} add-on #{reg.addons}',
+        registration_id=reg.id, player_id=reg.player_id, addons=reg.addons
+    )
+
     return JsonResponse({'status': 'addon_added', 'addons': reg.addons})
 
 @csrf_exempt
+@mutates_tournament
 def unregister_player(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -605,7 +679,10 @@ def unregister_player(request, tournament_id):
     registration_id = data.get('registration_id')
 
     from .models import Registration
-    reg = get_object_or_404(Registration, id=registration_id, tournament_id=tournament_id)
+    reg = get_object_or_404(
+        Registration.objects.select_related('tournament', 'player'),
+        id=registration_id, tournament_id=tournament_id
+    )
 
     # Don't allow unregistering eliminated players
     if reg.status == 'ELIMINATED':
@@ -615,13 +692,41 @@ def unregister_player(request, tournament_id):
     player_name = str(reg.player)
 
     # Delete the registration
+    record_event(
+        reg.tournament, 'player_unregistered', f'{player_name} unregistered',
+        registration_id=reg.id, player_id=reg.player_id
+    )
     reg.delete()
 
-    return JsonResponse({'status': 'unregistered', 'player_name': player_name})
+    # Hand the freed spot to the head of the waitlist
+    from .registration import lock_tournament, promote_waitlist
+    promoted = promote_waitlist(lock_tournament(tournament_id))
+
+    return JsonResponse({
+        'status': 'unregistered',
+        'player_name': player_name,
+        'promoted': [reg.player_id for reg in promoted]
+    })
+
+@csrf_exempt
+def leave_waitlist(request, tournament_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    data = json.loads(request.body)
+    player_id = data.get('player_id')
+
+    from .registration import leave_waitlist
+    if not leave_waitlist(tournament.id, player_id):
+        return JsonResponse({'error': 'Player is not on the waitlist'}, status=400)
+
+    return JsonResponse({'status': 'left_waitlist', 'player_id': player_id})
 
 # --- Table Management API ---
 
 @csrf_exempt
+@mutates_tournament
 def generate_tables(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -636,6 +741,7 @@ def generate_tables(request, tournament_id):
     player_count = len(registrations)
     
     if player_count == 0:
+        record_event(tournament, 'tables_generated', 'Tables cleared, no players to seat', tables=[], seats=[])
         return JsonResponse({'status': 'no_players'})
         
     # 3. Calculate tables needed
@@ -644,14 +750,11 @@ def generate_tables(request, tournament_id):
     table_count = math.ceil(player_count / MAX_SEATS)
     
     # 4. Create tables
-    from .models import Table
-    tables = []
-    for i in range(1, table_count + 1):
-        tables.append(Table.objects.create(
-            tournament=tournament,
-            table_number=i,
-            max_seats=MAX_SEATS
-        ))
+    from .models import Table, Registration
+    tables = Table.objects.bulk_create([
+        Table(tournament=tournament, table_number=i, max_seats=MAX_SEATS)
+        for i in range(1, table_count + 1)
+    ])
         
     # 5. Shuffle players
     random.shuffle(registrations)
@@ -664,6 +767,7 @@ def generate_tables(request, tournament_id):
     extra_players = player_count % table_count
 
     current_player_idx = 0
+    seats = []
 
     for i, table in enumerate(tables):
         # Determine how many players on this table
@@ -678,18 +782,26 @@ def generate_tables(request, tournament_id):
                 reg = registrations[current_player_idx]
                 reg.table = table
                 reg.seat_number = available_seats[seat_idx]  # Random seat
-                reg.save()
+                seats.append([reg.id, table.id, reg.seat_number])
                 current_player_idx += 1
+
+    Registration.objects.bulk_update(registrations, ['table', 'seat_number'], batch_size=500)
+
+    record_event(
+        tournament, 'tables_generated', f'{table_count} table(s) generated',
+        tables=[{'id': t.id, 'number': t.table_number, 'max_seats': t.max_seats} for t in tables],
+        seats=seats
+    )
                 
     return JsonResponse({'status': 'tables_generated', 'table_count': table_count})
 
 @csrf_exempt
-def get_tables(request, tournament_id):
-    tournament = get_object_or_404(Tournament, id=tournament_id)
+async def get_tables(request, tournament_id):
+    tournament = await aget_object_or_404(Tournament, id=tournament_id)
     tables = tournament.tables.prefetch_related('registrations__player').all()
     
     data = []
-    for table in tables:
+    async for table in tables:
         seats = []
         for reg in table.registrations.all():
             seats.append({
@@ -710,9 +822,10 @@ def get_tables(request, tournament_id):
             'seats': seats
         })
         
-    return JsonResponse({'tables': data})
+    return api_response(request, {'tables': data})
 
 @csrf_exempt
+@mutates_tournament
 def clear_tables(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -725,9 +838,12 @@ def clear_tables(request, tournament_id):
     # Delete tables
     tournament.tables.all().delete()
 
+    record_event(tournament, 'tables_cleared', 'All tables cleared')
+
     return JsonResponse({'status': 'tables_cleared'})
 
 @csrf_exempt
+@mutates_tournament
 def add_table(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -752,6 +868,15 @@ def add_table(request, tournament_id):
         max_seats=max_seats
     )
 
+    record_event(
+        tournament, 'table_added', f'Table {table.table_number} added',
+        table={'id': table.id, 'number': table.table_number, 'max_seats': table.max_seats}
+    )
+
+    # New seats may let waitlisted players in
+    from .registration import lock_tournament, promote_waitlist
+    promote_waitlist(lock_tournament(tournament_id))
+
     return JsonResponse({
         'status': 'table_added',
         'table': {
@@ -762,6 +887,7 @@ def add_table(request, tournament_id):
     })
 
 @csrf_exempt
+@mutates_tournament
 def delete_table(request, tournament_id, table_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -785,6 +911,10 @@ def delete_table(request, tournament_id, table_id):
 
     # Delete the table
     table_number = table.table_number
+    record_event(
+        tournament, 'table_deleted', f'Table {table_number} deleted',
+        table_id=table.id, number=table_number
+    )
     table.delete()
 
     return JsonResponse({
@@ -793,6 +923,7 @@ def delete_table(request, tournament_id, table_id):
     })
 
 @csrf_exempt
+@mutates_tournament
 def seat_selected_players(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -812,20 +943,6 @@ def seat_selected_players(request, tournament_id):
     if not tables:
         return JsonResponse({'status': 'no_tables'})
 
-    # DEBUG: Check all selected registrations first
-    all_selected = Registration.objects.filter(
-        id__in=registration_ids,
-        tournament=tournament,
-        status='REGISTERED'
-    )
-
-    print(f"\n=== SEATING DEBUG ===")
-    print(f"Selected registration IDs: {registration_ids}")
-    print(f"Found {all_selected.count()} REGISTERED players")
-
-    for reg in all_selected:
-        print(f"  Player: {reg.player}, table={reg.table}, seat_number={reg.seat_number}")
-
     # Get selected registrations (only those without seats)
     # A player is considered unseated if they don't have a seat_number
     # (matching the frontend logic in tables.js)
@@ -834,16 +951,16 @@ def seat_selected_players(request, tournament_id):
         tournament=tournament,
         status='REGISTERED',
         seat_number__isnull=True  # Only players without a seat number
-    ).order_by('?')  # Random order
-
-    print(f"After filtering by seat_number__isnull=True: {registrations.count()} players")
+    )
 
     # Clean up any players with table but no seat_number (invalid state)
-    # This ensures clean seating assignment
-    registrations.update(table=None)
+    # This ensures clean seating assignment; journaled with the seating below
+    unseated = list(registrations.filter(table__isnull=False).values_list('id', flat=True))
+    if unseated:
+        Registration.objects.filter(id__in=unseated).update(table=None)
 
-    if not registrations.exists():
-        print("ERROR: No unseated players found!")
+    registrations_list = list(registrations)
+    if not registrations_list:
         return JsonResponse({
             'status': 'players_seated',
             'seated_count': 0,
@@ -856,25 +973,25 @@ def seat_selected_players(request, tournament_id):
     table_occupied_seats = {}
 
     for table in tables:
-        occupied_seats = set(
-            Registration.objects.filter(
-                tournament=tournament,
-                table=table,
-                status='REGISTERED'
-            ).exclude(seat_number__isnull=True)
-            .values_list('seat_number', flat=True)
-        )
-        table_occupancy[table.id] = len(occupied_seats)
-        table_occupied_seats[table.id] = occupied_seats
+        table_occupied_seats[table.id] = set()
 
-    print(f"Initial table occupancy: {table_occupancy}")
+    occupied = Registration.objects.filter(
+        tournament=tournament,
+        table__isnull=False,
+        status='REGISTERED'
+    ).exclude(seat_number__isnull=True).values_list('table_id', 'seat_number')
+    for table_id, seat_number in occupied:
+        table_occupied_seats[table_id].add(seat_number)
+
+    for table in tables:
+        table_occupancy[table.id] = len(table_occupied_seats[table.id])
 
     # Shuffle players for randomness
-    registrations_list = list(registrations)
     random.shuffle(registrations_list)
 
     # Seat players with balanced distribution
     seated_count = 0
+    seats = []
     for reg in registrations_list:
         # Find table with least players that has space
         available_tables = [
@@ -902,17 +1019,26 @@ def seat_selected_players(request, tournament_id):
             # Choose random seat from available seats
             seat_num = random.choice(available_seat_numbers)
 
-            # Assign seat
+            # Assign seat (saved in bulk below)
             reg.table = selected_table
             reg.seat_number = seat_num
-            reg.save()
 
             # Update occupancy tracking
             table_occupancy[selected_table.id] += 1
             table_occupied_seats[selected_table.id].add(seat_num)
 
             seated_count += 1
-            print(f"Seated {reg.player} at Table {selected_table.table_number}, Seat {seat_num}")
+            seats.append([reg.id, selected_table.id, seat_num])
+
+    Registration.objects.bulk_update(
+        [reg for reg in registrations_list if reg.seat_number is not None], ['table', 'seat_number']
+    )
+
+    if seats or unseated:
+        record_event(
+            tournament, 'players_seated', f'{seated_count} player(s) seated',
+            seats=seats, unseated=unseated
+        )
 
     if seated_count == 0:
         # Debug info
@@ -939,6 +1065,7 @@ def seat_selected_players(request, tournament_id):
     })
 
 @csrf_exempt
+@mutates_tournament
 def move_player(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -950,7 +1077,10 @@ def move_player(request, tournament_id):
 
     from .models import Registration, Table
 
-    reg = get_object_or_404(Registration, id=registration_id, tournament_id=tournament_id)
+    reg = get_object_or_404(
+        Registration.objects.select_related('tournament', 'player'),
+        id=registration_id, tournament_id=tournament_id
+    )
 
     if table_id:
         table = get_object_or_404(Table, id=table_id, tournament_id=tournament_id)
@@ -968,16 +1098,26 @@ def move_player(request, tournament_id):
 
     reg.save()
 
+    if reg.table:
+        description = f'{reg.player} moved to table {reg.table.table_number}, seat {reg.seat_number}'
+    else:
+        description = f'{reg.player} unseated'
+    record_event(
+        reg.tournament, 'player_moved', description,
+        registration_id=reg.id, player_id=reg.player_id,
+        table_id=reg.table_id, seat_number=reg.seat_number
+    )
+
     return JsonResponse({'status': 'moved'})
 
 # --- Blind Structure Management API ---
 
-def get_levels(request, tournament_id):
-    tournament = get_object_or_404(Tournament, id=tournament_id)
+async def get_levels(request, tournament_id):
+    tournament = await aget_object_or_404(Tournament, id=tournament_id)
     levels = tournament.levels.order_by('level_number').all()
 
     data = []
-    for level in levels:
+    async for level in levels:
         data.append({
             'id': level.id,
             'level_number': level.level_number,
@@ -991,6 +1131,7 @@ def get_levels(request, tournament_id):
     return JsonResponse({'levels': data})
 
 @csrf_exempt
+@mutates_tournament
 def add_level(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -1009,18 +1150,26 @@ def add_level(request, tournament_id):
         is_break=data.get('is_break', False),
     )
 
+    record_event(
+        tournament, 'level_added', f'Level {level.level_number} added',
+        level_id=level.id, level_number=level.level_number
+    )
+
     return JsonResponse({
         'status': 'level_added',
         'level_id': level.id
     })
 
 @csrf_exempt
+@mutates_tournament
 def update_level(request, tournament_id, level_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
     from .models import TournamentLevel
-    level = get_object_or_404(TournamentLevel, id=level_id, tournament_id=tournament_id)
+    level = get_object_or_404(
+        TournamentLevel.objects.select_related('tournament'), id=level_id, tournament_id=tournament_id
+    )
     data = json.loads(request.body)
 
     level.level_number = data.get('level_number', level.level_number)
@@ -1031,27 +1180,39 @@ def update_level(request, tournament_id, level_id):
     level.is_break = data.get('is_break', level.is_break)
     level.save()
 
+    record_event(
+        level.tournament, 'level_updated', f'Level {level.level_number} updated',
+        level_id=level.id, level_number=level.level_number
+    )
+
     return JsonResponse({'status': 'level_updated'})
 
 @csrf_exempt
+@mutates_tournament
 def delete_level(request, tournament_id, level_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
     from .models import TournamentLevel
-    level = get_object_or_404(TournamentLevel, id=level_id, tournament_id=tournament_id)
+    level = get_object_or_404(
+        TournamentLevel.objects.select_related('tournament'), id=level_id, tournament_id=tournament_id
+    )
+    record_event(
+        level.tournament, 'level_deleted', f'Level {level.level_number} deleted',
+        level_id=level.id, level_number=level.level_number
+    )
     level.delete()
 
     return JsonResponse({'status': 'level_deleted'})
 
 # --- Payout Management API ---
 
-def get_payouts(request, tournament_id):
-    tournament = get_object_or_404(Tournament, id=tournament_id)
+async def get_payouts(request, tournament_id):
+    tournament = await aget_object_or_404(Tournament, id=tournament_id)
     payouts = tournament.payouts.select_related('player').order_by('place')
 
     data = []
-    for payout in payouts:
+    async for payout in payouts:
         data.append({
             'id': payout.id,
             'place': payout.place,
@@ -1061,10 +1222,8 @@ def get_payouts(request, tournament_id):
         })
 
     # Calculate total prize pool
-    registrations = tournament.registrations.all()
-    total_rebuys = registrations.aggregate(models.Sum('rebuys'))['rebuys__sum'] or 0
-    total_addons = registrations.aggregate(models.Sum('addons'))['addons__sum'] or 0
-    total_entries = registrations.count() + total_rebuys + total_addons
+    stats = await tournament.registrations.aaggregate(**field_stats())
+    total_entries = stats['total_entries'] + (stats['total_rebuys'] or 0) + (stats['total_addons'] or 0)
     prize_pool = total_entries * (tournament.buy_in or 0)
 
     return JsonResponse({
@@ -1074,6 +1233,7 @@ def get_payouts(request, tournament_id):
     })
 
 @csrf_exempt
+@mutates_tournament
 def generate_payouts(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -1115,16 +1275,23 @@ def generate_payouts(request, tournament_id):
         payout_percentages = [0.40, 0.25, 0.17, 0.11, 0.07]  # 40% / 25% / 17% / 11% / 7%
 
     # Create payout entries
+    payouts = []
     for place in range(1, places_paid + 1):
         amount = int(prize_pool * payout_percentages[place - 1])
         # Round to nearest 10
         amount = round(amount / 10) * 10
-        Payout.objects.create(
+        payout = Payout.objects.create(
             tournament=tournament,
             place=place,
             amount=amount,
             description=f"Place {place}"
         )
+        payouts.append({'id': payout.id, 'place': place, 'amount': amount})
+
+    record_event(
+        tournament, 'payouts_generated', f'Payouts generated for {places_paid} place(s)',
+        prize_pool=prize_pool, payouts=payouts
+    )
 
     return JsonResponse({
         'status': 'payouts_generated',
@@ -1133,6 +1300,7 @@ def generate_payouts(request, tournament_id):
     })
 
 @csrf_exempt
+@mutates_tournament
 def add_payout(request, tournament_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -1154,6 +1322,11 @@ def add_payout(request, tournament_id):
         description=data.get('description', f"Place {place}")
     )
 
+    record_event(
+        tournament, 'payout_added', f'Payout added for place {payout.place}',
+        payout_id=payout.id, place=payout.place, amount=payout.amount
+    )
+
     return JsonResponse({
         'status': 'payout_added',
         'payout': {
@@ -1165,12 +1338,15 @@ def add_payout(request, tournament_id):
     })
 
 @csrf_exempt
+@mutates_tournament
 def update_payout(request, tournament_id, payout_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
     from .models import Payout
-    payout = get_object_or_404(Payout, id=payout_id, tournament_id=tournament_id)
+    payout = get_object_or_404(
+        Payout.objects.select_related('tournament'), id=payout_id, tournament_id=tournament_id
+    )
     data = json.loads(request.body)
 
     if 'place' in data:
@@ -1182,6 +1358,11 @@ def update_payout(request, tournament_id, payout_id):
 
     payout.save()
 
+    record_event(
+        payout.tournament, 'payout_updated', f'Payout for place {payout.place} updated',
+        payout_id=payout.id, place=payout.place, amount=payout.amount
+    )
+
     return JsonResponse({
         'status': 'payout_updated',
         'payout': {
@@ -1193,19 +1374,73 @@ def update_payout(request, tournament_id, payout_id):
     })
 
 @csrf_exempt
+@mutates_tournament
 def delete_payout(request, tournament_id, payout_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
     from .models import Payout
-    payout = get_object_or_404(Payout, id=payout_id, tournament_id=tournament_id)
+    payout = get_object_or_404(
+        Payout.objects.select_related('tournament'), id=payout_id, tournament_id=tournament_id
+    )
+    record_event(
+        payout.tournament, 'payout_deleted', f'Payout for place {payout.place} deleted',
+        payout_id=payout.id, place=payout.place
+    )
     payout.delete()
 
     return JsonResponse({'status': 'payout_deleted'})
 
+@csrf_exempt
+@mutates_tournament
+def clone_tournament(request, tournament_id):
+    """
+    Copies a tournament's settings, levels, payout structure and tables.
+    Body: {name, date (ISO), count} - all optional; `count` weekly copies
+    are created starting at `date` (default: one week after the source).
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    from datetime import timedelta
+    from django.utils.dateparse import parse_datetime
+    from .structures import clone_tournament as clone
+
+    source = get_object_or_404(
+        Tournament.objects.prefetch_related('levels', 'payouts', 'tables'), id=tournament_id
+    )
+    data = json.loads(request.body or '{}')
+
+    count = data.get('count', 1)
+    # bool is an int; "3" or 2.5 are not counts either
+    if type(count) is not int or not 1 <= count <= 52:
+        return JsonResponse({'error': 'count must be between 1 and 52'}, status=400)
+
+    date = source.date + timedelta(weeks=1)
+    if data.get('date'):
+        date = parse_datetime(data['date'])
+        if date is None:
+            return JsonResponse({'error': 'Invalid date'}, status=400)
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+
+    overrides = {'name': data['name']} if data.get('name') else {}
+    clones = [
+        clone(source, date=date + timedelta(weeks=week), **overrides)
+        for week in range(count)
+    ]
+
+    return JsonResponse({
+        'status': 'cloned',
+        'tournaments': [
+            {'id': t.id, 'name': t.name, 'date': t.date.isoformat()} for t in clones
+        ]
+    })
+
 # --- Statistics API ---
 
-def paid_tournament_results(request):
+@precompressed
+async def paid_tournament_results(request):
     """
     Returns tournament results matrix for PAID tournaments.
     Shows player placements across all finished PAID tournaments.
@@ -1229,7 +1464,7 @@ def paid_tournament_results(request):
 
     tournaments = tournaments.order_by('date')
 
-    if not tournaments.exists():
+    if not await tournaments.aexists():
         return JsonResponse({'players': [], 'tournaments': []})
 
     # Get all players who participated in any PAID tournament
@@ -1242,29 +1477,28 @@ def paid_tournament_results(request):
 
     # Build tournament list
     tournaments_data = []
-    for t in tournaments:
+    async for t in tournaments:
         tournaments_data.append({
             'id': t.id,
             'name': t.name,
             'date': t.date.isoformat() if t.date else None
         })
 
+    # All PAID results in one query, grouped by player
+    results_by_player = {}
+    registrations = Registration.objects.filter(
+        tournament__type='PAID',
+        tournament__status='FINISHED'
+    ).values_list('player_id', 'tournament_id', 'place')
+    async for player_id, tournament_id, place in registrations:
+        results_by_player.setdefault(player_id, {})[tournament_id] = {
+            'place': place
+        }
+
     # Build players data with results matrix
     players_data = []
-    for player in players:
-        results = {}
-
-        # Get all registrations for this player in PAID tournaments
-        registrations = Registration.objects.filter(
-            player=player,
-            tournament__type='PAID',
-            tournament__status='FINISHED'
-        ).select_related('tournament')
-
-        for reg in registrations:
-            results[reg.tournament_id] = {
-                'place': reg.place
-            }
+    async for player in players:
+        results = results_by_player.get(player.id, {})
 
         players_data.append({
             'player_id': player.id,
@@ -1277,7 +1511,7 @@ def paid_tournament_results(request):
         'players': players_data
     })
 
-def paid_payout_leaders(request):
+async def paid_payout_leaders(request):
     """
     Returns leaderboard of players by total winnings in PAID tournaments.
     """
@@ -1288,6 +1522,23 @@ def paid_payout_leaders(request):
     date_from = request.GET.get('date_from')
     date_to = request.GET.get('date_to')
 
+    if not date_from and not date_to:
+        # All-time board: straight from the career stats rollup
+        from .models import PlayerStats
+        rows = PlayerStats.objects.filter(
+            season=PlayerStats.CAREER, paid_winnings__gt=0
+        ).select_related('player').order_by('-paid_winnings', 'player_id')
+        return JsonResponse({'leaders': [
+            {
+                'player_id': row.player_id,
+                'player_name': str(row.player),
+                'total_winnings': float(row.paid_winnings),
+                'tournaments_played': row.paid_games,
+                'first_places': row.paid_wins
+            }
+            async for row in rows
+        ]})
+
     # Get all players who have received payouts
     payouts_query = Payout.objects.filter(
         tournament__type='PAID',
@@ -1300,49 +1551,37 @@ def paid_payout_leaders(request):
     if date_to:
         payouts_query = payouts_query.filter(tournament__date__lte=date_to)
 
-    players_with_payouts = payouts_query.values('player_id').distinct()
+    # Total winnings per player
+    winnings = {
+        row['player_id']: row['total'] or 0
+        async for row in payouts_query.values('player_id').annotate(total=Sum('amount'))
+    }
 
-    leaders = []
+    # Tournaments played and first places per player
+    tournaments_query = Registration.objects.filter(
+        player_id__in=list(winnings),
+        tournament__type='PAID',
+        tournament__status='FINISHED'
+    )
+    if date_from:
+        tournaments_query = tournaments_query.filter(tournament__date__gte=date_from)
+    if date_to:
+        tournaments_query = tournaments_query.filter(tournament__date__lte=date_to)
+    played = {
+        row['player_id']: row
+        async for row in tournaments_query.values('player_id').annotate(
+            played=Count('id'), first_places=Count('id', filter=Q(place=1))
+        )
+    }
 
-    for p in players_with_payouts:
-        player = Player.objects.get(id=p['player_id'])
+    players = await Player.objects.ain_bulk(list(winnings))
 
-        # Calculate total winnings
-        winnings_query = Payout.objects.filter(
-            player=player,
-            tournament__type='PAID',
-            tournament__status='FINISHED'
-        )
-        if date_from:
-            winnings_query = winnings_query.filter(tournament__date__gte=date_from)
-        if date_to:
-            winnings_query = winnings_query.filter(tournament__date__lte=date_to)
-        total_winnings = winnings_query.aggregate(total=Sum('amount'))['total'] or 0
-
-        # Count tournaments played
-        tournaments_query = Registration.objects.filter(
-            player=player,
-            tournament__type='PAID',
-            tournament__status='FINISHED'
-        )
-        if date_from:
-            tournaments_query = tournaments_query.filter(tournament__date__gte=date_from)
-        if date_to:
-            tournaments_query = tournaments_query.filter(tournament__date__lte=date_to)
-        tournaments_played = tournaments_query.count()
-
-        # Count first places
-        first_places_query = Registration.objects.filter(
-            player=player,
-            tournament__type='PAID',
-            tournament__status='FINISHED',
-            place=1
-        )
-        if date_from:
-            first_places_query = first_places_query.filter(tournament__date__gte=date_from)
-        if date_to:
-            first_places_query = first_places_query.filter(tournament__date__lte=date_to)
-        first_places = first_places_query.count()
+    leaders = []
+
+    for player_id, total_winnings in winnings.items():
+        player = players[player_id]
+        tournaments_played = played.get(player_id, {}).get('played', 0)
+        first_places = played.get(player_id, {}).get('first_places', 0)
 
         leaders.append({
             'player_id': player.id,
@@ -1357,7 +1596,7 @@ def paid_payout_leaders(request):
 
     return JsonResponse({'leaders': leaders})
 
-def paid_rebuy_leaders(request):
+async def paid_rebuy_leaders(request):
     """
     Returns leaderboard of players by total rebuys in PAID tournaments.
     """
@@ -1368,6 +1607,23 @@ def paid_rebuy_leaders(request):
     date_from = request.GET.get('date_from')
     date_to = request.GET.get('date_to')
 
+    if not date_from and not date_to:
+        # All-time board: straight from the career stats rollup
+        from .models import PlayerStats
+        rows = PlayerStats.objects.filter(
+            season=PlayerStats.CAREER, rebuys__gt=0
+        ).select_related('player').order_by('-rebuys', 'player_id')
+        return JsonResponse({'leaders': [
+            {
+                'player_id': row.player_id,
+                'player_name': str(row.player),
+                'total_rebuys': row.rebuys,
+                'tournaments_played': row.paid_games,
+                'avg_rebuys': round(row.rebuys / row.paid_games, 2)
+            }
+            async for row in rows
+        ]})
+
     # Get all players who participated in PAID tournaments
     rebuys_query = Registration.objects.filter(
         tournament__type='PAID',
@@ -1384,10 +1640,13 @@ def paid_rebuy_leaders(request):
         tournaments_count=Count('id')
     ).filter(total_rebuys__gt=0).order_by('-total_rebuys')
 
+    players_with_rebuys = [p async for p in players_with_rebuys]
+    players = await Player.objects.ain_bulk([p['player_id'] for p in players_with_rebuys])
+
     leaders = []
 
     for p in players_with_rebuys:
-        player = Player.objects.get(id=p['player_id'])
+        player = players[p['player_id']]
 
         total_rebuys = p['total_rebuys'] or 0
         tournaments_played = p['tournaments_count']
@@ -1403,7 +1662,8 @@ def paid_rebuy_leaders(request):
 
     return JsonResponse({'leaders': leaders})
 
-def free_tournament_results(request):
+@precompressed
+async def free_tournament_results(request):
     """
     Returns tournament results matrix for FREE tournaments.
     Shows player placements across all finished FREE tournaments.
@@ -1446,7 +1706,7 @@ def free_tournament_results(request):
 
     tournaments = tournaments.order_by('date')
 
-    if not tournaments.exists():
+    if not await tournaments.aexists():
         return JsonResponse({'players': [], 'tournaments': []})
 
     # Get all players who participated in any FREE tournament
@@ -1459,30 +1719,29 @@ def free_tournament_results(request):
 
     # Build tournament list
     tournaments_data = []
-    for t in tournaments:
+    async for t in tournaments:
         tournaments_data.append({
             'id': t.id,
             'name': t.name,
             'date': t.date.isoformat() if t.date else None
         })
 
+    # All FREE results in one query, grouped by player
+    results_by_player = {}
+    registrations = Registration.objects.filter(
+        tournament__type='FREE',
+        tournament__status='FINISHED'
+    ).values_list('player_id', 'tournament_id', 'place', 'points')
+    async for player_id, tournament_id, place, points in registrations:
+        results_by_player.setdefault(player_id, {})[tournament_id] = {
+            'place': place,
+            'points': points or 0
+        }
+
     # Build players data with results matrix
     players_data = []
-    for player in players:
-        results = {}
-
-        # Get all registrations for this player in FREE tournaments
-        registrations = Registration.objects.filter(
-            player=player,
-            tournament__type='FREE',
-            tournament__status='FINISHED'
-        ).select_related('tournament')
-
-        for reg in registrations:
-            results[reg.tournament_id] = {
-                'place': reg.place,
-                'points': reg.points or 0
-            }
+    async for player in players:
+        results = results_by_player.get(player.id, {})
 
         players_data.append({
             'player_id': player.id,
@@ -1495,7 +1754,7 @@ def free_tournament_results(request):
         'players': players_data
     })
 
-def free_bounty_leaders(request):
+async def free_bounty_leaders(request):
     """
     Returns leaderboard of players by total bounties in FREE tournaments.
     """
@@ -1525,6 +1784,23 @@ def free_bounty_leaders(request):
         if season in season_ranges:
             date_from, date_to = season_ranges[season]
 
+    if not date_from and not date_to:
+        # All-time board: straight from the career stats rollup
+        from .models import PlayerStats
+        rows = PlayerStats.objects.filter(
+            season=PlayerStats.CAREER, bounties__gt=0
+        ).select_related('player').order_by('-bounties', 'player_id')
+        return JsonResponse({'leaders': [
+            {
+                'player_id': row.player_id,
+                'player_name': str(row.player),
+                'total_bounties': row.bounties,
+                'tournaments_played': row.free_games,
+                'avg_bounties': round(row.bounties / row.free_games, 2)
+            }
+            async for row in rows
+        ]})
+
     # Get all players who participated in FREE tournaments
     bounties_query = Registration.objects.filter(
         tournament__type='FREE',
@@ -1541,10 +1817,13 @@ def free_bounty_leaders(request):
         tournaments_count=Count('id')
     ).filter(total_bounties__gt=0).order_by('-total_bounties')
 
+    players_with_bounties = [p async for p in players_with_bounties]
+    players = await Player.objects.ain_bulk([p['player_id'] for p in players_with_bounties])
+
     leaders = []
 
     for p in players_with_bounties:
-        player = Player.objects.get(id=p['player_id'])
+        player = players[p['player_id']]
 
         total_bounties = p['total_bounties'] or 0
         tournaments_played = p['tournaments_count']
@@ -1560,7 +1839,7 @@ def free_bounty_leaders(request):
 
     return JsonResponse({'leaders': leaders})
 
-def get_tournament_years(request):
+async def get_tournament_years(request):
     """
     Returns list of unique years from tournaments for season filtering.
     """
@@ -1575,4 +1854,4 @@ def get_tournament_years(request):
         year=ExtractYear('date')
     ).values_list('year', flat=True).distinct().order_by('-year')
 
-    return JsonResponse({'years': list(years)})
+    return JsonResponse({'years': [year async for year in years]})
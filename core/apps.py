@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .metrics import install_query_timer
+
+        # Query counts and DB time for RequestMetricsMiddleware
+        connection_created.connect(install_query_timer, dispatch_uid='core_query_timer')
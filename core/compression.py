@@ -0,0 +1,119 @@
+import gzip
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # optional, see requirements.txt
+    brotli = None
+
+COMPRESSIBLE_TYPES = _lazy_re_compile(r'^(text/|application/(json|javascript|xml)|application/.+\+(json|xml))')
+
+# Pages carry the CSRF token next to reflected input, which a compressed
+# length leaks (BREACH). They only get gzip with Django's random padding.
+PAGE_TYPES = _lazy_re_compile(r'^text/html')
+
+Q_VALUE = _lazy_re_compile(r'(?:^|;)\s*q\s*=\s*([^;\s]*)')
+
+
+def available_encodings():
+    """Supported codings, preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def q_value(params):
+    """The q parameter of one Accept-Encoding entry: 1 when absent, 0 when malformed"""
+    match = Q_VALUE.search(params)
+    if match is None:
+        return 1
+    try:
+        q = float(match.group(1))
+    except ValueError:
+        return 0
+    return q if 0 <= q <= 1 else 0
+
+
+def accepted_encodings(request):
+    """Codings the client accepts with a non-zero q-value"""
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding and q_value(params) > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def negotiate(request, encodings=None):
+    """Best coding both sides support, or None for identity"""
+    accepted = accepted_encodings(request)
+    for encoding in encodings or available_encodings():
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+
+def set_encoding(response, encoding, body):
+    response.content = body
+    response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(body))
+    # The compressed representation is a different entity (see Django's GZipMiddleware)
+    if response.has_header('ETag') and not response['ETag'].startswith('W/'):
+        response['ETag'] = 'W/' + response['ETag']
+
+
+class CompressionMiddleware:
+    """
+    Compresses text and JSON responses of at least COMPRESSION_MIN_BYTES with
+    Brotli (when installed) or gzip, whichever the client prefers of the two.
+    HTML pages get gzip only, padded like GZipMiddleware does against BREACH.
+    Streaming responses (event streams) and responses that already carry a
+    Content-Encoding, like the pre-compressed stats, pass through untouched.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+            return response
+
+        patch_vary_headers(response, ['Accept-Encoding'])
+        if len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+
+        if PAGE_TYPES.match(response['Content-Type']):
+            encoding = negotiate(request, ('gzip',))
+            if encoding:
+                body = compress_string(response.content, max_random_bytes=GZipMiddleware.max_random_bytes)
+        else:
+            encoding = negotiate(request)
+            if encoding:
+                body = compress(response.content, encoding)
+        if encoding and len(body) < len(response.content):
+            set_encoding(response, encoding, body)
+        return response
@@ -0,0 +1,236 @@
+import asyncio
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, models
+from django.utils import timezone
+from .models import Tournament, GameEvent
+from .serialization import dumps
+
+
+def level_data(level):
+    return {
+        'number': level.level_number,
+        'small_blind': level.small_blind,
+        'big_blind': level.big_blind,
+        'ante': level.ante,
+        'is_break': level.is_break,
+    }
+
+
+def field_stats():
+    """Aggregates over a tournament's registrations for status_payload"""
+    return {
+        'players_remaining': models.Count('id', filter=models.Q(status='REGISTERED')),
+        'total_entries': models.Count('id'),
+        'total_rebuys': models.Sum('rebuys'),
+        'total_addons': models.Sum('addons'),
+    }
+
+
+def status_payload(tournament, levels, stats=None):
+    """
+    The get_status body: clock, current/next level and field stats. Pass
+    `stats` (the field_stats() aggregate) when it was fetched already, as
+    the async view does.
+    """
+    remaining = 0
+    if tournament.status == 'RUNNING' and tournament.level_started_at:
+        elapsed = (timezone.now() - tournament.level_started_at).total_seconds()
+        remaining = max(0, int(tournament.timer_seconds - elapsed))
+    elif tournament.timer_seconds is not None:
+        remaining = tournament.timer_seconds
+    else:
+        # Fallback if timer_seconds is None (e.g. not started yet)
+        if levels:
+            remaining = levels[tournament.current_level_index].duration * 60
+
+    current_level = levels[tournament.current_level_index] if levels else None
+
+    # Get next level
+    next_level = None
+    if levels and tournament.current_level_index < len(levels) - 1:
+        next_level = levels[tournament.current_level_index + 1]
+
+    # Calculate stats
+    if stats is None:
+        stats = tournament.registrations.aggregate(**field_stats())
+    players_remaining = stats['players_remaining']
+    total_entries = stats['total_entries'] # Includes rebuys/addons in aggregation logic below if needed, but for now strict entries
+
+    total_rebuys = stats['total_rebuys'] or 0
+    total_addons = stats['total_addons'] or 0
+
+    # Total chip count
+    total_chips = (total_entries * tournament.stack) + \
+                  (total_rebuys * tournament.stack) + \
+                  (total_addons * tournament.stack)
+
+    average_stack = total_chips / players_remaining if players_remaining > 0 else 0
+
+    return {
+        'status': tournament.status,
+        'remaining_seconds': remaining,
+        'level': level_data(current_level) if current_level else None,
+        'next_level': level_data(next_level) if next_level else None,
+        'players_remaining': players_remaining,
+        'total_entries': total_entries + total_rebuys + total_addons, # Total logical entries
+        'average_stack': round(average_stack),
+        'prize_pool': (total_entries + total_rebuys + total_addons) * (tournament.buy_in or 0)
+    }
+
+
+def display_state(tournament, sequence):
+    """
+    Everything a TV needs to run the clock on its own: the level schedule and,
+    while the clock runs, the absolute deadline of the current level or break.
+    """
+    levels = list(tournament.levels.order_by('level_number'))
+    state = status_payload(tournament, levels)
+
+    deadline = None
+    if tournament.status in ('RUNNING', 'BREAK') and tournament.level_started_at and tournament.timer_seconds is not None:
+        deadline = tournament.level_started_at.timestamp() + tournament.timer_seconds
+
+    state.update({
+        'sequence': sequence,
+        'name': tournament.name,
+        'deadline': deadline,
+        'current_level_index': tournament.current_level_index,
+        # [number, small blind, big blind, ante, minutes, is_break]
+        'levels': [
+            [l.level_number, l.small_blind, l.big_blind, l.ante, l.duration, l.is_break] for l in levels
+        ],
+    })
+    return state
+
+
+class DisplayHub:
+    """
+    Latest display state per tournament, shared by every stream in the
+    process. A stream asking for it costs at most one journal lookup per
+    DISPLAY_STREAM_POLL_SECONDS per tournament, however many screens are
+    connected; the state is only rebuilt when the journal moved.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, tournament_id):
+        """Returns (sequence, state) or raises Tournament.DoesNotExist"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(tournament_id)
+        if entry and now - entry['checked'] < settings.DISPLAY_STREAM_POLL_SECONDS:
+            return entry['sequence'], entry['state']
+
+        sequence = GameEvent.objects.filter(tournament_id=tournament_id).aggregate(
+            models.Max('sequence')
+        )['sequence__max'] or 0
+        if entry is None or entry['sequence'] != sequence:
+            tournament = Tournament.objects.get(id=tournament_id)
+            entry = {'sequence': sequence, 'state': display_state(tournament, sequence)}
+        else:
+            entry = dict(entry)
+        entry['checked'] = now
+
+        with self.lock:
+            self.entries[tournament_id] = entry
+        return entry['sequence'], entry['state']
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+hub = DisplayHub()
+
+
+def sse(data, event=None, event_id=None):
+    lines = []
+    if event:
+        lines.append(f'event: {event}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {data}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class DisplayStream:
+    """
+    Server-sent events for one screen: the state on connect (unless the
+    screen's Last-Event-ID is already current) and after every journal
+    change, a comment line as keepalive, and a clean end after `seconds` so
+    proxies are recycled (EventSource reconnects on its own after `retry`).
+
+    Iterate it asynchronously under ASGI. Under WSGI an open stream holds a
+    worker, so pass seconds=0 there: the stream sends what changed and ends,
+    and the screens short-poll every `retry`.
+    """
+
+    KEEPALIVE_SECONDS = 15
+    RETRY_MS = 3000
+
+    def __init__(self, tournament_id, last_sequence=None, seconds=0):
+        self.tournament_id = tournament_id
+        self.last_sequence = last_sequence
+        self.seconds = seconds
+
+    def messages(self):
+        """Yields (message, or None when there is nothing to send yet); the caller sleeps between"""
+        started = last_sent = time.monotonic()
+        sent_sequence = self.last_sequence
+        yield f'retry: {self.RETRY_MS}\n\n'
+        while True:
+            try:
+                sequence, state = hub.get(self.tournament_id)
+            except Tournament.DoesNotExist:
+                return
+            now = time.monotonic()
+            if sequence != sent_sequence:
+                sent_sequence, last_sent = sequence, now
+                # Stamped on send so screens can correct their clock skew
+                data = dumps({**state, 'server_time': time.time()}).decode()
+                yield sse(data, event='state', event_id=sequence)
+            elif now - last_sent >= self.KEEPALIVE_SECONDS:
+                last_sent = now
+                yield ': keepalive\n\n'
+            if now - started >= self.seconds:
+                return
+            yield None
+
+    def __iter__(self):
+        for message in self.messages():
+            if message is None:
+                time.sleep(settings.DISPLAY_STREAM_POLL_SECONDS)
+            else:
+                yield message
+
+    @staticmethod
+    def step(messages):
+        """
+        The next message, run like a request: the executor threads it lands
+        on never see request_finished, so drop their connections here once
+        broken or past CONN_MAX_AGE, rather than leak one per thread
+        """
+        close_old_connections()
+        try:
+            return next(messages, StopIteration)
+        finally:
+            close_old_connections()
+
+    async def __aiter__(self):
+        messages = self.messages()
+        # Not thread-sensitive: streams must not queue behind each other (and
+        # every other sync call) on the one shared thread
+        step = sync_to_async(self.step, thread_sensitive=False)
+        while True:
+            message = await step(messages)
+            if message is StopIteration:
+                return
+            if message is None:
+                await asyncio.sleep(settings.DISPLAY_STREAM_POLL_SECONDS)
+            else:
+                yield message
@@ -0,0 +1,103 @@
+import functools
+from django.db import models, transaction
+from django.http import Http404
+from .models import Tournament, GameEvent
+from .replay import SNAPSHOT_INTERVAL, write_snapshot
+
+
+def timer_state(tournament):
+    """
+    Snapshot of the tournament clock fields, stored in timer/level events
+    so the journal alone is enough to rebuild the clock.
+    """
+    return {
+        'status': tournament.status,
+        'current_level_index': tournament.current_level_index,
+        'timer_seconds': tournament.timer_seconds,
+        'level_started_at': tournament.level_started_at,
+        'break_start_time': tournament.break_start_time,
+        'break_duration_minutes': tournament.break_duration_minutes,
+    }
+
+
+def write_lock(tournament_id):
+    """
+    Takes the tournament's write lock; returns False if there is no such
+    tournament. Must be called inside a transaction, before its first read.
+
+    A no-op UPDATE rather than select_for_update: a row lock on PostgreSQL,
+    and on SQLite (which ignores SELECT ... FOR UPDATE) the database write
+    lock. A SQLite transaction that has already read can't wait for that
+    lock: it fails at once with "database is locked". Taken first, it waits
+    out the busy timeout like any other writer.
+    """
+    return bool(Tournament.objects.filter(id=tournament_id).update(registration_closed=models.F('registration_closed')))
+
+
+def mutates_tournament(view):
+    """
+    For views that change a tournament: runs the view and its journal
+    events in one transaction that starts with the tournament's write lock.
+    """
+    @functools.wraps(view)
+    @transaction.atomic
+    def wrapper(request, tournament_id, *args, **kwargs):
+        # Other methods only get the view's 405
+        if request.method == 'POST' and not write_lock(tournament_id):
+            raise Http404('Tournament not found')
+        return view(request, tournament_id, *args, **kwargs)
+    return wrapper
+
+
+def record_event(tournament, event_type, description, **payload):
+    """
+    Append an event to the tournament journal.
+
+    Must be called inside the transaction that performs the mutation, so the
+    journal and the tournament state are committed (or rolled back) together.
+    The tournament row is locked to hand out consecutive sequence numbers.
+    """
+    list(Tournament.objects.select_for_update().filter(id=tournament.id).values_list('id', flat=True))
+    last_sequence = GameEvent.objects.filter(tournament_id=tournament.id).aggregate(
+        models.Max('sequence')
+    )['sequence__max'] or 0
+
+    event = GameEvent.objects.create(
+        tournament_id=tournament.id,
+        sequence=last_sequence + 1,
+        type=event_type,
+        description=description,
+        payload=payload,
+    )
+
+    if event.sequence % SNAPSHOT_INTERVAL == 0:
+        write_snapshot(tournament)
+
+    transaction.on_commit(lambda: after_commit(tournament.id, event_type, payload))
+
+    # The stats pages only show finished tournaments
+    if event_type == 'tournament_finished' or tournament.status == 'FINISHED':
+        from .stats_cache import bump_stats_version
+        transaction.on_commit(bump_stats_version)
+
+    return event
+
+
+def after_commit(tournament_id, event_type, payload):
+    """Brings the player stats rollup up to date, then drops the cached pages showing it"""
+    from .fragments import affected_players, invalidate_for_event
+    from .player_stats import refresh_for_event
+
+    player_ids = affected_players(tournament_id, event_type, payload)
+    refresh_for_event(event_type, player_ids)
+    invalidate_for_event(tournament_id, player_ids)
+
+
+def serialize_event(event):
+    return {
+        'sequence': event.sequence,
+        'type': event.type,
+        'description': event.description,
+        'payload': event.payload,
+        'timestamp': event.timestamp.isoformat(),
+    }
@@ -0,0 +1,54 @@
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+# Events that change every entrant's profile: payouts (their winnings) and
+# the finish (which finalizes the results of the players still in)
+ENTRANT_EVENTS = {'payouts_generated', 'payout_added', 'payout_updated', 'payout_deleted', 'tournament_finished'}
+
+
+def fragment_cache():
+    return caches[settings.FRAGMENT_CACHE]
+
+
+def _key(kind, object_id):
+    return f'fragment-version:{kind}:{object_id}'
+
+
+def fragment_version(kind, object_id):
+    """
+    Current version of a tournament's or player's rendered fragments, for
+    {% cache %} keys. No database query: versions live in the cache and
+    are replaced by invalidate().
+    """
+    cache = fragment_cache()
+    key = _key(kind, object_id)
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key) or 0
+
+
+def invalidate(kind, object_ids):
+    version = time.time_ns()
+    fragment_cache().set_many({_key(kind, object_id): version for object_id in object_ids}, timeout=None)
+
+
+def affected_players(tournament_id, event_type, payload):
+    """
+    Players whose profile an event changes: the one it's about, and every
+    entrant for payout changes and the finish.
+    """
+    from .models import Registration
+
+    player_ids = set()
+    if payload.get('player_id'):
+        player_ids.add(payload['player_id'])
+    if event_type in ENTRANT_EVENTS:
+        player_ids.update(Registration.objects.filter(tournament_id=tournament_id).values_list('player_id', flat=True))
+    return player_ids
+
+
+def invalidate_for_event(tournament_id, player_ids):
+    """Every event changes the tournament's info page, and the profiles of affected_players()"""
+    invalidate('tournament', [tournament_id])
+    if player_ids:
+        invalidate('player', player_ids)
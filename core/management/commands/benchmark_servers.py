@@ -0,0 +1,123 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.models import Tournament
+
+# Command line per server: (module that must be installed, argv)
+SERVERS = {
+    # Pre-fork sync workers: one request per process at a time
+    'gunicorn': lambda port, workers: ('gunicorn', [
+        sys.executable, '-m', 'gunicorn', 'poker_system.wsgi:application',
+        '--workers', str(workers), '--bind', f'localhost:{port}', '--log-level', 'warning',
+    ]),
+    # Event loop per process: async views, waiting requests don't hold a worker
+    'uvicorn': lambda port, workers: ('uvicorn', [
+        sys.executable, '-m', 'uvicorn', 'poker_system.asgi:application',
+        '--workers', str(workers), '--host', 'localhost', '--port', str(port), '--log-level', 'warning',
+    ]),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the same read-heavy load (loadtest without writers) against gunicorn sync workers '
+        'and uvicorn, each started here on the same database, and compares them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument('--gunicorn-workers', type=int, default=4)
+        parser.add_argument('--uvicorn-workers', type=int, default=1)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--tournament', type=int, help='Tournament to poll (default: the latest running one)')
+        parser.add_argument('--duration', type=int, default=30, help='Seconds per server')
+        parser.add_argument('--control-pages', type=int, default=200)
+        parser.add_argument('--control-interval', type=float, default=2)
+        parser.add_argument('--lobby-displays', type=int, default=50)
+        parser.add_argument('--lobby-interval', type=float, default=5)
+        parser.add_argument('--tv-screens', type=int, default=50)
+        parser.add_argument('--output', help='JSON report path (default: benchmark-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        if options['tournament']:
+            tournament = Tournament.objects.filter(id=options['tournament']).first()
+        else:
+            tournament = Tournament.objects.filter(status='RUNNING').order_by('-date').first()
+        if tournament is None:
+            raise CommandError('Tournament not found (pass --tournament or start one)')
+
+        reports = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for server in options['servers']:
+                module, argv = SERVERS[server](options['port'], options[f'{server}_workers'])
+                if importlib.util.find_spec(module) is None:
+                    self.stdout.write(self.style.WARNING(f'{server}: not installed, skipped'))
+                    continue
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{server} ({options[f'{server}_workers']} worker(s))"))
+                path = os.path.join(directory, f'{server}.json')
+                with open(os.path.join(directory, f'{server}.log'), 'w') as log:
+                    process = subprocess.Popen(argv, cwd=settings.BASE_DIR, stdout=log, stderr=subprocess.STDOUT)
+                    try:
+                        self.wait_ready(process, f"http://localhost:{options['port']}/api/tournament/{tournament.id}/status/")
+                        call_command(
+                            'loadtest', url=f"http://localhost:{options['port']}", tournament=tournament.id,
+                            duration=options['duration'],
+                            control_pages=options['control_pages'], control_interval=options['control_interval'],
+                            lobby_displays=options['lobby_displays'], lobby_interval=options['lobby_interval'],
+                            tv_screens=options['tv_screens'], floor_staff=0, bot_users=0, lock_interval=0,
+                            output=path, stdout=self.stdout,
+                        )
+                    finally:
+                        process.terminate()
+                        process.wait(timeout=30)
+                with open(path) as f:
+                    reports[server] = {'workers': options[f'{server}_workers'], **json.load(f)}
+
+        if not reports:
+            raise CommandError('No server could be started')
+
+        self.compare(reports)
+        output = options['output'] or f"benchmark-{timezone.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w') as f:
+            json.dump(reports, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Saved to {output}'))
+
+    def wait_ready(self, process, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'Server exited with code {process.returncode}')
+            try:
+                if httpx.get(url, timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f'Server not ready after {timeout}s')
+
+    def compare(self, reports):
+        self.stdout.write(self.style.MIGRATE_HEADING('Comparison'))
+        endpoints = sorted({endpoint for report in reports.values() for endpoint in report['endpoints']})
+        for endpoint in endpoints:
+            self.stdout.write(f'  {endpoint}')
+            for server, report in reports.items():
+                stats = report['endpoints'].get(endpoint)
+                if stats is None:
+                    self.stdout.write(f'    {server:<9} no responses')
+                    continue
+                self.stdout.write(
+                    f"    {server:<9} {stats['requests']:>6} req {stats['rps']:>7.1f}/s "
+                    f"p50={stats['p50']} p95={stats['p95']} p99={stats['p99']} ms  errors={stats['errors']}"
+                )
+        for server, report in reports.items():
+            self.stdout.write(f"  {server:<11} {report['requests']} requests, {report['rps']:.1f}/s overall")
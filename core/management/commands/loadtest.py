@@ -0,0 +1,296 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.utils import timezone
+from core.models import Tournament
+
+
+def percentiles(samples):
+    """p50/p95/p99/max of a list of milliseconds"""
+    if not samples:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    samples = sorted(samples)
+    quantiles = statistics.quantiles(samples, n=100, method='inclusive') if len(samples) > 1 else samples * 99
+    return {
+        'p50': round(quantiles[49], 1),
+        'p95': round(quantiles[94], 1),
+        'p99': round(quantiles[98], 1),
+        'max': round(samples[-1], 1),
+    }
+
+
+def probe_lock_wait(timeout_ms):
+    """
+    How long a writer currently waits for the database: (ms, timed out).
+
+    SQLite: time to take the write lock (BEGIN IMMEDIATE), released at once.
+    The probe waits at most timeout_ms (its own busy_timeout) so it doesn't
+    queue behind the writers it measures; still locked by then is a timeout
+    sample of timeout_ms.
+    PostgreSQL: the longest wait among sessions blocked on a lock, read from
+    pg_stat_activity without taking any.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'PRAGMA busy_timeout = {int(timeout_ms)}')
+            started = time.perf_counter()
+            try:
+                cursor.execute('BEGIN IMMEDIATE')
+            except OperationalError:  # database is locked
+                return timeout_ms, True
+            waited = (time.perf_counter() - started) * 1000
+            cursor.execute('ROLLBACK')
+            return waited, False
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT coalesce(max(extract(epoch FROM now() - query_start)), 0) * 1000 "
+                "FROM pg_stat_activity WHERE wait_event_type = 'Lock'"
+            )
+            return float(cursor.fetchone()[0]), False
+    return None
+
+
+class CardRoom:
+    """Simulated clients of one running tournament; every request is timed per endpoint"""
+
+    def __init__(self, client, tournament_id, deadline):
+        self.client = client
+        self.base = f'/api/tournament/{tournament_id}'
+        self.deadline = deadline
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.lock_waits = []
+        self.lock_timeouts = 0
+
+    def running(self):
+        return time.monotonic() < self.deadline
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(min(seconds, max(0, self.deadline - time.monotonic())))
+
+    async def call(self, endpoint, path, data=None):
+        started = time.perf_counter()
+        try:
+            if data is None:
+                response = await self.client.get(path)
+            else:
+                response = await self.client.post(path, json=data)
+            self.statuses[endpoint][response.status_code] += 1
+        except httpx.HTTPError as e:
+            self.statuses[endpoint][type(e).__name__] += 1
+            response = None
+        self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+        return response
+
+    async def call_json(self, endpoint, path, data=None):
+        response = await self.call(endpoint, path, data)
+        return response.json() if response is not None and response.status_code == 200 else None
+
+    # Clients
+
+    async def control_page(self, interval):
+        # Each page opens at a different moment, like real screens
+        await self.sleep(random.uniform(0, interval))
+        while self.running():
+            await self.call('status', f'{self.base}/status/')
+            await self.sleep(interval)
+
+    async def lobby_display(self, interval):
+        # tournament_info: tables every interval, payouts every other refresh
+        await self.sleep(random.uniform(0, interval))
+        refresh = 0
+        while self.running():
+            await self.call('tables', f'{self.base}/tables/')
+            if refresh % 2 == 0:
+                await self.call('payouts', f'{self.base}/payouts/')
+            refresh += 1
+            await self.sleep(interval)
+
+    async def tv_screen(self):
+        """A lobby TV holding the display stream open; 'stream' times the first state event"""
+        await self.sleep(random.uniform(0, 1))
+        # Reconnects like EventSource: after the server's retry delay, with the last event id
+        stream = {'last_id': None, 'retry': 3}
+        while self.running():
+            try:
+                await asyncio.wait_for(self.watch_stream(stream), timeout=max(0.1, self.deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                return
+            except httpx.HTTPError as e:
+                self.statuses['stream'][type(e).__name__] += 1
+            await self.sleep(stream['retry'])
+
+    async def watch_stream(self, stream):
+        started = time.perf_counter()
+        headers = {'Last-Event-ID': stream['last_id']} if stream['last_id'] else {}
+        async with self.client.stream('GET', f'{self.base}/stream/', headers=headers) as response:
+            self.statuses['stream'][response.status_code] += 1
+            if response.status_code != 200:
+                return
+            first = True
+            async for line in response.aiter_lines():
+                if line.startswith('retry: '):
+                    stream['retry'] = int(line[7:]) / 1000
+                elif line.startswith('id: '):
+                    stream['last_id'] = line[4:]
+                elif first and line.startswith('event: state'):
+                    self.latencies['stream'].append((time.perf_counter() - started) * 1000)
+                    first = False
+
+    async def floor_staff(self, interval):
+        await self.sleep(random.uniform(0, interval))
+        while self.running():
+            players = await self.call_json('players', f'{self.base}/players/')
+            playing = [p for p in (players or {}).get('players', []) if p['status'] == 'REGISTERED']
+            if playing:
+                reg = random.choice(playing)
+                action = random.choices(['eliminate', 'rebuy', 'move'], weights=[2, 2, 1])[0]
+                if action == 'move':
+                    await self.move(reg)
+                elif action == 'eliminate':
+                    await self.call('eliminate', f'{self.base}/eliminate/', {'registration_id': reg['id']})
+                else:
+                    await self.call('rebuy', f'{self.base}/rebuy/', {'registration_id': reg['id']})
+            await self.sleep(interval)
+
+    async def move(self, reg):
+        tables = await self.call_json('tables', f'{self.base}/tables/')
+        free_seats = [
+            (table['id'], seat)
+            for table in (tables or {}).get('tables', [])
+            for seat in set(range(1, table['max_seats'] + 1)) - {s['seat_number'] for s in table['seats']}
+        ]
+        if free_seats:
+            table_id, seat = random.choice(free_seats)
+            await self.call('move', f'{self.base}/tables/move/', {
+                'registration_id': reg['id'], 'table_id': table_id, 'seat_number': seat
+            })
+
+    async def bot_user(self, number, window):
+        # Registers once somewhere in the first part of the run
+        await self.sleep(random.uniform(0, window))
+        if self.running():
+            await self.call('register', f'{self.base}/register/', {'name': f'Load {number}'})
+
+    async def lock_sampler(self, executor, interval):
+        loop = asyncio.get_running_loop()
+        # Never wait longer than a probe period, capped at 5 s
+        timeout_ms = min(interval, 5) * 1000
+        while self.running():
+            sample = await loop.run_in_executor(executor, probe_lock_wait, timeout_ms)
+            if sample is not None:
+                waited, timed_out = sample
+                self.lock_waits.append(waited)
+                self.lock_timeouts += timed_out
+            await self.sleep(interval)
+
+
+class Command(BaseCommand):
+    help = 'Load test against a running server, simulating a card room during a live tournament'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=settings.SITE_URL, help='Server under test')
+        parser.add_argument('--tournament', type=int, help='Tournament to play (default: the latest running one)')
+        parser.add_argument('--duration', type=int, default=60, help='Seconds to run')
+        parser.add_argument('--control-pages', type=int, default=10)
+        parser.add_argument('--control-interval', type=float, default=5, help='get_status polling period')
+        parser.add_argument('--lobby-displays', type=int, default=20)
+        parser.add_argument('--lobby-interval', type=float, default=5, help='Tables refresh period')
+        parser.add_argument('--tv-screens', type=int, default=0, help='Lobby TVs holding the display stream open')
+        parser.add_argument('--floor-staff', type=int, default=3)
+        parser.add_argument('--staff-interval', type=float, default=3, help='Seconds between staff actions')
+        parser.add_argument('--bot-users', type=int, default=50, help='Players registering during the run')
+        parser.add_argument('--lock-interval', type=float, default=1, help='DB lock probe period (0 disables)')
+        parser.add_argument('--output', help='JSON report path (default: loadtest-<timestamp>.json)')
+
+    def handle(self, *args, **options):
+        if options['tournament']:
+            tournament = Tournament.objects.filter(id=options['tournament']).first()
+        else:
+            tournament = Tournament.objects.filter(status='RUNNING').order_by('-date').first()
+        if tournament is None:
+            raise CommandError('Tournament not found (pass --tournament or start one)')
+
+        self.stdout.write(f"Load testing {options['url']} with {tournament} for {options['duration']}s")
+        room = asyncio.run(self.run(tournament.id, options))
+        report = self.report(room, tournament, options)
+
+        output = options['output'] or f"loadtest-{timezone.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        for endpoint, stats in report['endpoints'].items():
+            self.stdout.write(
+                f"  {endpoint:<10} {stats['requests']:>6} req {stats['rps']:>7.1f}/s "
+                f"p50={stats['p50']} p95={stats['p95']} p99={stats['p99']} ms  errors={stats['errors']}"
+            )
+        locks = report['lock_waits']
+        self.stdout.write(
+            f"  lock wait  {locks['samples']:>6} probes p50={locks['p50']} p95={locks['p95']} max={locks['max']} ms  "
+            f"timeouts={locks['timeouts']}"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['requests']} requests, {report['rps']:.1f}/s - saved to {output}"
+        ))
+
+    async def run(self, tournament_id, options):
+        # One connection per simulated client, the way real screens connect
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lock-probe')
+        async with httpx.AsyncClient(base_url=options['url'], timeout=60, limits=limits) as client:
+            room = CardRoom(client, tournament_id, time.monotonic() + options['duration'])
+            clients = (
+                [room.control_page(options['control_interval']) for _ in range(options['control_pages'])]
+                + [room.lobby_display(options['lobby_interval']) for _ in range(options['lobby_displays'])]
+                + [room.tv_screen() for _ in range(options['tv_screens'])]
+                + [room.floor_staff(options['staff_interval']) for _ in range(options['floor_staff'])]
+                + [room.bot_user(n, options['duration'] / 2) for n in range(options['bot_users'])]
+            )
+            if options['lock_interval']:
+                clients.append(room.lock_sampler(executor, options['lock_interval']))
+
+            started = time.perf_counter()
+            await asyncio.gather(*clients)
+            room.elapsed = time.perf_counter() - started
+        executor.shutdown()
+        return room
+
+    def report(self, room, tournament, options):
+        endpoints = {}
+        for endpoint, latencies in sorted(room.latencies.items()):
+            statuses = room.statuses[endpoint]
+            endpoints[endpoint] = {
+                'requests': len(latencies),
+                'rps': round(len(latencies) / room.elapsed, 2),
+                'errors': sum(n for status, n in statuses.items() if not (isinstance(status, int) and status < 500)),
+                'statuses': {str(status): n for status, n in statuses.items()},
+                **percentiles(latencies),
+            }
+        requests = sum(stats['requests'] for stats in endpoints.values())
+        return {
+            'started_at': timezone.now().isoformat(),
+            'url': options['url'],
+            'tournament': tournament.id,
+            'database': connection.vendor,
+            'config': {
+                key: options[key] for key in (
+                    'duration', 'control_pages', 'control_interval', 'lobby_displays', 'lobby_interval',
+                    'tv_screens', 'floor_staff', 'staff_interval', 'bot_users', 'lock_interval',
+                )
+            },
+            'elapsed': round(room.elapsed, 2),
+            'requests': requests,
+            'rps': round(requests / room.elapsed, 2),
+            'endpoints': endpoints,
+            'lock_waits': {
+                'samples': len(room.lock_waits), 'timeouts': room.lock_timeouts, **percentiles(room.lock_waits),
+            },
+        }
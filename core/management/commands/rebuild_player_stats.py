@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from core.models import Player
+from core.player_stats import refresh_player_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the player stats rollup from the registrations (after migrating, or to repair drift)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('player_ids', nargs='*', type=int, help='Only these players (default: everyone)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        player_ids = options['player_ids'] or list(Player.objects.order_by('id').values_list('id', flat=True))
+        batch_size = options['batch_size']
+
+        started = time.perf_counter()
+        for start in range(0, len(player_ids), batch_size):
+            refresh_player_stats(player_ids[start:start + batch_size])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {len(player_ids)} player(s) in {elapsed:.1f} s'))
@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Tournament
+from core.replay import replay, current_state, diff_states, restore, write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Replays tournament state from the event journal, verifies it against the database and repairs drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_ids', nargs='*', type=int)
+        parser.add_argument('--active', action='store_true', help='All RUNNING, PAUSED and BREAK tournaments')
+        parser.add_argument('--repair', action='store_true', help='Write the replayed state back to the database')
+        parser.add_argument('--snapshot', action='store_true', help='Write a snapshot of the replayed state')
+        parser.add_argument('--baseline', action='store_true',
+                            help='Snapshot the current database state (for tournaments that predate the journal)')
+
+    def handle(self, *args, **options):
+        tournaments = Tournament.objects.filter(id__in=options['tournament_ids'])
+        if options['active']:
+            tournaments = tournaments | Tournament.objects.filter(status__in=['RUNNING', 'PAUSED', 'BREAK'])
+        if not options['tournament_ids'] and not options['active']:
+            raise CommandError('Pass tournament ids or --active')
+
+        for tournament in tournaments.distinct():
+            started = time.perf_counter()
+
+            if options['baseline']:
+                sequence = tournament.events.order_by('-sequence').values_list('sequence', flat=True).first() or 0
+                write_snapshot(tournament, current_state(tournament), sequence)
+                self.stdout.write(self.style.SUCCESS(f'{tournament}: baseline snapshot at #{sequence}'))
+                continue
+
+            state, sequence = replay(tournament)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            differences = diff_states(state, current_state(tournament))
+
+            self.stdout.write(f'{tournament}: replayed to #{sequence} in {elapsed_ms:.1f} ms')
+            if differences:
+                self.stdout.write(self.style.WARNING(f'  {len(differences)} difference(s):'))
+                for line in differences:
+                    self.stdout.write(f'    {line}')
+                if options['repair']:
+                    updated = restore(tournament, state)
+                    self.stdout.write(self.style.SUCCESS(f'  repaired clock and {updated} registration(s)'))
+            else:
+                self.stdout.write(self.style.SUCCESS('  database matches journal'))
+
+            if options['snapshot']:
+                write_snapshot(tournament, state, sequence)
+                self.stdout.write(f'  snapshot written at #{sequence}')
@@ -0,0 +1,27 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import TournamentSeries
+from core.structures import schedule_series
+
+
+class Command(BaseCommand):
+    help = 'Creates upcoming tournaments for active series (run daily, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('series_ids', nargs='*', type=int)
+        parser.add_argument('--weeks', type=int, default=4, help='How far ahead to schedule')
+
+    def handle(self, *args, **options):
+        series = TournamentSeries.objects.filter(is_active=True).select_related('template').prefetch_related(
+            'template__levels'
+        )
+        if options['series_ids']:
+            series = series.filter(id__in=options['series_ids'])
+
+        start = timezone.now()
+        created = schedule_series(series, start, start + timedelta(weeks=options['weeks']))
+
+        for tournament in created:
+            self.stdout.write(f'  {tournament}')
+        self.stdout.write(self.style.SUCCESS(f'Scheduled {len(created)} tournament(s)'))
@@ -0,0 +1,211 @@
+import contextvars
+import cProfile
+import os
+import random
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Upper bounds of the histogram buckets, per metric
+BUCKETS = {
+    'request_duration_seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'db_queries': (1, 2, 5, 10, 20, 50, 100, 200, 500),
+    'db_duration_seconds': (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+    'response_bytes': (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+}
+
+DESCRIPTIONS = {
+    'request_duration_seconds': 'Wall time spent handling the request',
+    'db_queries': 'Database queries run by the request',
+    'db_duration_seconds': 'Time the request spent waiting on database queries',
+    'response_bytes': 'Size of the response body (streaming responses excluded)',
+}
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.total = 0
+        self.sum = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+
+class Registry:
+    """Per-view histograms, shared by all threads of the process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.responses = {}
+
+    def observe(self, view, status, **values):
+        with self.lock:
+            for metric, value in values.items():
+                key = (metric, view)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(BUCKETS[metric])
+                self.histograms[key].observe(value)
+            self.responses[(view, status)] = self.responses.get((view, status), 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.responses.clear()
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            responses = sorted(self.responses.items())
+
+        lines = []
+        for metric in BUCKETS:
+            name = f'poker_{metric}'
+            lines += [f'# HELP {name} {DESCRIPTIONS[metric]}', f'# TYPE {name} histogram']
+            for (hist_metric, view), histogram in histograms:
+                if hist_metric != metric:
+                    continue
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {histogram.total}')
+                lines.append(f'{name}_sum{{view="{view}"}} {histogram.sum:g}')
+                lines.append(f'{name}_count{{view="{view}"}} {histogram.total}')
+
+        lines += ['# HELP poker_responses_total Responses by view and status code', '# TYPE poker_responses_total counter']
+        for (view, status), count in responses:
+            lines.append(f'poker_responses_total{{view="{view}",status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class QueryTimer:
+    """Counts and times a request's queries (see time_queries)"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+# The QueryTimer of the request being measured. A context variable instead of
+# a connection.execute_wrapper block: the async ORM runs queries on worker
+# threads, each with its own connection, and the context follows it there.
+current_queries = contextvars.ContextVar('current_queries', default=None)
+
+
+def time_queries(execute, sql, params, many, context):
+    """Execute wrapper on every connection, passing queries to the current QueryTimer if any"""
+    queries = current_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    return queries(execute, sql, params, many, context)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """connection_created receiver (see CoreConfig.ready)"""
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match and match.view_name else '<unresolved>'
+
+
+class RequestMetricsMiddleware:
+    """
+    Records wall time, query count, DB time and response size per URL name
+    (see core.views.metrics). With METRICS_PROFILE_RATE set, that fraction
+    of requests runs under cProfile, and the profile is written to
+    METRICS_PROFILE_DIR when the request took longer than
+    METRICS_PROFILE_THRESHOLD_MS.
+
+    Under ASGI requests aren't profiled: cProfile follows one thread, and an
+    async request shares the event loop's with every other one.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        profiler = None
+        if settings.METRICS_PROFILE_RATE and random.random() < settings.METRICS_PROFILE_RATE:
+            profiler = cProfile.Profile()
+
+        queries = QueryTimer()
+        token = current_queries.set(queries)
+        started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler:
+                profiler.disable()
+            current_queries.reset(token)
+        elapsed = time.perf_counter() - started
+
+        self.record(request, response, elapsed, queries)
+        if profiler and elapsed * 1000 >= settings.METRICS_PROFILE_THRESHOLD_MS:
+            self.dump_profile(profiler, view_name(request), elapsed)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        queries = QueryTimer()
+        token = current_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_queries.reset(token)
+
+        self.record(request, response, time.perf_counter() - started, queries)
+        return response
+
+    def record(self, request, response, elapsed, queries):
+        view = view_name(request)
+        values = {
+            'request_duration_seconds': elapsed,
+            'db_queries': queries.count,
+            'db_duration_seconds': queries.duration,
+        }
+        if not response.streaming:
+            values['response_bytes'] = len(response.content)
+        registry.observe(view, response.status_code, **values)
+
+    def dump_profile(self, profiler, view, elapsed):
+        os.makedirs(settings.METRICS_PROFILE_DIR, exist_ok=True)
+        filename = f'{view.replace(":", "_")}-{time.strftime("%Y%m%d-%H%M%S")}-{elapsed * 1000:.0f}ms.prof'
+        profiler.dump_stats(os.path.join(settings.METRICS_PROFILE_DIR, filename))
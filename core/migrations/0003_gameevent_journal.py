@@ -0,0 +1,35 @@
+# Generated by Django 5.0.6 on 2026-10-19 10:00
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_player_is_admin"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="gameevent",
+            options={"ordering": ["sequence"]},
+        ),
+        migrations.AddField(
+            model_name="gameevent",
+            name="payload",
+            field=models.JSONField(
+                default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder
+            ),
+        ),
+        migrations.AddField(
+            model_name="gameevent",
+            name="sequence",
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name="gameevent",
+            unique_together={("tournament", "sequence")},
+        ),
+    ]
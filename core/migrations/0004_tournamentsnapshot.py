@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:15
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_gameevent_journal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TournamentSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.IntegerField()),
+                ('state', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='core.tournament')),
+            ],
+            options={
+                'ordering': ['-sequence'],
+                'unique_together': {('tournament', 'sequence')},
+            },
+        ),
+    ]
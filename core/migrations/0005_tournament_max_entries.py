@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_tournamentsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='max_entries',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TournamentSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.TextField()),
+                ('weekday', models.IntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('season', models.TextField(blank=True, null=True)),
+                ('max_entries', models.IntegerField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='series', to='core.tournamenttemplate')),
+            ],
+            options={
+                'verbose_name_plural': 'tournament series',
+            },
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tournaments', to='core.tournamentseries'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='tournament',
+            unique_together={('series', 'date')},
+        ),
+    ]
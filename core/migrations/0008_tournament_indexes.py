@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_tournamentseries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tournament',
+            index=models.Index(fields=['date', 'id'], name='tournament_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournament',
+            index=models.Index(fields=['type', 'date', 'id'], name='tournament_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournament',
+            index=models.Index(fields=['status', 'date', 'id'], name='tournament_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournament',
+            index=models.Index(fields=['type', 'status', 'date', 'id'], name='tournament_type_status_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_tournament_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.TextField(blank=True, default='')),
+                ('games', models.IntegerField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('points', models.IntegerField(default=0)),
+                ('winnings', models.IntegerField(default=0)),
+                ('spent', models.IntegerField(default=0)),
+                ('place_total', models.IntegerField(default=0)),
+                ('placed', models.IntegerField(default=0)),
+                ('paid_games', models.IntegerField(default=0)),
+                ('paid_wins', models.IntegerField(default=0)),
+                ('paid_winnings', models.IntegerField(default=0)),
+                ('rebuys', models.IntegerField(default=0)),
+                ('free_games', models.IntegerField(default=0)),
+                ('bounties', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='core.player')),
+            ],
+            options={
+                'unique_together': {('player', 'season')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.14 on 2026-10-19 13:15
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_playerstats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gameevent',
+            name='payload',
+            field=models.JSONField(default=dict, encoder=core.models.JournalEncoder),
+        ),
+        migrations.AlterField(
+            model_name='tournamentsnapshot',
+            name='state',
+            field=models.JSONField(encoder=core.models.JournalEncoder),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    """Fills the stats rollup from the results recorded before it existed"""
+    from core.player_stats import refresh_player_stats
+
+    Player = apps.get_model('core', 'Player')
+    player_ids = list(Player.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(player_ids), 500):
+        refresh_player_stats(player_ids[start:start + 500], apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_journal_full_precision'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
+import datetime
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
 class Player(models.Model):
@@ -36,6 +38,33 @@ class TemplateLevel(models.Model):
     def __str__(self):
         return f"{self.template.name} - Level {self.level_number}"
 
+class TournamentSeries(models.Model):
+    """A weekly event; schedule_tournaments creates its upcoming tournaments from the template"""
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+
+    name = models.TextField()
+    template = models.ForeignKey(TournamentTemplate, related_name='series', on_delete=models.PROTECT)
+    weekday = models.IntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    season = models.TextField(null=True, blank=True)
+    max_entries = models.IntegerField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'tournament series'
+
+    def __str__(self):
+        return f"{self.name} ({self.get_weekday_display()} {self.start_time:%H:%M})"
+
 class Tournament(models.Model):
     STATUS_CHOICES = [
         ('SCHEDULED', 'Scheduled'),
@@ -65,11 +94,24 @@ class Tournament(models.Model):
     timer_seconds = models.IntegerField(null=True, blank=True)
     
     registration_closed = models.BooleanField(default=False)
+    max_entries = models.IntegerField(null=True, blank=True)  # falls back to settings.TOURNAMENT_MAX_ENTRIES
+    series = models.ForeignKey(TournamentSeries, related_name='tournaments', on_delete=models.SET_NULL, null=True, blank=True)
     display_settings = models.TextField(null=True, blank=True)  # JSON string
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # One tournament per series occurrence, so scheduling can run any number of times
+        unique_together = ['series', 'date']
+        # Dashboard keyset pagination on (date, id), optionally filtered by type and/or status
+        indexes = [
+            models.Index(fields=['date', 'id'], name='tournament_date_id_idx'),
+            models.Index(fields=['type', 'date', 'id'], name='tournament_type_date_idx'),
+            models.Index(fields=['status', 'date', 'id'], name='tournament_status_date_idx'),
+            models.Index(fields=['type', 'status', 'date', 'id'], name='tournament_type_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.date.date()})"
 
@@ -120,12 +162,55 @@ class Registration(models.Model):
     class Meta:
         unique_together = ['player', 'tournament']
 
+class WaitlistEntry(models.Model):
+    """A player queued for a full tournament; the lowest position is promoted first"""
+    tournament = models.ForeignKey(Tournament, related_name='waitlist', on_delete=models.CASCADE)
+    player = models.ForeignKey(Player, related_name='waitlist_entries', on_delete=models.CASCADE)
+    position = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['position']
+        unique_together = [['tournament', 'player'], ['tournament', 'position']]
+
+class JournalEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder without its rounding of datetimes to milliseconds, so
+    clock fields restored from the journal equal the ones it recorded.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            value = o.isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return super().default(o)
+
 class GameEvent(models.Model):
     tournament = models.ForeignKey(Tournament, related_name='events', on_delete=models.CASCADE)
+    sequence = models.IntegerField()  # per-tournament, starts at 1
     type = models.TextField()
     description = models.TextField()
+    payload = models.JSONField(default=dict, encoder=JournalEncoder)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ['sequence']
+        unique_together = ['tournament', 'sequence']
+
+    def __str__(self):
+        return f"#{self.sequence} {self.type}"
+
+class TournamentSnapshot(models.Model):
+    """Replayed tournament state as of a journal sequence, so replays don't start from event 0"""
+    tournament = models.ForeignKey(Tournament, related_name='snapshots', on_delete=models.CASCADE)
+    sequence = models.IntegerField()
+    state = models.JSONField(encoder=JournalEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-sequence']
+        unique_together = ['tournament', 'sequence']
+
 class Payout(models.Model):
     tournament = models.ForeignKey(Tournament, related_name='payouts', on_delete=models.CASCADE)
     player = models.ForeignKey(Player, null=True, blank=True, on_delete=models.SET_NULL)
@@ -133,6 +218,48 @@ class Payout(models.Model):
     place = models.IntegerField(null=True, blank=True)
     description = models.TextField(null=True, blank=True)
 
+class PlayerStats(models.Model):
+    """
+    A player's finalized results rolled up for the career (season '') and per
+    tournament season, kept current by core.player_stats from the journal.
+    """
+    CAREER = ''
+
+    player = models.ForeignKey(Player, related_name='stats', on_delete=models.CASCADE)
+    season = models.TextField(default=CAREER, blank=True)
+
+    games = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    points = models.IntegerField(default=0)
+    winnings = models.IntegerField(default=0)
+    spent = models.IntegerField(default=0)  # PAID buy-ins, rebuys and addons
+    place_total = models.IntegerField(default=0)  # average place = place_total / placed
+    placed = models.IntegerField(default=0)
+
+    # Leaderboard columns: finished tournaments only
+    paid_games = models.IntegerField(default=0)
+    paid_wins = models.IntegerField(default=0)
+    paid_winnings = models.IntegerField(default=0)
+    rebuys = models.IntegerField(default=0)
+    free_games = models.IntegerField(default=0)
+    bounties = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['player', 'season']
+
+    @property
+    def profit_loss(self):
+        return self.winnings - self.spent
+
+    @property
+    def avg_place(self):
+        return round(self.place_total / self.placed, 1) if self.placed else 0
+
+    def __str__(self):
+        return f"{self.player_id} {self.season or 'career'}"
+
 class SystemSettings(models.Model):
     theme = models.TextField(default='default')
     updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,68 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def encode_cursor(obj, field='date'):
+    return f"{getattr(obj, field).isoformat()}_{obj.id}"
+
+
+def decode_cursor(value):
+    """Returns (datetime, id), or None for a missing or malformed cursor"""
+    if not value:
+        return None
+    timestamp, _, obj_id = value.rpartition('_')
+    try:
+        moment = parse_datetime(timestamp)
+        return (moment, int(obj_id)) if moment else None
+    except ValueError:
+        return None
+
+
+def keyset_page(queryset, after=None, before=None, per_page=DEFAULT_PAGE_SIZE, field='date'):
+    """
+    Newest-first page of `queryset`, ordered by (field, id).
+
+    `after` continues below the cursor (older items), `before` goes back
+    above it (newer items). Each page is a range scan on a (field, id)
+    index, so its cost doesn't grow with the number of pages before it,
+    unlike OFFSET. Returns a dict with the items and the cursors of the
+    neighbouring pages (None at either end).
+    """
+    newer_cursor = decode_cursor(before)
+    older_cursor = None if newer_cursor else decode_cursor(after)
+
+    if newer_cursor:
+        moment, obj_id = newer_cursor
+        rows = list(queryset.filter(
+            Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': obj_id})
+        ).order_by(field, 'id')[:per_page + 1])
+        has_newer = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        has_older = True
+    else:
+        if older_cursor:
+            moment, obj_id = older_cursor
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': moment}) | Q(**{field: moment, 'id__lt': obj_id})
+            )
+        rows = list(queryset.order_by(f'-{field}', '-id')[:per_page + 1])
+        has_older = len(rows) > per_page
+        items = rows[:per_page]
+        has_newer = older_cursor is not None
+
+    return {
+        'items': items,
+        'newer': encode_cursor(items[0], field) if items and has_newer else None,
+        'older': encode_cursor(items[-1], field) if items and has_older else None,
+        'per_page': per_page,
+    }
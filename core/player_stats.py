@@ -0,0 +1,105 @@
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Registration, Payout, PlayerStats
+
+# A result is final once the player is out, or the tournament is over
+FINALIZED = models.Q(status='ELIMINATED') | models.Q(tournament__status='FINISHED')
+
+# Events that can change a finalized result
+RESULT_EVENTS = {
+    'player_eliminated', 'tournament_finished', 'rebuy', 'addon',
+    'payout_assigned', 'payouts_generated', 'payout_added', 'payout_updated', 'payout_deleted',
+}
+
+COUNTERS = [
+    'games', 'wins', 'points', 'winnings', 'spent', 'place_total', 'placed',
+    'paid_games', 'paid_wins', 'paid_winnings', 'rebuys', 'free_games', 'bounties',
+]
+
+
+def _counters(payout_model=Payout):
+    # The player's payout in the registration's tournament
+    payout = models.Subquery(
+        payout_model.objects.filter(
+            tournament_id=models.OuterRef('tournament_id'), player_id=models.OuterRef('player_id')
+        ).values('player_id').annotate(total=models.Sum('amount')).values('total')
+    )
+    paid = models.Q(tournament__type='PAID')
+    free = models.Q(tournament__type='FREE')
+    win = models.Q(place=1)
+    # The leaderboards, like the rest of the stats pages, only count finished tournaments
+    finished = models.Q(tournament__status='FINISHED')
+
+    def total(expression, **extra):
+        return Coalesce(models.Sum(expression, **extra), 0)
+
+    return {
+        'games': models.Count('id'),
+        'wins': models.Count('id', filter=win),
+        'points': total('points'),
+        'winnings': total(payout),
+        'spent': total(Coalesce('tournament__buy_in', 0) * (1 + models.F('rebuys') + models.F('addons')), filter=paid),
+        'place_total': total('place'),
+        'placed': models.Count('place'),
+        'paid_games': models.Count('id', filter=paid & finished),
+        'paid_wins': models.Count('id', filter=paid & finished & win),
+        'paid_winnings': total(payout, filter=paid & finished),
+        'rebuys': total('rebuys', filter=paid & finished),
+        'free_games': models.Count('id', filter=free & finished),
+        'bounties': total('bounty_count', filter=free & finished),
+    }
+
+
+def refresh_player_stats(player_ids, apps=None):
+    """
+    Recomputes the career and season rows of the given players from their
+    finalized registrations: one grouped aggregate, one upsert, and one
+    delete for seasons they no longer have results in. Recomputing (rather
+    than adding deltas) keeps the rows right through payout edits.
+
+    A data migration passes its `apps` to run this on the historical models.
+    """
+    player_ids = set(player_ids)
+    if not player_ids:
+        return
+
+    registration_model, payout_model, stats_model = (
+        (apps.get_model('core', name) for name in ('Registration', 'Payout', 'PlayerStats'))
+        if apps else (Registration, Payout, PlayerStats)
+    )
+
+    rows = {}
+    for group in registration_model.objects.filter(FINALIZED, player_id__in=player_ids).values(
+        'player_id', 'tournament__season'
+    ).annotate(**_counters(payout_model)).order_by():
+        career = rows.setdefault((group['player_id'], PlayerStats.CAREER), dict.fromkeys(COUNTERS, 0))
+        for counter in COUNTERS:
+            career[counter] += group[counter]
+        if group['tournament__season']:
+            rows[group['player_id'], group['tournament__season']] = {counter: group[counter] for counter in COUNTERS}
+    for player_id in player_ids:
+        rows.setdefault((player_id, PlayerStats.CAREER), dict.fromkeys(COUNTERS, 0))
+
+    started = timezone.now()
+    with transaction.atomic():
+        stats_model.objects.bulk_create(
+            [stats_model(player_id=player_id, season=season, **counters) for (player_id, season), counters in rows.items()],
+            update_conflicts=True, unique_fields=['player', 'season'], update_fields=COUNTERS + ['updated_at'],
+        )
+        stats_model.objects.filter(player_id__in=player_ids, updated_at__lt=started).delete()
+
+
+def refresh_for_event(event_type, player_ids):
+    """Called from record_event once the mutation commits, with the players it concerns"""
+    if event_type in RESULT_EVENTS:
+        refresh_player_stats(player_ids)
+
+
+def career_stats(player_id):
+    """The player's career row, built on first use for players without one yet"""
+    stats = PlayerStats.objects.filter(player_id=player_id, season=PlayerStats.CAREER).first()
+    if stats is None:
+        refresh_player_stats([player_id])
+        stats = PlayerStats.objects.get(player_id=player_id, season=PlayerStats.CAREER)
+    return stats
@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Sum
+from .models import Tournament, Registration, Table, WaitlistEntry
+from .events import record_event, write_lock
+
+
+class RegistrationError(Exception):
+    """Registration refused; the message is meant for the player"""
+
+
+class RegistrationClosed(RegistrationError):
+    pass
+
+
+class TournamentFull(RegistrationError):
+    pass
+
+
+def entry_cap(tournament):
+    """Maximum number of entries, or None for no limit"""
+    return tournament.max_entries or settings.TOURNAMENT_MAX_ENTRIES or None
+
+
+def seat_capacity(tournament):
+    """Total seats across the tournament's tables, or None before tables exist"""
+    return Table.objects.filter(tournament_id=tournament.id).aggregate(seats=Sum('max_seats'))['seats']
+
+
+def free_spots(tournament):
+    """How many more players can register, or None if unlimited"""
+    limits = []
+    cap = entry_cap(tournament)
+    if cap:
+        limits.append(cap - tournament.registrations.count())
+    seats = seat_capacity(tournament)
+    if seats:
+        limits.append(seats - tournament.registrations.filter(status='REGISTERED').count())
+    return max(0, min(limits)) if limits else None
+
+
+def lock_tournament(tournament_id):
+    """
+    Takes the tournament's write lock (see write_lock) and returns the
+    fresh row. Must be called inside a transaction, before any read.
+    """
+    if not write_lock(tournament_id):
+        raise Tournament.DoesNotExist
+    return Tournament.objects.get(id=tournament_id)
+
+
+def _create_registration(tournament, player, description, **payload):
+    try:
+        with transaction.atomic():
+            reg = Registration.objects.create(tournament=tournament, player_id=player.id, status='REGISTERED')
+    except IntegrityError:
+        # Another connection registered the same player first
+        return tournament.registrations.get(player_id=player.id), False
+
+    record_event(
+        tournament, 'player_registered', description,
+        registration_id=reg.id, player_id=player.id, **payload
+    )
+    return reg, True
+
+
+def promote_waitlist(tournament):
+    """
+    Moves players from the head of the waitlist into free spots.
+    Call with the tournament locked; returns the new registrations.
+    """
+    promoted = []
+    spots = free_spots(tournament)
+    while spots is None or spots > 0:
+        # (tournament, position) is unique, so the head is a single index lookup
+        entry = tournament.waitlist.select_related('player').first()
+        if entry is None:
+            break
+        entry.delete()
+        reg, created = _create_registration(
+            tournament, entry.player, f'{entry.player} registered from the waitlist', from_waitlist=True
+        )
+        if created:
+            promoted.append(reg)
+            if spots is not None:
+                spots -= 1
+    return promoted
+
+
+def register(tournament_id, player, waitlist=False):
+    """
+    Registers `player` (a Player, or anything with .id and a display name)
+    and returns (registration, created). Registering twice returns the
+    existing registration instead of failing.
+
+    When the tournament is full this raises TournamentFull, or with
+    waitlist=True returns (WaitlistEntry, created) holding the player's
+    place in the queue.
+    """
+    with transaction.atomic():
+        tournament = lock_tournament(tournament_id)
+
+        existing = tournament.registrations.filter(player_id=player.id).first()
+        if existing:
+            return existing, False
+
+        if tournament.registration_closed or tournament.status == 'FINISHED':
+            raise RegistrationClosed('Registration is closed')
+
+        # Spots freed by a raised cap or new tables go to the queue first
+        if tournament.waitlist.exists():
+            for reg in promote_waitlist(tournament):
+                if reg.player_id == player.id:
+                    return reg, True
+
+        entry = tournament.waitlist.filter(player_id=player.id).first()
+        if entry:
+            return entry, False
+
+        spots = free_spots(tournament)
+        if spots is None or spots > 0:
+            return _create_registration(tournament, player, f'{player} registered')
+
+        if not waitlist:
+            raise TournamentFull('Tournament is full')
+
+        last = tournament.waitlist.aggregate(last=Max('position'))['last'] or 0
+        entry = WaitlistEntry.objects.create(tournament=tournament, player_id=player.id, position=last + 1)
+        return entry, True
+
+
+def leave_waitlist(tournament_id, player_id):
+    """Takes the player out of the tournament's queue; returns False if they weren't in it"""
+    with transaction.atomic():
+        tournament = lock_tournament(tournament_id)
+        # The positions behind keep their gaps: waitlist_position() counts, it doesn't read them
+        deleted, _ = tournament.waitlist.filter(player_id=player_id).delete()
+        return bool(deleted)
+
+
+def waitlist_position(entry):
+    """1-based place in the queue"""
+    return WaitlistEntry.objects.filter(tournament_id=entry.tournament_id, position__lte=entry.position).count()
@@ -0,0 +1,237 @@
+import json
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from .models import Tournament, Registration, GameEvent, TournamentSnapshot, JournalEncoder
+
+SNAPSHOT_INTERVAL = 50  # write a snapshot every N events
+SNAPSHOTS_KEPT = 3
+
+CLOCK_FIELDS = [
+    'status', 'current_level_index', 'timer_seconds',
+    'level_started_at', 'break_start_time', 'break_duration_minutes',
+]
+REGISTRATION_FIELDS = [
+    'player_id', 'status', 'table_id', 'seat_number', 'rebuys',
+    'addons', 'place', 'bounty_count', 'points',
+]
+
+
+def _normalize(value):
+    # Round-trip through the journal encoder so DB values compare equal to
+    # replayed ones (ISO strings, full precision)
+    return json.loads(json.dumps(value, cls=JournalEncoder))
+
+
+def empty_state():
+    return {
+        'clock': {
+            'status': 'SCHEDULED',
+            'current_level_index': 0,
+            'timer_seconds': None,
+            'level_started_at': None,
+            'break_start_time': None,
+            'break_duration_minutes': None,
+        },
+        'tables': {},
+        'registrations': {},
+    }
+
+
+def _seat(state, seats):
+    for registration_id, table_id, seat_number in seats:
+        reg = state['registrations'].get(str(registration_id))
+        if reg:
+            reg['table_id'] = table_id
+            reg['seat_number'] = seat_number
+
+
+def apply_event(state, event_type, payload):
+    """
+    Apply a single journal event to a replay state (in place).
+    Events that don't touch registrations, seating or the clock are ignored.
+    """
+    registrations = state['registrations']
+
+    if 'status' in payload and 'current_level_index' in payload:
+        # Timer, level, break and finish events carry the resulting clock
+        for field in CLOCK_FIELDS:
+            state['clock'][field] = payload.get(field)
+
+    if event_type == 'player_registered':
+        registrations[str(payload['registration_id'])] = {
+            'player_id': payload['player_id'],
+            'status': 'REGISTERED',
+            'table_id': None,
+            'seat_number': None,
+            'rebuys': 0,
+            'addons': 0,
+            'place': None,
+            'bounty_count': 0,
+            'points': None,
+        }
+    elif event_type == 'player_unregistered':
+        registrations.pop(str(payload['registration_id']), None)
+    elif event_type == 'player_eliminated':
+        reg = registrations.get(str(payload['registration_id']))
+        if reg:
+            reg.update({
+                'status': 'ELIMINATED',
+                'table_id': None,
+                'seat_number': None,
+                'place': payload['place'],
+                'points': payload['points'],
+                'bounty_count': payload['bounty_count'],
+            })
+    elif event_type in ('rebuy', 'addon'):
+        field = 'rebuys' if event_type == 'rebuy' else 'addons'
+        reg = registrations.get(str(payload['registration_id']))
+        if reg:
+            reg[field] = payload[field]
+    elif event_type == 'tables_generated':
+        # Old tables are deleted (table FK is SET_NULL, seat numbers stay)
+        for reg in registrations.values():
+            reg['table_id'] = None
+        state['tables'] = {
+            str(t['id']): {'number': t['number'], 'max_seats': t['max_seats']}
+            for t in payload['tables']
+        }
+        _seat(state, payload['seats'])
+    elif event_type == 'tables_cleared':
+        for reg in registrations.values():
+            reg['table_id'] = None
+            reg['seat_number'] = None
+        state['tables'] = {}
+    elif event_type == 'table_added':
+        table = payload['table']
+        state['tables'][str(table['id'])] = {'number': table['number'], 'max_seats': table['max_seats']}
+    elif event_type == 'table_deleted':
+        state['tables'].pop(str(payload['table_id']), None)
+        for reg in registrations.values():
+            if reg['table_id'] == payload['table_id']:
+                reg['table_id'] = None
+    elif event_type == 'players_seated':
+        # Selected players left at a table without a seat lose the table first
+        for registration_id in payload.get('unseated', []):
+            reg = registrations.get(str(registration_id))
+            if reg:
+                reg['table_id'] = None
+        _seat(state, payload['seats'])
+    elif event_type == 'player_moved':
+        _seat(state, [[payload['registration_id'], payload['table_id'], payload['seat_number']]])
+
+    return state
+
+
+def replay(tournament, until=None):
+    """
+    Rebuild tournament state from the journal, starting at the latest
+    snapshot. Returns (state, last_sequence).
+    """
+    snapshots = TournamentSnapshot.objects.filter(tournament_id=tournament.id)
+    if until is not None:
+        snapshots = snapshots.filter(sequence__lte=until)
+    snapshot = snapshots.order_by('-sequence').first()
+
+    if snapshot:
+        state, sequence = snapshot.state, snapshot.sequence
+    else:
+        state, sequence = empty_state(), 0
+
+    events = GameEvent.objects.filter(tournament_id=tournament.id, sequence__gt=sequence)
+    if until is not None:
+        events = events.filter(sequence__lte=until)
+
+    for event_type, payload, event_sequence in events.order_by('sequence').values_list('type', 'payload', 'sequence'):
+        apply_event(state, event_type, payload)
+        sequence = event_sequence
+
+    return state, sequence
+
+
+def current_state(tournament):
+    """Denormalized state as stored in the tournament tables, in replay shape"""
+    tournament = Tournament.objects.get(id=tournament.id)
+    state = {
+        'clock': {field: getattr(tournament, field) for field in CLOCK_FIELDS},
+        'tables': {
+            str(t['id']): {'number': t['table_number'], 'max_seats': t['max_seats']}
+            for t in tournament.tables.values('id', 'table_number', 'max_seats')
+        },
+        'registrations': {
+            str(r.pop('id')): r
+            for r in tournament.registrations.values('id', *REGISTRATION_FIELDS)
+        },
+    }
+    return _normalize(state)
+
+
+def write_snapshot(tournament, state=None, sequence=None):
+    """
+    Store a snapshot of the replayed state and prune older ones.
+    Passing an explicit state lets a baseline be taken for tournaments
+    that existed before the journal.
+    """
+    if state is None:
+        state, sequence = replay(tournament)
+
+    snapshot, _ = TournamentSnapshot.objects.update_or_create(
+        tournament_id=tournament.id, sequence=sequence, defaults={'state': state}
+    )
+
+    stale = TournamentSnapshot.objects.filter(tournament_id=tournament.id).order_by('-sequence')[SNAPSHOTS_KEPT:]
+    TournamentSnapshot.objects.filter(id__in=list(stale.values_list('id', flat=True))).delete()
+
+    return snapshot
+
+
+def diff_states(expected, actual):
+    """Human-readable list of differences between two states"""
+    differences = []
+
+    for field in CLOCK_FIELDS:
+        if expected['clock'].get(field) != actual['clock'].get(field):
+            differences.append(f"clock.{field}: journal={expected['clock'].get(field)!r} db={actual['clock'].get(field)!r}")
+
+    for section in ('tables', 'registrations'):
+        for key in sorted(set(expected[section]) | set(actual[section]), key=int):
+            if key not in actual[section]:
+                differences.append(f"{section}[{key}]: missing in db")
+            elif key not in expected[section]:
+                differences.append(f"{section}[{key}]: not in journal")
+            elif expected[section][key] != actual[section][key]:
+                for field, value in expected[section][key].items():
+                    if actual[section][key].get(field) != value:
+                        differences.append(
+                            f"{section}[{key}].{field}: journal={value!r} db={actual[section][key].get(field)!r}"
+                        )
+
+    return differences
+
+
+@transaction.atomic
+def restore(tournament, state):
+    """
+    Write replayed clock and registration fields back to the database.
+    Rows that only exist on one side are reported by diff_states but left alone.
+    """
+    clock = {
+        field: parse_datetime(value) if field.endswith(('_at', '_time')) and value else value
+        for field, value in state['clock'].items()
+    }
+    Tournament.objects.filter(id=tournament.id).update(**clock)
+
+    registrations = list(Registration.objects.filter(
+        tournament_id=tournament.id, id__in=[int(key) for key in state['registrations']]
+    ))
+    for reg in registrations:
+        for field, value in state['registrations'][str(reg.id)].items():
+            setattr(reg, field, value)
+
+    # Registrations may point at tables that no longer exist
+    table_ids = set(tournament.tables.values_list('id', flat=True))
+    for reg in registrations:
+        if reg.table_id is not None and reg.table_id not in table_ids:
+            reg.table_id = None
+
+    Registration.objects.bulk_update(registrations, [f for f in REGISTRATION_FIELDS if f != 'player_id'])
+    return len(registrations)
@@ -0,0 +1,62 @@
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import orjson
+except ImportError:  # optional, see requirements.txt
+    orjson = None
+
+COMPACT_MEDIA_TYPE = 'application/vnd.poker.compact+json'
+
+_encoder = DjangoJSONEncoder()
+
+
+def dumps(data):
+    """
+    JSON bytes, identical to JsonResponse's output (dates and decimals go
+    through DjangoJSONEncoder) but produced by orjson when it's installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            data, default=_encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+def columnar(value):
+    """
+    Turns every list of same-shaped dicts into {"columns": [...], "rows": [[...], ...]},
+    so a 300-row players list names each key once instead of 300 times.
+    """
+    if isinstance(value, dict):
+        return {key: columnar(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if value and all(isinstance(item, dict) for item in value):
+            columns = list(value[0])
+            if all(list(item) == columns for item in value):
+                return {
+                    'columns': columns,
+                    'rows': [[columnar(item[column]) for column in columns] for item in value],
+                }
+        return [columnar(item) for item in value]
+    return value
+
+
+def wants_compact(request):
+    return request.GET.get('format') == 'compact' or COMPACT_MEDIA_TYPE in request.headers.get('Accept', '')
+
+
+def api_response(request, data, status=200):
+    """
+    JsonResponse for the polled endpoints. Clients opt into the columnar
+    format with ?format=compact or "Accept: application/vnd.poker.compact+json".
+    """
+    if wants_compact(request):
+        response = HttpResponse(dumps(columnar(data)), content_type=COMPACT_MEDIA_TYPE, status=status)
+    else:
+        response = HttpResponse(dumps(data), content_type='application/json', status=status)
+    patch_vary_headers(response, ['Accept'])
+    return response
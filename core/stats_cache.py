@@ -0,0 +1,77 @@
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from .compression import available_encodings, compress, negotiate, set_encoding
+
+VERSION_KEY = 'stats:version'
+
+
+def stats_cache():
+    return caches[settings.STATS_CACHE]
+
+
+async def astats_version():
+    cache = stats_cache()
+    # Start from the clock rather than 1, so a version evicted from the
+    # cache never comes back with a number older entries were stored under
+    await cache.aadd(VERSION_KEY, time.time_ns(), timeout=None)
+    return await cache.aget(VERSION_KEY) or time.time_ns()
+
+
+def bump_stats_version():
+    """Invalidates every cached stats response (see record_event)"""
+    cache = stats_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def _key(view, request, version):
+    query = '&'.join(sorted(request.GET.urlencode().split('&')))
+    return f'stats:{view.__name__}:{version}:{query}'
+
+
+def _entry(response):
+    entry = {'content_type': response['Content-Type'], 'identity': response.content}
+    for encoding in available_encodings():
+        entry[encoding] = compress(response.content, encoding)
+    return entry
+
+
+def _response(request, entry):
+    response = HttpResponse(entry['identity'], content_type=entry['content_type'])
+    encoding = negotiate(request)
+    if encoding in entry and len(entry[encoding]) < len(entry['identity']):
+        set_encoding(response, encoding, entry[encoding])
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def precompressed(view):
+    """
+    Caches an async stats view's 200 responses per query string, compressed once
+    with every supported coding when stored, so a hit costs no queries and
+    no compression. Entries are dropped when a tournament finishes or a
+    finished one changes (the version bumps) or after STATS_CACHE_TTL.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return await view(request, *args, **kwargs)
+
+        cache = stats_cache()
+        key = _key(view, request, await astats_version())
+        entry = await cache.aget(key)
+        if entry is None:
+            response = await view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = _entry(response)
+            await cache.aset(key, entry, timeout=settings.STATS_CACHE_TTL)
+        return _response(request, entry)
+
+    return wrapper
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Tournament, TournamentLevel, Table, Payout
+from .events import record_event
+
+LEVEL_FIELDS = ('level_number', 'small_blind', 'big_blind', 'ante', 'duration', 'is_break')
+
+# Tournament fields a clone inherits; timer state, status and results start fresh
+TOURNAMENT_FIELDS = (
+    'name', 'type', 'season', 'buy_in', 'stack', 'config', 'display_settings', 'max_entries',
+)
+
+
+def level_copies(tournament, levels):
+    """Unsaved TournamentLevel copies of template or tournament levels"""
+    return [
+        TournamentLevel(tournament=tournament, **{field: getattr(level, field) for field in LEVEL_FIELDS})
+        for level in levels
+    ]
+
+
+def default_levels(tournament, count=10):
+    return [
+        TournamentLevel(
+            tournament=tournament,
+            level_number=i,
+            small_blind=50 * (2**i),  # Exponential structure example
+            big_blind=100 * (2**i),
+            ante=0,
+            duration=20
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def copy_levels(tournament, levels):
+    """Copies template or tournament levels onto `tournament` in one INSERT"""
+    return TournamentLevel.objects.bulk_create(level_copies(tournament, levels))
+
+
+def template_levels(tournament, template=None):
+    """Unsaved levels for a new tournament: the template's structure, or the default one if it has none"""
+    levels = template.levels.all() if template else []
+    return level_copies(tournament, levels) if levels else default_levels(tournament)
+
+
+def apply_template(tournament, template=None):
+    """Gives a new tournament the template's structure, or the default one"""
+    return TournamentLevel.objects.bulk_create(template_levels(tournament, template))
+
+
+@transaction.atomic
+def clone_tournament(source, **overrides):
+    """
+    Creates a new scheduled tournament with the source's settings, level
+    structure, payout structure and table layout. `overrides` replace
+    tournament fields (e.g. name, date); the date defaults to one week later.
+    Prefetch the source's levels, payouts and tables when cloning it repeatedly.
+    """
+    fields = {field: getattr(source, field) for field in TOURNAMENT_FIELDS}
+    fields['date'] = source.date + timedelta(weeks=1)
+    fields.update(overrides)
+    tournament = Tournament.objects.create(**fields)
+
+    copy_levels(tournament, source.levels.all())
+
+    # Payout amounts and places only; winners belong to the source
+    Payout.objects.bulk_create([
+        Payout(tournament=tournament, amount=payout.amount, place=payout.place, description=payout.description)
+        for payout in source.payouts.all()
+    ])
+
+    tables = Table.objects.bulk_create([
+        Table(tournament=tournament, table_number=table.table_number, max_seats=table.max_seats)
+        for table in sorted(source.tables.all(), key=lambda t: t.table_number)
+    ])
+    if tables:
+        # Journal the layout so replays of the new tournament see the tables
+        record_event(
+            tournament, 'tables_generated', f'{len(tables)} table(s) copied from {source.name}',
+            tables=[{'id': t.id, 'number': t.table_number, 'max_seats': t.max_seats} for t in tables],
+            seats=[]
+        )
+
+    return tournament
+
+
+def series_dates(series, start, end):
+    """Start times of a weekly series in [start, end), in the current timezone"""
+    day = timezone.localtime(start).date()
+    day += timedelta(days=(series.weekday - day.weekday()) % 7)
+    while True:
+        when = timezone.make_aware(datetime.combine(day, series.start_time))
+        if when >= end:
+            return
+        if when >= start:
+            yield when
+        day += timedelta(weeks=1)
+
+
+@transaction.atomic
+def schedule_series(series_list, start, end):
+    """
+    Creates the tournaments of each series that fall between start and end
+    and don't exist yet, with one INSERT for the tournaments and one for
+    their levels. Safe to run repeatedly; returns the new tournaments.
+    """
+    series_list = list(series_list)
+    existing = set(Tournament.objects.filter(
+        series__in=series_list, date__gte=start, date__lt=end
+    ).values_list('series_id', 'date'))
+
+    tournaments = [
+        Tournament(
+            series=series,
+            name=series.name,
+            date=date,
+            type=series.template.type,
+            buy_in=series.template.buy_in,
+            stack=series.template.stack,
+            season=series.season,
+            max_entries=series.max_entries,
+        )
+        for series in series_list
+        for date in series_dates(series, start, end)
+        if (series.id, date) not in existing
+    ]
+    try:
+        with transaction.atomic():
+            Tournament.objects.bulk_create(tournaments)
+    except IntegrityError:
+        # A concurrent run created some of them first: insert the rest one by one
+        tournaments = [tournament for tournament in tournaments if _create_unless_exists(tournament)]
+
+    levels = []
+    for tournament in tournaments:
+        levels += template_levels(tournament, tournament.series.template)
+    TournamentLevel.objects.bulk_create(levels)
+
+    return tournaments
+
+
+def _create_unless_exists(tournament):
+    """Inserts one scheduled tournament; False if its (series, date) is already taken"""
+    tournament.pk = None  # a failed bulk INSERT may have assigned one
+    try:
+        with transaction.atomic():
+            tournament.save(force_insert=True)
+    except IntegrityError:
+        return False
+    return True
@@ -1,3 +1,1371 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import JsonResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import (
+    Player, Tournament, TournamentTemplate, TemplateLevel, TournamentLevel, TournamentSeries, Table, Registration,
+    Payout, WaitlistEntry,
+)
 
-# Create your tests here.
+# Pages render {% static %} without collectstatic having built the manifest
+TEST_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+PLAYERS = 300
+TABLES = 35
+LEVELS = 30
+HISTORY_YEARS = 5
+HISTORY_FIELD = 40  # entries per historical tournament
+
+
+def seed_card_room():
+    """
+    A venue after five years: 300 players, a weekly PAID and FREE game
+    with results and payouts, and a running 300-player PAID tournament
+    seated at 35 tables with a 30-level structure.
+    """
+    rng = random.Random(2024)
+    now = timezone.now()
+
+    players = Player.objects.bulk_create([
+        Player(telegram_id=str(100000 + i), username=f'player{i}', first_name=f'Player {i}')
+        for i in range(PLAYERS)
+    ])
+    admin = Player.objects.create(telegram_id='1', first_name='Admin', is_admin=True)
+
+    template = TournamentTemplate.objects.create(name='Weekly', type='PAID', buy_in=50)
+    TemplateLevel.objects.bulk_create([
+        TemplateLevel(template=template, level_number=i, small_blind=25 * i, big_blind=50 * i, duration=20)
+        for i in range(1, LEVELS + 1)
+    ])
+
+    # History
+    history = []
+    for week in range(1, 52 * HISTORY_YEARS + 1):
+        for tournament_type in ('PAID', 'FREE'):
+            history.append(Tournament(
+                name=f'{tournament_type} week {week}', date=now - timedelta(weeks=week),
+                type=tournament_type, status='FINISHED', buy_in=50 if tournament_type == 'PAID' else None,
+                season=str((now - timedelta(weeks=week)).year)
+            ))
+    Tournament.objects.bulk_create(history)
+
+    registrations, payouts = [], []
+    for tournament in history:
+        field = rng.sample(players, HISTORY_FIELD)
+        for place, player in enumerate(field, start=1):
+            registrations.append(Registration(
+                tournament=tournament, player=player, status='ELIMINATED', place=place,
+                rebuys=rng.randint(0, 2) if tournament.type == 'PAID' else 0,
+                addons=rng.randint(0, 1) if tournament.type == 'PAID' else 0,
+                bounty_count=rng.randint(0, 3),
+                points=(HISTORY_FIELD - place + 1) * 10 if tournament.type == 'FREE' else None,
+            ))
+            if tournament.type == 'PAID' and place <= 5:
+                payouts.append(Payout(tournament=tournament, player=player, place=place, amount=1000 // place))
+    Registration.objects.bulk_create(registrations, batch_size=2000)
+    Payout.objects.bulk_create(payouts)
+
+    # Live tournament
+    live = Tournament.objects.create(
+        name='Main Event', date=now, type='PAID', status='RUNNING', buy_in=100,
+        current_level_index=5, level_started_at=now, timer_seconds=1200
+    )
+    TournamentLevel.objects.bulk_create([
+        TournamentLevel(tournament=live, level_number=i, small_blind=25 * i, big_blind=50 * i, duration=20)
+        for i in range(1, LEVELS + 1)
+    ])
+    tables = Table.objects.bulk_create([
+        Table(tournament=live, table_number=i, max_seats=9) for i in range(1, TABLES + 1)
+    ])
+    Registration.objects.bulk_create([
+        Registration(
+            tournament=live, player=player, status='REGISTERED',
+            table=tables[i % TABLES], seat_number=i // TABLES + 1
+        )
+        for i, player in enumerate(players)
+    ])
+    Payout.objects.bulk_create([
+        Payout(tournament=live, place=place, amount=10000 // place) for place in range(1, 11)
+    ])
+
+    return {'live': live, 'template': template, 'admin': admin, 'players': players}
+
+
+# Wall-time budgets are generous so a slow CI box doesn't flake; scale them
+# with PERF_TIME_SCALE. The query budgets are exact enough that a per-row
+# query over 300 players blows straight through them.
+TIME_SCALE = float(os.environ.get('PERF_TIME_SCALE', '1'))
+
+# url name -> (max queries, max milliseconds)
+BUDGETS = {
+    'dashboard': (5, 300),
+    'profile': (5, 300),
+    'logout': (4, 100),
+    'tournament_create': (8, 300),
+    'tournament_control': (5, 300),
+    'tournament_display': (10, 300),
+    'tournament_info': (7, 500),
+    'paid_tournaments_stats': (3, 300),
+    'free_tournaments_stats': (3, 300),
+    'template_list': (5, 300),
+    'template_create': (3, 300),
+    'template_edit': (5, 500),
+    'template_delete': (10, 300),
+    'api_start_timer': (9, 200),
+    'api_pause_timer': (9, 200),
+    'api_next_level': (16, 300),
+    'api_prev_level': (16, 300),
+    'api_start_break': (13, 300),
+    'api_set_timer': (9, 200),
+    'api_finish_tournament': (9, 200),
+    'api_get_status': (4, 100),
+    'api_get_events': (3, 100),
+    'api_display_stream': (6, 300),
+    'tournament_tv': (1, 100),
+    'api_clone_tournament': (18, 300),
+    'api_get_players': (4, 300),
+    'api_register_player': (21, 300),
+    'api_eliminate_player': (16, 300),
+    'api_rebuy_player': (9, 200),
+    'api_addon_player': (9, 200),
+    'api_unregister_player': (14, 300),
+    'api_leave_waitlist': (6, 200),
+    'api_search_players': (3, 200),
+    'api_generate_tables': (20, 1000),
+    'api_get_tables': (5, 300),
+    'api_clear_tables': (12, 300),
+    'api_add_table': (16, 300),
+    'api_delete_table': (12, 300),
+    'api_seat_selected_players': (16, 500),
+    'api_move_player': (13, 200),
+    'api_get_levels': (3, 100),
+    'api_add_level': (9, 200),
+    'api_update_level': (9, 200),
+    'api_delete_level': (9, 200),
+    'api_get_payouts': (6, 100),
+    'api_generate_payouts': (17, 300),
+    'api_add_payout': (9, 200),
+    'api_update_payout': (9, 200),
+    'api_delete_payout': (9, 200),
+    'api_paid_tournament_results': (5, 1000),
+    'api_paid_payout_leaders': (4, 500),
+    'api_paid_rebuy_leaders': (3, 500),
+    'api_free_tournament_results': (5, 1000),
+    'api_free_bounty_leaders': (3, 500),
+    'api_get_tournament_years': (2, 300),
+    'metrics': (3, 100),
+}
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class EndpointBudgetTests(TestCase):
+    """Query-count and wall-time budgets for every core endpoint against a seeded card room"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = seed_card_room()
+        cls.live = cls.room['live']
+        call_command('rebuild_player_stats', stdout=StringIO())
+
+    def setUp(self):
+        from .stats_cache import stats_cache
+        # Budgets are for cold requests
+        stats_cache().clear()
+        self.login(self.room['admin'])
+
+    def login(self, player):
+        session = self.client.session
+        session['player_id'] = player.id
+        session.save()
+
+    def assertWithinBudget(self, name, args=(), data=None, method=None, query='', status=200, max_queries=None):
+        budget, max_ms = BUDGETS[name]
+        max_queries = max_queries or budget
+        url = reverse(name, args=args) + query
+        method = method or ('post' if data is not None else 'get')
+
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            if method == 'post':
+                response = self.client.post(url, json.dumps(data or {}), content_type='application/json')
+            else:
+                response = self.client.get(url)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.assertEqual(response.status_code, status, f'{url}: {response.content[:200]}')
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{url} ran {len(queries)} queries (budget {max_queries}):\n'
+            + '\n'.join(q['sql'][:150] for q in queries.captured_queries)
+        )
+        self.assertLessEqual(elapsed_ms, max_ms * TIME_SCALE, f'{url} took {elapsed_ms:.0f} ms (budget {max_ms})')
+        return response
+
+    def registrations(self):
+        return Registration.objects.filter(tournament=self.live).order_by('id')
+
+    def test_every_endpoint_has_a_budget(self):
+        from .urls import urlpatterns
+        names = {pattern.name for pattern in urlpatterns if getattr(pattern, 'name', None)}
+        self.assertEqual(names - set(BUDGETS), set(), 'Add a budget (and a test) for new endpoints')
+
+    # Pages
+
+    def test_pages(self):
+        live = (self.live.id,)
+        template = (self.room['template'].id,)
+        self.assertWithinBudget('dashboard')
+        self.assertWithinBudget('dashboard', query='?type=PAID&status=FINISHED&per_page=100')
+        self.assertWithinBudget('tournament_control', live)
+        self.assertWithinBudget('tournament_display', live)
+        self.assertWithinBudget('tournament_info', live)
+        self.assertWithinBudget('paid_tournaments_stats')
+        self.assertWithinBudget('free_tournaments_stats')
+        self.assertWithinBudget('template_list')
+        self.assertWithinBudget('template_create')
+        self.assertWithinBudget('template_edit', template)
+        self.assertWithinBudget('template_delete', template)
+        self.assertWithinBudget('tournament_create')
+
+    def test_profile(self):
+        # A regular with five years of results
+        self.login(self.room['players'][0])
+        self.assertWithinBudget('profile')
+
+    def test_logout(self):
+        self.assertWithinBudget('logout', status=302)
+
+    def test_create_tournament_from_template(self):
+        max_queries, _ = BUDGETS['tournament_create']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('tournament_create'), {
+                'name': 'Friday', 'date': '2030-01-04T19:00', 'type': 'PAID', 'buy_in': 50, 'stack': 10000,
+                'template': self.room['template'].id,
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertLessEqual(len(queries), max_queries)
+        self.assertEqual(Tournament.objects.get(name='Friday').levels.count(), LEVELS)
+
+    def test_delete_template(self):
+        self.assertWithinBudget('template_delete', (self.room['template'].id,), method='post', status=302)
+
+    # Clock
+
+    def test_timer(self):
+        live = (self.live.id,)
+        self.assertWithinBudget('api_pause_timer', live, {})
+        self.assertWithinBudget('api_start_timer', live, {})
+        self.assertWithinBudget('api_set_timer', live, {'minutes': 5})
+        self.assertWithinBudget('api_next_level', live, {})
+        self.assertWithinBudget('api_prev_level', live, {})
+        self.assertWithinBudget('api_start_break', live, {'duration': 10})
+        self.assertWithinBudget('api_finish_tournament', live, {})
+
+    def test_status_and_events(self):
+        live = (self.live.id,)
+        self.assertWithinBudget('api_get_status', live)
+        self.assertWithinBudget('api_get_events', live)
+
+    @override_settings(DISPLAY_STREAM_SECONDS=0)
+    def test_tv_display(self):
+        from .display import hub
+        hub.clear()
+        response = self.assertWithinBudget('tournament_tv', (self.live.id,))
+        self.assertIn('public', response['Cache-Control'])
+
+        max_queries, _ = BUDGETS['api_display_stream']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_display_stream', args=[self.live.id]))
+            body = b''.join(response.streaming_content).decode()
+        self.assertLessEqual(len(queries), max_queries)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        event = dict(line.split(': ', 1) for line in body.split('\n\n')[1].splitlines())
+        self.assertEqual(event['event'], 'state')
+        state = json.loads(event['data'])
+        self.assertEqual(len(state['levels']), LEVELS)
+        self.assertEqual(state['players_remaining'], PLAYERS)
+        # Running: the screen gets the absolute end of the level
+        self.assertAlmostEqual(state['deadline'], self.live.level_started_at.timestamp() + 1200)
+
+        # More screens reuse the state without touching the database
+        with self.assertNumQueries(1):
+            b''.join(self.client.get(reverse('api_display_stream', args=[self.live.id])).streaming_content)
+
+        # Under ASGI the same stream is consumed asynchronously
+        from asgiref.sync import async_to_sync
+        from .display import DisplayStream
+
+        async def consume():
+            return [message async for message in DisplayStream(self.live.id)]
+        self.assertEqual(async_to_sync(consume)()[1].split('\n')[:2], ['event: state', 'id: 0'])
+
+    # Players
+
+    def test_player_reads(self):
+        live = (self.live.id,)
+        self.assertWithinBudget('api_get_players', live)
+        self.assertWithinBudget('api_search_players', query=f'?q=Player 1&tournament_id={self.live.id}')
+
+    def test_register_and_unregister(self):
+        live = (self.live.id,)
+        response = self.assertWithinBudget('api_register_player', live, {'name': 'Walk-in'})
+        self.assertWithinBudget('api_unregister_player', live, {'registration_id': response.json()['registration_id']})
+
+    def test_leave_waitlist(self):
+        player = Player.objects.create(telegram_id='200000', first_name='Queued')
+        WaitlistEntry.objects.create(tournament=self.live, player=player, position=1)
+        self.assertWithinBudget('api_leave_waitlist', (self.live.id,), {'player_id': player.id})
+
+    def test_eliminate_player(self):
+        reg = self.registrations().first()
+        response = self.assertWithinBudget(
+            'api_eliminate_player', (self.live.id,), {'registration_id': reg.id, 'bounty_count': 1}
+        )
+        self.assertEqual(response.json()['place'], PLAYERS)
+
+    def test_eliminate_player_free(self):
+        Tournament.objects.filter(id=self.live.id).update(type='FREE')
+        reg = self.registrations().first()
+        # FREE eliminations also advance the level, which notifies every seated player
+        self.assertWithinBudget('api_eliminate_player', (self.live.id,), {'registration_id': reg.id}, max_queries=30)
+
+    def test_rebuy_and_addon(self):
+        reg = self.registrations().first()
+        self.assertWithinBudget('api_rebuy_player', (self.live.id,), {'registration_id': reg.id})
+        self.assertWithinBudget('api_addon_player', (self.live.id,), {'registration_id': reg.id})
+
+    # Tables
+
+    def test_table_reads(self):
+        self.assertWithinBudget('api_get_tables', (self.live.id,))
+
+    def test_generate_tables(self):
+        self.assertWithinBudget('api_generate_tables', (self.live.id,), {})
+        self.assertEqual(self.live.tables.count(), -(-PLAYERS // 9))
+        self.assertFalse(self.registrations().filter(seat_number__isnull=True).exists())
+
+    def test_clear_add_and_delete_tables(self):
+        live = (self.live.id,)
+        response = self.assertWithinBudget('api_add_table', live, {'max_seats': 9})
+        self.assertWithinBudget('api_delete_table', (self.live.id, response.json()['table']['id']), {})
+        self.assertWithinBudget('api_clear_tables', live, {})
+
+    def test_seat_selected_players(self):
+        unseated = list(self.registrations().values_list('id', flat=True)[:50])
+        Registration.objects.filter(id__in=unseated).update(table=None, seat_number=None)
+        Table.objects.bulk_create([
+            Table(tournament=self.live, table_number=TABLES + i, max_seats=9) for i in range(1, 6)
+        ])
+        response = self.assertWithinBudget('api_seat_selected_players', (self.live.id,), {'registration_ids': unseated})
+        self.assertEqual(response.json()['seated_count'], 50)
+
+    def test_move_player(self):
+        # 300 players at 35 tables: the last tables have seat 9 free
+        table = self.live.tables.order_by('-table_number').first()
+        reg = self.registrations().first()
+        self.assertWithinBudget(
+            'api_move_player', (self.live.id,), {'registration_id': reg.id, 'table_id': table.id, 'seat_number': 9}
+        )
+
+    # Structure and payouts
+
+    def test_levels(self):
+        live = (self.live.id,)
+        level = self.live.levels.order_by('level_number').first()
+        self.assertWithinBudget('api_get_levels', live)
+        self.assertWithinBudget('api_add_level', live, {'level_number': LEVELS + 1, 'small_blind': 1, 'big_blind': 2})
+        self.assertWithinBudget('api_update_level', (self.live.id, level.id), {'small_blind': 30})
+        self.assertWithinBudget('api_delete_level', (self.live.id, level.id), {})
+
+    def test_payouts(self):
+        live = (self.live.id,)
+        payout = self.live.payouts.order_by('place').first()
+        self.assertWithinBudget('api_get_payouts', live)
+        self.assertWithinBudget('api_add_payout', live, {'place': 11, 'amount': 50})
+        self.assertWithinBudget('api_update_payout', (self.live.id, payout.id), {'amount': 5000})
+        self.assertWithinBudget('api_delete_payout', (self.live.id, payout.id), {})
+        self.assertWithinBudget('api_generate_payouts', live, {})
+
+    def test_clone_tournament(self):
+        self.assertWithinBudget('api_clone_tournament', (self.live.id,), {})
+
+    # Statistics
+
+    def test_paid_stats(self):
+        response = self.assertWithinBudget('api_paid_tournament_results')
+        self.assertEqual(len(response.json()['tournaments']), 52 * HISTORY_YEARS)
+        self.assertWithinBudget('api_paid_tournament_results', query='?date_from=2000-01-01')
+        self.assertWithinBudget('api_paid_payout_leaders')
+        self.assertWithinBudget('api_paid_rebuy_leaders')
+
+    def test_free_stats(self):
+        self.assertWithinBudget('api_free_tournament_results')
+        self.assertWithinBudget('api_free_tournament_results', query='?season=winter')
+        self.assertWithinBudget('api_free_bounty_leaders')
+        self.assertWithinBudget('api_get_tournament_years', query='?type=FREE')
+
+    def test_compact_players_payload(self):
+        url = reverse('api_get_players', args=[self.live.id])
+        verbose = self.client.get(url)
+        compact = self.client.get(url, headers={'Accept': 'application/vnd.poker.compact+json'})
+        self.assertEqual(compact['Content-Type'], 'application/vnd.poker.compact+json')
+        self.assertLess(len(compact.content), len(verbose.content) * 0.6)
+
+        players = json.loads(compact.content)['players']
+        rows = [dict(zip(players['columns'], row)) for row in players['rows']]
+        self.assertEqual(rows, verbose.json()['players'])
+
+    def test_compressed_stats(self):
+        url = reverse('api_paid_tournament_results')
+        plain = self.client.get(url)
+        with self.assertNumQueries(0):
+            compressed = self.client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertLess(len(compressed.content), len(plain.content) / 5)
+
+    # Monitoring
+
+    def test_metrics(self):
+        self.assertWithinBudget('metrics')
+
+
+def seed_results(weeks=3):
+    """
+    Four regulars with a few weeks of PAID and FREE results and payouts,
+    across two seasons, and a running PAID game they're all still in.
+    """
+    now = timezone.now()
+    players = Player.objects.bulk_create([Player(telegram_id=str(i), first_name=f'Player {i}') for i in range(4)])
+    for week in range(1, weeks + 1):
+        date = now - timedelta(weeks=week * 20)
+        for tournament_type in ('PAID', 'FREE'):
+            tournament = Tournament.objects.create(
+                name=f'{tournament_type} week {week}', date=date, type=tournament_type, status='FINISHED',
+                buy_in=50 if tournament_type == 'PAID' else None, season=str(date.year)
+            )
+            Registration.objects.bulk_create([
+                Registration(
+                    tournament=tournament, player=player, status='ELIMINATED', place=(place + week) % 4 + 1,
+                    rebuys=place % 2 if tournament_type == 'PAID' else 0, bounty_count=place,
+                    points=(4 - place) * 10 if tournament_type == 'FREE' else None,
+                )
+                for place, player in enumerate(players)
+            ])
+            if tournament_type == 'PAID':
+                winners = tournament.registrations.filter(place__lte=2).order_by('place')
+                Payout.objects.bulk_create([
+                    Payout(tournament=tournament, player_id=reg.player_id, place=reg.place, amount=200 // reg.place)
+                    for reg in winners
+                ])
+
+    live = Tournament.objects.create(name='Main Event', date=now, type='PAID', status='RUNNING', buy_in=100)
+    Registration.objects.bulk_create([Registration(tournament=live, player=player) for player in players])
+    Payout.objects.bulk_create([Payout(tournament=live, place=place, amount=1000 // place) for place in (1, 2)])
+    return {'live': live, 'players': players}
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class FragmentCacheTests(TestCase):
+    """The info and profile fragments are served from the cache until the journal moves"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = seed_results()
+        cls.live = cls.room['live']
+        cls.player = cls.room['players'][0]
+        call_command('rebuild_player_stats', stdout=StringIO())
+
+    def setUp(self):
+        session = self.client.session
+        session['player_id'] = self.player.id
+        session.save()
+
+    def post(self, name, tournament_id, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse(name, args=[tournament_id]), json.dumps(data), content_type='application/json')
+
+    def test_cached_info_page(self):
+        url = reverse('tournament_info', args=[self.live.id])
+        self.client.get(url)
+        # Session, player (nav) and tournament; the fragment comes from the cache
+        with self.assertNumQueries(3):
+            cached = self.client.get(url)
+        self.assertContains(cached, 'Player 0')
+
+        reg = self.live.registrations.get(player=self.player)
+        self.post('api_eliminate_player', self.live.id, {'registration_id': reg.id})
+        self.assertGreater(
+            self.client.get(url).content.decode().count('Eliminated'), cached.content.decode().count('Eliminated')
+        )
+
+    def test_cached_profile(self):
+        first = self.client.get(reverse('profile'))
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(reverse('profile')).content, first.content)
+
+        # A rebuy corrected in a finished tournament changes what they've spent
+        reg = Registration.objects.filter(player=self.player, tournament__type='PAID', tournament__status='FINISHED').first()
+        self.post('api_rebuy_player', reg.tournament_id, {'registration_id': reg.id})
+        self.assertNotEqual(self.client.get(reverse('profile')).content, first.content)
+
+
+class ProfileStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = seed_results()
+        cls.player = cls.room['players'][0]
+        call_command('rebuild_player_stats', stdout=StringIO())
+
+    def test_profile_stats(self):
+        from .views import profile_data
+        player = self.player
+        # Finalized results only: not the live tournament they're still in
+        regs = list(Registration.objects.filter(player=player, status='ELIMINATED').select_related('tournament'))
+        winnings = sum(Payout.objects.filter(player=player).values_list('amount', flat=True))
+        spent = sum(
+            (r.tournament.buy_in or 0) * (1 + r.rebuys + r.addons) for r in regs if r.tournament.type == 'PAID'
+        )
+        places = [r.place for r in regs if r.place]
+
+        with self.assertNumQueries(2):
+            data = profile_data(player)
+        self.assertEqual(data['stats'], {
+            'total_games': len(regs),
+            'total_wins': sum(r.place == 1 for r in regs),
+            'total_points': sum(r.points or 0 for r in regs),
+            'total_winnings': winnings,
+            'total_spent': spent,
+            'profit_loss': winnings - spent,
+            'avg_place': round(sum(places) / len(places), 1),
+        })
+        self.assertEqual(len(data['free_tournaments']) + len(data['paid_tournaments']), len(regs) + 1)
+        dates = [item['registration'].tournament.date for item in data['paid_tournaments']]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+
+class PlayerStatsTests(TestCase):
+    """The career and season rollup agrees with the registrations and follows the journal"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = seed_results()
+        cls.live = cls.room['live']
+        call_command('rebuild_player_stats', stdout=StringIO())
+
+    def post(self, name, args, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse(name, args=args), json.dumps(data), content_type='application/json')
+
+    def test_seasons_add_up_to_the_career(self):
+        from .models import PlayerStats
+        for player in self.room['players']:
+            career = PlayerStats.objects.get(player=player, season=PlayerStats.CAREER)
+            seasons = PlayerStats.objects.filter(player=player).exclude(season=PlayerStats.CAREER)
+            self.assertGreater(seasons.count(), 1)
+            for counter in ('games', 'wins', 'points', 'winnings', 'spent', 'bounties'):
+                self.assertEqual(sum(seasons.values_list(counter, flat=True)), getattr(career, counter), counter)
+
+    def test_follows_eliminations_and_payouts(self):
+        from .models import PlayerStats
+        player = self.room['players'][0]
+        before = PlayerStats.objects.get(player=player, season=PlayerStats.CAREER)
+
+        # Last one standing in the live tournament
+        reg = self.live.registrations.get(player=player)
+        self.live.registrations.exclude(id=reg.id).update(status='ELIMINATED')
+        self.post('api_eliminate_player', [self.live.id], {'registration_id': reg.id})
+        after = PlayerStats.objects.get(player=player, season=PlayerStats.CAREER)
+        payout = Payout.objects.get(tournament=self.live, player=player)
+        self.assertEqual(after.games, before.games + 1)
+        self.assertEqual(after.wins, before.wins + 1)
+        self.assertEqual(after.spent, before.spent + self.live.buy_in)
+        self.assertEqual(after.winnings, before.winnings + payout.amount)
+
+        # A later payout change reaches the row too
+        self.post('api_update_payout', [self.live.id, payout.id], {'amount': payout.amount + 100})
+        self.assertEqual(PlayerStats.objects.get(player=player, season=PlayerStats.CAREER).winnings, after.winnings + 100)
+
+    def test_leaders_from_rollup(self):
+        by_player = lambda leaders: {leader['player_id']: leader for leader in leaders}
+        for name in ('api_paid_payout_leaders', 'api_paid_rebuy_leaders', 'api_free_bounty_leaders'):
+            rollup = self.client.get(reverse(name)).json()['leaders']
+            scanned = self.client.get(reverse(name), {'date_from': '2000-01-01'}).json()['leaders']
+            self.assertTrue(rollup, name)
+            self.assertEqual(by_player(rollup), by_player(scanned), name)
+
+    def test_leaders_ignore_running_tournaments(self):
+        # Busted out of the live game with rebuys and a payout, and out of a running FREE game with bounties
+        player = self.room['players'][0]
+        reg = self.live.registrations.get(player=player)
+        Registration.objects.filter(id=reg.id).update(rebuys=5)
+        Payout.objects.filter(tournament=self.live, place=2).update(player=player)
+        self.post('api_eliminate_player', [self.live.id], {'registration_id': reg.id})
+        free = Tournament.objects.create(name='Freeroll', date=timezone.now(), type='FREE', status='RUNNING')
+        Registration.objects.create(tournament=free, player=player)
+        free_reg = Registration.objects.create(tournament=free, player=self.room['players'][1])
+        self.post('api_eliminate_player', [free.id], {'registration_id': free_reg.id, 'bounty_count': 7})
+
+        by_player = lambda leaders: {leader['player_id']: leader for leader in leaders}
+        for name in ('api_paid_payout_leaders', 'api_paid_rebuy_leaders', 'api_free_bounty_leaders'):
+            rollup = self.client.get(reverse(name)).json()['leaders']
+            scanned = self.client.get(reverse(name), {'date_from': '2000-01-01'}).json()['leaders']
+            self.assertEqual(by_player(rollup), by_player(scanned), name)
+
+    def test_migration_backfills_existing_results(self):
+        import importlib
+        from django.db.migrations.loader import MigrationLoader
+        from .models import PlayerStats
+        expected = list(PlayerStats.objects.order_by('player', 'season').values('player', 'season', 'games', 'winnings'))
+        PlayerStats.objects.all().delete()
+
+        migration = importlib.import_module('core.migrations.0011_backfill_player_stats')
+        state = MigrationLoader(connection).project_state(('core', '0011_backfill_player_stats'))
+        migration.backfill(state.apps, None)
+
+        self.assertEqual(
+            list(PlayerStats.objects.order_by('player', 'season').values('player', 'season', 'games', 'winnings')),
+            expected,
+        )
+
+
+class WaitlistTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name='Sit & Go', date=timezone.now(), type='FREE', max_entries=2)
+        self.players = Player.objects.bulk_create([
+            Player(telegram_id=str(i), first_name=f'Player {i}') for i in range(5)
+        ])
+
+    def post(self, name, data):
+        return self.client.post(
+            reverse(name, args=[self.tournament.id]), json.dumps(data), content_type='application/json'
+        )
+
+    def fill(self):
+        from .registration import register
+        return [register(self.tournament.id, player)[0] for player in self.players[:2]]
+
+    def queue(self, *players):
+        from .registration import register
+        return [register(self.tournament.id, player, waitlist=True) for player in players]
+
+    def test_full_tournament_refuses_or_queues(self):
+        from .registration import register, waitlist_position, TournamentFull
+        self.fill()
+        with self.assertRaises(TournamentFull):
+            register(self.tournament.id, self.players[2])
+
+        response = self.post('api_register_player', {'player_id': self.players[2].id})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Tournament is full')
+
+        (first, created), (second, _) = self.queue(self.players[2], self.players[3])
+        self.assertTrue(created)
+        self.assertIsInstance(first, WaitlistEntry)
+        self.assertEqual([waitlist_position(first), waitlist_position(second)], [1, 2])
+        # Asking again keeps the place in the queue
+        self.assertEqual(self.queue(self.players[2]), [(first, False)])
+        self.assertEqual(self.tournament.registrations.count(), 2)
+
+    def test_unregister_promotes_the_head_of_the_queue(self):
+        registrations = self.fill()
+        self.queue(self.players[2], self.players[3])
+
+        response = self.post('api_unregister_player', {'registration_id': registrations[0].id})
+        self.assertEqual(response.json()['promoted'], [self.players[2].id])
+
+        self.assertEqual(
+            set(self.tournament.registrations.values_list('player_id', flat=True)),
+            {self.players[1].id, self.players[2].id},
+        )
+        self.assertEqual(list(self.tournament.waitlist.values_list('player_id', flat=True)), [self.players[3].id])
+        event = self.tournament.events.get(type='player_registered', payload__player_id=self.players[2].id)
+        self.assertTrue(event.payload['from_waitlist'])
+
+    def test_raised_cap_goes_to_the_queue_first(self):
+        from .registration import register
+        self.fill()
+        self.queue(self.players[2])
+        Tournament.objects.filter(id=self.tournament.id).update(max_entries=3)
+
+        # The newcomer is queued behind the player who was waiting
+        entry, created = register(self.tournament.id, self.players[3], waitlist=True)
+        self.assertIsInstance(entry, WaitlistEntry)
+        self.assertTrue(self.tournament.registrations.filter(player=self.players[2]).exists())
+
+    def test_leave_waitlist(self):
+        from .registration import waitlist_position
+        registrations = self.fill()
+        (first, _), (second, _) = self.queue(self.players[2], self.players[3])
+
+        response = self.post('api_leave_waitlist', {'player_id': self.players[2].id})
+        self.assertEqual(response.json(), {'status': 'left_waitlist', 'player_id': self.players[2].id})
+        self.assertEqual(waitlist_position(second), 1)
+
+        response = self.post('api_leave_waitlist', {'player_id': self.players[2].id})
+        self.assertEqual(response.status_code, 400)
+
+        # The freed spot goes to whoever is still queued
+        response = self.post('api_unregister_player', {'registration_id': registrations[0].id})
+        self.assertEqual(response.json()['promoted'], [self.players[3].id])
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class SeriesSchedulingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Player.objects.create(telegram_id='1', first_name='Admin', is_admin=True)
+        cls.template = TournamentTemplate.objects.create(name='Weekly', type='PAID', buy_in=50)
+        TemplateLevel.objects.bulk_create([
+            TemplateLevel(template=cls.template, level_number=i, small_blind=25 * i, big_blind=50 * i, duration=20)
+            for i in range(1, 4)
+        ])
+        cls.series = TournamentSeries.objects.create(
+            name='Friday Deepstack', template=cls.template, weekday=4, start_time='19:00'
+        )
+
+    def setUp(self):
+        session = self.client.session
+        session['player_id'] = self.admin.id
+        session.save()
+
+    def schedule(self, weeks=4):
+        from .structures import schedule_series
+        start = timezone.now()
+        return schedule_series(TournamentSeries.objects.all(), start, start + timedelta(weeks=weeks))
+
+    def test_template_in_use_is_not_deleted(self):
+        url = reverse('template_delete', args=[self.template.id])
+        self.assertContains(self.client.get(url), 'Friday Deepstack')
+        response = self.client.post(url)
+        self.assertContains(response, 'Friday Deepstack')
+        self.assertTrue(TournamentTemplate.objects.filter(id=self.template.id).exists())
+
+        self.series.delete()
+        self.assertRedirects(self.client.post(url), reverse('template_list'), fetch_redirect_response=False)
+        self.assertFalse(TournamentTemplate.objects.filter(id=self.template.id).exists())
+
+    def test_empty_template_gets_the_default_structure(self):
+        empty = TournamentTemplate.objects.create(name='Empty', type='FREE')
+        self.client.post(reverse('tournament_create'), {
+            'name': 'Tuesday', 'date': '2030-01-01T19:00', 'type': 'FREE', 'stack': 10000, 'template': empty.id,
+        })
+        TournamentSeries.objects.filter(id=self.series.id).update(template=empty)
+        scheduled = self.schedule(weeks=1)[0]
+        # tournament_create and the scheduler fall back the same way
+        for tournament in (Tournament.objects.get(name='Tuesday'), scheduled):
+            self.assertEqual(tournament.levels.count(), 10)
+
+    def test_reruns_fill_the_gaps(self):
+        self.assertEqual(len(self.schedule()), 4)
+        Tournament.objects.filter(series=self.series).order_by('date').first().delete()
+        created = self.schedule()
+        self.assertEqual(len(created), 1)
+        self.assertEqual(created[0].levels.count(), 3)
+
+    def test_concurrent_run(self):
+        from . import structures
+        series_dates = structures.series_dates
+
+        def racing_series_dates(series, start, end):
+            # Another run commits the first occurrence after this one read the existing dates
+            dates = list(series_dates(series, start, end))
+            Tournament.objects.create(series=series, name=series.name, date=dates[0], type='PAID')
+            return dates
+
+        with mock.patch.object(structures, 'series_dates', racing_series_dates):
+            created = self.schedule()
+        self.assertEqual(len(created), 3)
+        self.assertEqual(Tournament.objects.filter(series=self.series).count(), 4)
+        for tournament in created:
+            self.assertEqual(tournament.levels.count(), 3)
+
+
+class DisplayStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tournament = Tournament.objects.create(name='Main Event', date=timezone.now(), type='PAID', status='RUNNING')
+        TournamentLevel.objects.create(tournament=cls.tournament, level_number=1, small_blind=25, big_blind=50, duration=20)
+
+    def setUp(self):
+        from .display import hub
+        hub.clear()
+
+    def events(self, body):
+        return [message.split('\n')[0] for message in body.split('\n\n') if message]
+
+    @override_settings(DISPLAY_STREAM_SECONDS=300)
+    def test_short_polls_under_wsgi(self):
+        # The stream ends at once instead of holding the worker for DISPLAY_STREAM_SECONDS
+        url = reverse('api_display_stream', args=[self.tournament.id])
+        started = time.monotonic()
+        body = b''.join(self.client.get(url).streaming_content).decode()
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(self.events(body), ['retry: 3000', 'event: state'])
+
+        # A screen that is up to date gets nothing but the retry
+        sequence = body.split('id: ')[1].split('\n')[0]
+        body = b''.join(self.client.get(url, headers={'Last-Event-ID': sequence}).streaming_content).decode()
+        self.assertEqual(self.events(body), ['retry: 3000'])
+
+    @override_settings(DISPLAY_STREAM_SECONDS=0)
+    def test_asgi_streams_run_side_by_side(self):
+        import asyncio
+        from asgiref.sync import async_to_sync
+        from .display import DisplayStream, hub
+
+        def slow_get(tournament_id):
+            time.sleep(0.3)
+            return 1, {}
+
+        async def consume():
+            return [message async for message in DisplayStream(self.tournament.id)]
+
+        async def screens():
+            return await asyncio.gather(*(consume() for _ in range(4)))
+
+        with mock.patch.object(hub, 'get', slow_get):
+            started = time.monotonic()
+            streams = async_to_sync(screens)()
+        # Not queued one after another on a single thread
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertEqual([len(messages) for messages in streams], [2] * 4)
+
+    @override_settings(DISPLAY_STREAM_SECONDS=0)
+    def test_asgi_streams_drop_old_connections(self):
+        from asgiref.sync import async_to_sync
+        from .display import DisplayStream, hub
+
+        async def consume():
+            return [message async for message in DisplayStream(self.tournament.id)]
+
+        with mock.patch.object(hub, 'get', return_value=(1, {})), \
+                mock.patch('core.display.close_old_connections') as close:
+            messages = async_to_sync(consume)()
+        # Before and after each of the three steps: retry, state, end
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(close.call_count, 6)
+
+
+class JournalTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name='Friday', date=timezone.now(), type='PAID', buy_in=50)
+
+    def record(self, tournament, count):
+        from .events import record_event
+        with transaction.atomic():
+            return [record_event(tournament, 'note', f'Note {i}').sequence for i in range(count)]
+
+    def test_sequences_are_consecutive_per_tournament(self):
+        other = Tournament.objects.create(name='Saturday', date=timezone.now(), type='FREE')
+        self.assertEqual(self.record(self.tournament, 3), [1, 2, 3])
+        self.assertEqual(self.record(other, 2), [1, 2])
+        self.assertEqual(self.record(self.tournament, 1), [4])
+
+    def test_rolled_back_events_leave_no_gap(self):
+        self.record(self.tournament, 2)
+        with self.assertRaises(RuntimeError), self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                self.record(self.tournament, 1)
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.record(self.tournament, 1), [3])
+
+    def test_after_commit_hook_waits_for_the_commit(self):
+        with mock.patch('core.events.after_commit') as after_commit:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.record(self.tournament, 1)
+                after_commit.assert_not_called()
+        after_commit.assert_called_once_with(self.tournament.id, 'note', {})
+
+    def test_events_endpoint_pages(self):
+        self.record(self.tournament, 5)
+        url = reverse('api_get_events', args=[self.tournament.id])
+
+        pages, after = [], 0
+        while True:
+            page = self.client.get(url, {'after': after, 'limit': 2}).json()
+            pages.append([event['sequence'] for event in page['events']])
+            after = page['last_sequence']
+            if not page['has_more']:
+                break
+        self.assertEqual(pages, [[1, 2], [3, 4], [5]])
+        self.assertFalse(self.client.get(url, {'after': 3, 'limit': 2}).json()['has_more'])
+
+        for limit in ('0', '-1', '1001', 'x'):
+            self.assertEqual(self.client.get(url, {'limit': limit}).status_code, 400, limit)
+
+    def test_mutating_view_rolls_back_with_its_journal(self):
+        player = Player.objects.create(telegram_id='1', first_name='Ann')
+        reg = Registration.objects.create(tournament=self.tournament, player=player, status='REGISTERED')
+        url = reverse('api_unregister_player', args=[self.tournament.id])
+
+        # Fails after journaling player_unregistered and deleting the registration
+        with mock.patch('core.registration.promote_waitlist', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(url, json.dumps({'registration_id': reg.id}), content_type='application/json')
+
+        self.assertTrue(Registration.objects.filter(id=reg.id).exists())
+        self.assertFalse(self.tournament.events.exists())
+
+
+class ConcurrentWriteTests(TransactionTestCase):
+    """Mutating views from several threads against a file database, where SQLite locks as it does in production"""
+
+    THREADS = 8
+    REQUESTS = 10
+
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name='Friday', date=timezone.now(), type='PAID', buy_in=50)
+        player = Player.objects.create(telegram_id='1', first_name='Ann')
+        self.reg = Registration.objects.create(tournament=self.tournament, player=player, status='REGISTERED')
+
+    def copy_to_file(self, directory):
+        """Copies the in-memory test database to a file"""
+        import sqlite3
+        path = os.path.join(directory, 'db.sqlite3')
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        target.close()
+        return path
+
+    def test_concurrent_rebuys(self):
+        import sqlite3
+        from concurrent.futures import ThreadPoolExecutor
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite locking')
+        url = reverse('api_rebuy_player', args=[self.tournament.id])
+
+        def rebuys():
+            client = self.client_class()
+            try:
+                return [
+                    client.post(url, json.dumps({'registration_id': self.reg.id}), content_type='application/json').status_code
+                    for _ in range(self.REQUESTS)
+                ]
+            finally:
+                connection.close()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.copy_to_file(directory)
+            # Connections opened from here on (the threads') use the file
+            with mock.patch.dict(connection.settings_dict, {'NAME': path}), ThreadPoolExecutor(self.THREADS) as pool:
+                statuses = [status for result in [pool.submit(rebuys) for _ in range(self.THREADS)] for status in result.result()]
+            with sqlite3.connect(path) as db:
+                rebuys_done = db.execute('SELECT rebuys FROM core_registration WHERE id = ?', [self.reg.id]).fetchone()[0]
+                events = db.execute(
+                    'SELECT COUNT(*), COUNT(DISTINCT sequence) FROM core_gameevent WHERE tournament_id = ?', [self.tournament.id]
+                ).fetchone()
+
+        total = self.THREADS * self.REQUESTS
+        self.assertEqual(statuses, [200] * total)
+        self.assertEqual(rebuys_done, total)
+        self.assertEqual(events, (total, total))
+
+
+class RegistrationTests(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(name='Friday', date=timezone.now(), type='FREE')
+        self.player = Player.objects.create(telegram_id='1', first_name='Ann')
+
+    def test_registering_twice_returns_the_registration(self):
+        from .registration import register
+        reg, created = register(self.tournament.id, self.player)
+        again, created_again = register(self.tournament.id, self.player)
+        self.assertEqual((created, again.id, created_again), (True, reg.id, False))
+        self.assertEqual(self.tournament.events.filter(type='player_registered').count(), 1)
+
+    def test_losing_the_insert_race_returns_the_winner(self):
+        from .registration import _create_registration
+        # Another connection registered the player between our check and insert
+        winner = Registration.objects.create(tournament=self.tournament, player=self.player, status='REGISTERED')
+        reg, created = _create_registration(self.tournament, self.player, 'Ann registered')
+        self.assertEqual((reg.id, created), (winner.id, False))
+        self.assertFalse(self.tournament.events.exists())
+
+    def test_closed_registration(self):
+        from .registration import register, RegistrationClosed
+        Tournament.objects.filter(id=self.tournament.id).update(registration_closed=True)
+        with self.assertRaises(RegistrationClosed):
+            register(self.tournament.id, self.player)
+
+
+class CloneTournamentTests(TestCase):
+    def setUp(self):
+        self.source = Tournament.objects.create(
+            name='Friday', date=timezone.now(), type='PAID', buy_in=50, status='FINISHED', current_level_index=7
+        )
+        TournamentLevel.objects.bulk_create([
+            TournamentLevel(tournament=self.source, level_number=i, small_blind=25 * i, big_blind=50 * i, duration=20)
+            for i in range(1, 4)
+        ])
+        Table.objects.bulk_create([Table(tournament=self.source, table_number=i, max_seats=9) for i in (1, 2)])
+        player = Player.objects.create(telegram_id='1', first_name='Ann')
+        Payout.objects.create(tournament=self.source, place=1, amount=500, player=player)
+
+    def clone(self, data):
+        return self.client.post(
+            reverse('api_clone_tournament', args=[self.source.id]), json.dumps(data), content_type='application/json'
+        )
+
+    def test_weekly_copies(self):
+        response = self.clone({'count': 3, 'name': 'Friday Deepstack'})
+        self.assertEqual(response.status_code, 200)
+
+        clones = Tournament.objects.filter(id__in=[t['id'] for t in response.json()['tournaments']]).order_by('date')
+        self.assertEqual(
+            [clone.date for clone in clones],
+            [self.source.date + timedelta(weeks=week) for week in (1, 2, 3)],
+        )
+        for clone in clones:
+            self.assertEqual((clone.name, clone.buy_in, clone.status), ('Friday Deepstack', 50, 'SCHEDULED'))
+            self.assertEqual(clone.current_level_index, 0)
+            self.assertEqual(list(clone.levels.values_list('big_blind', flat=True)), [50, 100, 150])
+            self.assertEqual(sorted(clone.tables.values_list('table_number', flat=True)), [1, 2])
+            # The payout structure, without the source's winners
+            self.assertEqual(list(clone.payouts.values_list('place', 'amount', 'player')), [(1, 500, None)])
+            self.assertEqual(list(clone.events.values_list('type', flat=True)), ['tables_generated'])
+
+    def test_bad_count(self):
+        for count in (None, 'three', '3', 2.5, True, 0, 53, [3]):
+            response = self.clone({'count': count})
+            self.assertEqual(response.status_code, 400, count)
+            self.assertEqual(response.json(), {'error': 'count must be between 1 and 52'})
+        self.assertEqual(Tournament.objects.count(), 1)
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        # Pairs on the same date, so the id has to break ties
+        Tournament.objects.bulk_create([
+            Tournament(name=f'T{i}', date=now - timedelta(days=i // 2), type='FREE') for i in range(7)
+        ])
+        self.newest_first = list(Tournament.objects.order_by('-date', '-id'))
+
+    def test_walks_every_row_once_both_ways(self):
+        from .pagination import keyset_page
+        pages, page = [], keyset_page(Tournament.objects.all(), per_page=3)
+        while True:
+            pages.append(page)
+            if not page['older']:
+                break
+            page = keyset_page(Tournament.objects.all(), after=page['older'], per_page=3)
+        self.assertEqual([item for page in pages for item in page['items']], self.newest_first)
+        self.assertEqual([len(page['items']) for page in pages], [3, 3, 1])
+        self.assertIsNone(pages[0]['newer'])
+
+        back = keyset_page(Tournament.objects.all(), before=pages[-1]['newer'], per_page=3)
+        self.assertEqual(back['items'], pages[1]['items'])
+        self.assertEqual((back['newer'], back['older']), (pages[1]['newer'], pages[1]['older']))
+
+    def test_bad_input_falls_back(self):
+        from .pagination import keyset_page, page_size, MAX_PAGE_SIZE
+        self.assertEqual(keyset_page(Tournament.objects.all(), after='garbage', per_page=3)['items'], self.newest_first[:3])
+        self.assertEqual([page_size('0'), page_size('1000'), page_size('x', default=5)], [1, MAX_PAGE_SIZE, 5])
+
+
+class JournalReplayTests(TestCase):
+    """Replaying the journal rebuilds what the mutating views wrote, and restore writes it back"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tournament = Tournament.objects.create(name='Main Event', date=timezone.now(), type='PAID', buy_in=100)
+        TournamentLevel.objects.bulk_create([
+            TournamentLevel(tournament=cls.tournament, level_number=i, small_blind=25 * i, big_blind=50 * i, duration=20)
+            for i in range(1, 4)
+        ])
+
+    def post(self, name, data=None, args=()):
+        response = self.client.post(
+            reverse(name, args=[self.tournament.id, *args]), json.dumps(data or {}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def play(self):
+        """A mixed journal: registrations, seating, clock, eliminations, rebuys and moves"""
+        regs = [self.post('api_register_player', {'name': f'Player {i}'})['registration_id'] for i in range(12)]
+        self.post('api_unregister_player', {'registration_id': regs.pop()})
+        self.post('api_generate_tables')
+        self.post('api_start_timer')
+        self.post('api_rebuy_player', {'registration_id': regs[0]})
+        self.post('api_addon_player', {'registration_id': regs[1]})
+        self.post('api_eliminate_player', {'registration_id': regs[2], 'bounty_count': 1})
+        table = self.post('api_add_table', {'max_seats': 9})['table']
+        self.post('api_move_player', {'registration_id': regs[3], 'table_id': table['id'], 'seat_number': 4})
+        self.post('api_next_level')
+        self.post('api_pause_timer')
+        self.post('api_start_timer')
+
+    def test_replay_matches_the_database(self):
+        from .replay import replay, current_state, diff_states
+        self.play()
+        state, sequence = replay(self.tournament)
+        self.assertEqual(sequence, self.tournament.events.count())
+        self.assertEqual(diff_states(state, current_state(self.tournament)), [])
+
+    def test_replay_after_seating_selected_players(self):
+        from .replay import replay, current_state, diff_states
+        regs = [self.post('api_register_player', {'name': f'Player {i}'})['registration_id'] for i in range(3)]
+        table = self.post('api_add_table', {'max_seats': 2})['table']
+        self.post('api_move_player', {'registration_id': regs[0], 'table_id': table['id'], 'seat_number': 1})
+        self.post('api_move_player', {'registration_id': regs[1], 'table_id': table['id'], 'seat_number': 2})
+        # At the table without a seat
+        self.post('api_move_player', {'registration_id': regs[2], 'table_id': table['id']})
+
+        # The table is full: the player only loses the table
+        self.assertEqual(self.post('api_seat_selected_players', {'registration_ids': [regs[2]]})['status'], 'no_space')
+        self.assertIsNone(Registration.objects.get(id=regs[2]).table_id)
+        self.assertEqual(diff_states(replay(self.tournament)[0], current_state(self.tournament)), [])
+
+        self.post('api_move_player', {'registration_id': regs[2], 'table_id': table['id']})
+        self.post('api_add_table', {'max_seats': 2})
+        self.assertEqual(self.post('api_seat_selected_players', {'registration_ids': [regs[2]]})['seated_count'], 1)
+        self.assertEqual(diff_states(replay(self.tournament)[0], current_state(self.tournament)), [])
+
+    @mock.patch('core.events.SNAPSHOT_INTERVAL', 5)
+    def test_replay_from_snapshots(self):
+        from .replay import replay, current_state, diff_states
+        self.play()
+        self.assertTrue(self.tournament.snapshots.exists())
+        state, _ = replay(self.tournament)
+        self.assertEqual(diff_states(state, current_state(self.tournament)), [])
+
+    def test_restore_keeps_full_precision(self):
+        from .replay import replay, restore, current_state
+        self.play()
+        self.post('api_pause_timer')
+        # A start time with a sub-millisecond part the journal must keep
+        recorded = timezone.now().replace(microsecond=123456)
+        with mock.patch('django.utils.timezone.now', return_value=recorded):
+            self.post('api_start_timer')
+        self.assertEqual(Tournament.objects.get(id=self.tournament.id).level_started_at, recorded)
+
+        state, _ = replay(self.tournament)
+        Tournament.objects.filter(id=self.tournament.id).update(level_started_at=timezone.now(), status='PAUSED')
+        self.tournament.registrations.update(rebuys=9, table=None, seat_number=None)
+        restore(self.tournament, state)
+
+        self.assertEqual(Tournament.objects.get(id=self.tournament.id).level_started_at, recorded)
+        self.assertEqual(current_state(self.tournament), state)
+
+
+class AsyncReadTests(TestCase):
+    """The read views are async: served over ASGI without a thread, same payloads as over WSGI"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.tournament = Tournament.objects.create(name='Main Event', date=now, type='PAID', status='RUNNING', buy_in=100)
+        TournamentLevel.objects.bulk_create([
+            TournamentLevel(tournament=cls.tournament, level_number=i, small_blind=25 * i, big_blind=50 * i, duration=20)
+            for i in range(1, 4)
+        ])
+        table = Table.objects.create(tournament=cls.tournament, table_number=1)
+        players = Player.objects.bulk_create([Player(telegram_id=str(i), first_name=f'Player {i}') for i in range(9)])
+        Registration.objects.bulk_create([
+            Registration(tournament=cls.tournament, player=p, table=table, seat_number=i + 1) for i, p in enumerate(players)
+        ])
+        Payout.objects.create(tournament=cls.tournament, place=1, amount=900)
+        finished = Tournament.objects.create(name='Last week', date=now - timedelta(weeks=1), type='PAID', status='FINISHED', buy_in=100)
+        Registration.objects.create(tournament=finished, player=players[0], status='ELIMINATED', place=1, rebuys=1)
+
+    def setUp(self):
+        from .stats_cache import stats_cache
+        stats_cache().clear()
+
+    def test_middleware_is_async_capable(self):
+        from django.conf import settings
+        from django.utils.module_loading import import_string
+        for path in settings.MIDDLEWARE:
+            self.assertTrue(getattr(import_string(path), 'async_capable', False), f'{path} is sync-only')
+
+    async def test_same_payloads_over_asgi(self):
+        from asgiref.sync import sync_to_async
+        live = [self.tournament.id]
+        urls = [reverse(name, args=live) for name in (
+            'api_get_status', 'api_get_players', 'api_get_tables', 'api_get_levels', 'api_get_payouts'
+        )] + [reverse(name) for name in (
+            'api_paid_tournament_results', 'api_paid_payout_leaders', 'api_paid_rebuy_leaders',
+            'api_free_tournament_results', 'api_free_bounty_leaders', 'api_get_tournament_years',
+        )] + [reverse('api_paid_payout_leaders') + '?date_from=2000-01-01']
+
+        for url in urls:
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            expected = await sync_to_async(self.client.get)(url)
+            if 'remaining_seconds' in expected.json():
+                continue  # the clock may have ticked
+            self.assertEqual(response.json(), expected.json(), url)
+
+    async def test_query_metrics_over_asgi(self):
+        from .metrics import registry
+        registry.reset()
+        await self.async_client.get(reverse('api_get_status', args=[self.tournament.id]))
+        text = registry.render()
+        self.assertIn('poker_db_queries_bucket{view="api_get_status",le="2"} 0', text)
+        self.assertIn('poker_db_queries_bucket{view="api_get_status",le="5"} 1', text)
+
+
+class SerializationTests(TestCase):
+    DATA = {
+        'when': timezone.now(),
+        'amount': Decimal('12.50'),
+        'tables': [{'id': 1, 'seats': [{'seat': 1, 'name': 'A'}, {'seat': 2, 'name': 'B'}]}],
+        'mixed': [{'a': 1}, {'b': 2}],
+    }
+
+    def test_matches_json_response(self):
+        from .serialization import dumps
+        expected = json.loads(JsonResponse(self.DATA).content)
+        self.assertEqual(json.loads(dumps(self.DATA)), expected)
+        with mock.patch('core.serialization.orjson', None):
+            self.assertEqual(json.loads(dumps(self.DATA)), expected)
+
+    def test_columnar(self):
+        from .serialization import columnar
+        self.assertEqual(columnar(self.DATA)['tables'], {
+            'columns': ['id', 'seats'],
+            'rows': [[1, {'columns': ['seat', 'name'], 'rows': [[1, 'A'], [2, 'B']]}]],
+        })
+        # Rows with different keys stay as they are
+        self.assertEqual(columnar(self.DATA)['mixed'], self.DATA['mixed'])
+
+    def test_format_query_param(self):
+        tournament = Tournament.objects.create(name='Main Event', date=timezone.now())
+        response = self.client.get(reverse('api_get_tables', args=[tournament.id]) + '?format=compact')
+        self.assertEqual(response.json(), {'tables': []})
+        self.assertIn('Accept', response['Vary'])
+
+
+class CompressionTests(TestCase):
+    def setUp(self):
+        from .stats_cache import stats_cache
+        stats_cache().clear()
+        self.tournament = Tournament.objects.create(name='Main Event', date=timezone.now(), type='PAID', status='RUNNING')
+        players = Player.objects.bulk_create([Player(telegram_id=str(i), first_name=f'Player {i}') for i in range(40)])
+        Registration.objects.bulk_create([Registration(tournament=self.tournament, player=p) for p in players])
+
+    def test_negotiated_gzip(self):
+        url = reverse('api_get_players', args=[self.tournament.id])
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'br;q=1.0, gzip;q=0.8'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+
+        refused = self.client.get(url, headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertFalse(refused.has_header('Content-Encoding'))
+
+    def test_malformed_q_values_refuse_the_coding(self):
+        url = reverse('api_get_players', args=[self.tournament.id])
+        for header in ('gzip;q=1.0.0', 'gzip;q=.', 'gzip;q=', 'gzip;q=nan', 'gzip;q=2'):
+            response = self.client.get(url, headers={'Accept-Encoding': header})
+            self.assertEqual(response.status_code, 200, header)
+            self.assertFalse(response.has_header('Content-Encoding'), header)
+        self.assertEqual(self.client.get(url, headers={'Accept-Encoding': 'gzip; q=0.5'})['Content-Encoding'], 'gzip')
+
+    def test_pages_are_padded_against_breach(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .compression import CompressionMiddleware
+        page = ('<form><input name="csrfmiddlewaretoken" value="secret"></form>' * 50).encode()
+        middleware = CompressionMiddleware(lambda request: HttpResponse(page))
+        request = RequestFactory().get('/', headers={'Accept-Encoding': 'br, gzip'})
+        # Brotli is never used for pages, even when installed and preferred
+        with mock.patch('core.compression.available_encodings', return_value=('br', 'gzip')):
+            responses = [middleware(request) for _ in range(10)]
+        self.assertEqual({response['Content-Encoding'] for response in responses}, {'gzip'})
+        self.assertEqual({gzip.decompress(response.content) for response in responses}, {page})
+        # The random padding varies the compressed length of the same page
+        self.assertGreater(len({len(response.content) for response in responses}), 1)
+
+        refused = middleware(RequestFactory().get('/', headers={'Accept-Encoding': 'br'}))
+        self.assertFalse(refused.has_header('Content-Encoding'))
+
+    @override_settings(COMPRESSION_MIN_BYTES=1_000_000)
+    def test_small_responses_stay_plain(self):
+        response = self.client.get(reverse('api_get_players', args=[self.tournament.id]), headers={'Accept-Encoding': 'gzip'})
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_stats_cache_invalidated_when_a_tournament_finishes(self):
+        url = reverse('api_paid_tournament_results')
+        self.assertEqual(self.client.get(url).json()['tournaments'], [])
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('api_finish_tournament', args=[self.tournament.id]))
+        self.assertEqual(len(self.client.get(url).json()['tournaments']), 1)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        from .metrics import registry
+        registry.reset()
+        self.tournament = Tournament.objects.create(name='Main Event', date=timezone.now())
+        self.admin = Player.objects.create(telegram_id='1', first_name='Admin', is_admin=True)
+
+    def login(self, player):
+        session = self.client.session
+        session['player_id'] = player.id
+        session.save()
+
+    def test_admins_only(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.login(Player.objects.create(telegram_id='2', first_name='Regular'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.login(self.admin)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='scrape')
+    def test_scraper_token(self):
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer scrape'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer wrong'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_records_per_view_histograms(self):
+        for _ in range(3):
+            self.client.get(reverse('api_get_status', args=[self.tournament.id]))
+        self.client.get('/no/such/page/')
+        self.login(self.admin)
+        text = self.client.get(reverse('metrics')).content.decode()
+
+        self.assertIn('poker_request_duration_seconds_count{view="api_get_status"} 3', text)
+        self.assertIn('poker_db_queries_bucket{view="api_get_status",le="+Inf"} 3', text)
+        self.assertIn('poker_db_duration_seconds_sum{view="api_get_status"}', text)
+        self.assertIn('poker_response_bytes_count{view="api_get_status"} 3', text)
+        self.assertIn('poker_responses_total{view="api_get_status",status="200"} 3', text)
+        self.assertIn('poker_responses_total{view="<unresolved>",status="404"} 1', text)
+
+    def test_slow_request_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_PROFILE_RATE=1, METRICS_PROFILE_THRESHOLD_MS=0, METRICS_PROFILE_DIR=directory):
+                self.client.get(reverse('api_get_status', args=[self.tournament.id]))
+            dumps = os.listdir(directory)
+        self.assertEqual(len(dumps), 1)
+        self.assertTrue(dumps[0].startswith('api_get_status-'))
@@ -9,6 +9,7 @@ urlpatterns = [
     path('tournament/<int:tournament_id>/control/', views.tournament_control, name='tournament_control'),
     path('tournament/<int:tournament_id>/display/', views.tournament_display, name='tournament_display'),
     path('tournament/<int:tournament_id>/info/', views.tournament_info, name='tournament_info'),
+    path('tournament/<int:tournament_id>/tv/', views.tournament_tv, name='tournament_tv'),
 
     # Statistics
     path('stats/paid/', views.paid_tournaments_stats, name='paid_tournaments_stats'),
@@ -29,6 +30,9 @@ urlpatterns = [
     path('api/tournament/<int:tournament_id>/timer/set/', api.set_timer, name='api_set_timer'),
     path('api/tournament/<int:tournament_id>/finish/', api.finish_tournament, name='api_finish_tournament'),
     path('api/tournament/<int:tournament_id>/status/', api.get_status, name='api_get_status'),
+    path('api/tournament/<int:tournament_id>/events/', api.get_events, name='api_get_events'),
+    path('api/tournament/<int:tournament_id>/stream/', api.display_stream, name='api_display_stream'),
+    path('api/tournament/<int:tournament_id>/clone/', api.clone_tournament, name='api_clone_tournament'),
     
     # Player API
     path('api/tournament/<int:tournament_id>/players/', api.get_players, name='api_get_players'),
@@ -37,6 +41,7 @@ urlpatterns = [
     path('api/tournament/<int:tournament_id>/rebuy/', api.rebuy_player, name='api_rebuy_player'),
     path('api/tournament/<int:tournament_id>/addon/', api.addon_player, name='api_addon_player'),
     path('api/tournament/<int:tournament_id>/unregister/', api.unregister_player, name='api_unregister_player'),
+    path('api/tournament/<int:tournament_id>/waitlist/leave/', api.leave_waitlist, name='api_leave_waitlist'),
     path('api/players/search/', api.search_players, name='api_search_players'),
     
     # Table API
@@ -69,6 +74,9 @@ urlpatterns = [
     path('api/stats/free/bounties/', api.free_bounty_leaders, name='api_free_bounty_leaders'),
     path('api/stats/tournament-years/', api.get_tournament_years, name='api_get_tournament_years'),
 
+    # Monitoring
+    path('metrics/', views.metrics, name='metrics'),
+
     # Bot
     path('bot/', include('bot.urls')),
 ]
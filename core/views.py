@@ -1,5 +1,5 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.db import models
+from django.db import models, transaction
 from .models import Tournament, Player, Registration, Table, Payout, TournamentLevel, TournamentTemplate, TemplateLevel
 from .forms import TournamentTemplateForm, TournamentForm, TemplateLevelFormSet
 
@@ -27,10 +27,24 @@ def dashboard(request):
     if date_to:
         tournaments = tournaments.filter(date__lte=date_to)
 
-    tournaments = tournaments.order_by('-date')
+    # Keyset pagination on (date, id): newest first, constant cost per page
+    from urllib.parse import urlencode
+    from .pagination import keyset_page, page_size
+    per_page = page_size(request.GET.get('per_page'))
+    page = keyset_page(
+        tournaments, after=request.GET.get('after'), before=request.GET.get('before'), per_page=per_page
+    )
+
+    # Filters (and page size) carried over to the pagination links
+    filter_query = urlencode({
+        key: value for key, value in request.GET.items()
+        if key in ('type', 'status', 'date_from', 'date_to', 'per_page') and value
+    })
 
     return render(request, 'core/dashboard.html', {
-        'tournaments': tournaments,
+        'tournaments': page['items'],
+        'page': page,
+        'filter_query': filter_query,
         'filters': {
             'type': tournament_type,
             'status': status,
@@ -76,6 +90,22 @@ def tournament_display(request, tournament_id):
     }
     return render(request, 'core/tournament_display.html', context)
 
+def tournament_tv(request, tournament_id):
+    """
+    Lightweight lobby display: a static page and a script that take all their
+    state from api.display_stream, so it's rendered without the request
+    context and cached by the screen.
+    """
+    from django.conf import settings
+    from django.http import HttpResponse
+    from django.template.loader import render_to_string
+    from django.utils.cache import patch_cache_control
+
+    get_object_or_404(Tournament.objects.only('id'), id=tournament_id)
+    response = HttpResponse(render_to_string('core/tournament_tv.html', {'tournament_id': tournament_id}))
+    patch_cache_control(response, public=True, max_age=settings.DISPLAY_PAGE_MAX_AGE)
+    return response
+
 # --- Template Views ---
 
 def template_list(request):
@@ -115,10 +145,18 @@ def template_edit(request, template_id):
 def template_delete(request, template_id):
     template = get_object_or_404(TournamentTemplate, id=template_id)
     if request.method == 'POST':
-        template.delete()
-        messages.success(request, 'Template deleted successfully.')
-        return redirect('template_list')
-    return render(request, 'core/template_confirm_delete.html', {'template': template})
+        try:
+            template.delete()
+        except models.ProtectedError:
+            # Weekly series still schedule from it (TournamentSeries.template is PROTECT)
+            messages.error(request, 'Template is used by a weekly series and cannot be deleted.')
+        else:
+            messages.success(request, 'Template deleted successfully.')
+            return redirect('template_list')
+    return render(request, 'core/template_confirm_delete.html', {
+        'template': template,
+        'series': template.series.all(),
+    })
 
 # --- Tournament Views ---
 
@@ -134,31 +172,11 @@ def tournament_create(request):
                 # Actually form fields take precedence, but we copy levels
                 pass
             
-            tournament.save()
-            
-            if template:
-                # Copy levels
-                for t_level in template.levels.all():
-                    TournamentLevel.objects.create(
-                        tournament=tournament,
-                        level_number=t_level.level_number,
-                        small_blind=t_level.small_blind,
-                        big_blind=t_level.big_blind,
-                        ante=t_level.ante,
-                        duration=t_level.duration,
-                        is_break=t_level.is_break
-                    )
-            else:
-                # Create default levels if no template
-                for i in range(1, 11):
-                    TournamentLevel.objects.create(
-                        tournament=tournament,
-                        level_number=i,
-                        small_blind=50 * (2**i), # Exponential structure example
-                        big_blind=100 * (2**i),
-                        ante=0,
-                        duration=20
-                    )
+            # Copy the template's levels (or the default structure) in one INSERT
+            from .structures import apply_template
+            with transaction.atomic():
+                tournament.save()
+                apply_template(tournament, template)
             
             messages.success(request, 'Tournament created successfully.')
             return redirect('dashboard')
@@ -166,6 +184,60 @@ def tournament_create(request):
         form = TournamentForm()
     return render(request, 'core/tournament_form.html', {'form': form})
 
+def fragment_context(kind, object_id):
+    """Key and lifetime for a page's {% cache %} fragment (see core.fragments)"""
+    from django.conf import settings
+    from .fragments import fragment_version
+    return {
+        'fragment_version': fragment_version(kind, object_id),
+        'fragment_ttl': settings.FRAGMENT_CACHE_TTL,
+        'fragment_cache': settings.FRAGMENT_CACHE,
+    }
+
+def profile_data(player):
+    """
+    Stats and tournament history for the profile page, in two queries
+    however long the history: the player's career stats row (see
+    core.player_stats) and one ordered history.
+    """
+    from .player_stats import career_stats
+
+    career = career_stats(player.id)
+    stats = {
+        'total_games': career.games,
+        'total_wins': career.wins,
+        'total_points': career.points,
+        'total_winnings': career.winnings,
+        'total_spent': career.spent,
+        'profit_loss': career.profit_loss,
+        'avg_place': career.avg_place,
+    }
+
+    # The player's payout in the registration's tournament
+    payout = models.Subquery(
+        Payout.objects.filter(
+            tournament_id=models.OuterRef('tournament_id'), player_id=models.OuterRef('player_id')
+        ).values('player_id').annotate(total=models.Sum('amount')).values('total')
+    )
+
+    # Both histories in one query, split by type
+    free_tournaments = []
+    paid_tournaments = []
+    history = Registration.objects.filter(player=player, tournament__type__in=['FREE', 'PAID']).select_related('tournament').annotate(
+        payout=payout
+    ).order_by('-tournament__date')
+    for reg in history:
+        if reg.tournament.type == 'FREE':
+            free_tournaments.append(reg)
+        else:
+            paid_tournaments.append({'registration': reg, 'payout': reg.payout})
+
+    return {
+        'stats': stats,
+        'free_tournaments': free_tournaments,
+        'paid_tournaments': paid_tournaments
+    }
+
 def profile(request):
     # Player is available from context_processors
     # Check if player is logged in
@@ -174,70 +246,35 @@ def profile(request):
 
     player = get_object_or_404(Player, id=request.session['player_id'])
 
-    # Calculate stats
-    registrations = Registration.objects.filter(player=player)
-    total_games = registrations.count()
-    total_wins = registrations.filter(place=1).count()
-    total_points = registrations.aggregate(models.Sum('points'))['points__sum'] or 0
-
-    # Calculate total winnings
-    from .models import Payout
-    total_winnings = Payout.objects.filter(player=player).aggregate(models.Sum('amount'))['amount__sum'] or 0
-
-    # Calculate total spent (buy-ins + rebuys + addons) for PAID tournaments only
-    total_spent = 0
-    paid_registrations = registrations.filter(tournament__type='PAID')
-    for reg in paid_registrations:
-        buy_in = reg.tournament.buy_in or 0
-        # Initial buy-in + rebuys + addons
-        total_spent += buy_in * (1 + reg.rebuys + reg.addons)
-
-    # Calculate profit/loss
-    profit_loss = total_winnings - total_spent
-
-    avg_place = 0
-    if total_games > 0:
-        avg_place = registrations.aggregate(models.Avg('place'))['place__avg'] or 0
-
-    # FREE tournaments history
-    free_tournaments = registrations.filter(
-        tournament__type='FREE'
-    ).select_related('tournament').order_by('-tournament__date')
-
-    # PAID tournaments history with payouts
-    paid_tournaments_list = []
-    paid_regs = registrations.filter(
-        tournament__type='PAID'
-    ).select_related('tournament').order_by('-tournament__date')
-
-    # Get payouts for paid tournaments
-    payouts = Payout.objects.filter(player=player).select_related('tournament')
-    payouts_dict = {p.tournament_id: p.amount for p in payouts}
-
-    # Combine registrations with payouts
-    for reg in paid_regs:
-        paid_tournaments_list.append({
-            'registration': reg,
-            'payout': payouts_dict.get(reg.tournament_id)
-        })
-
+    # Lazy: only computed when the cached fragment is missing or out of date
+    from django.utils.functional import SimpleLazyObject
+    data = SimpleLazyObject(lambda: profile_data(player))
     context = {
         'player': player,
-        'stats': {
-            'total_games': total_games,
-            'total_wins': total_wins,
-            'total_points': total_points,
-            'total_winnings': total_winnings,
-            'total_spent': total_spent,
-            'profit_loss': profit_loss,
-            'avg_place': round(avg_place, 1)
-        },
-        'free_tournaments': free_tournaments,
-        'paid_tournaments': paid_tournaments_list
+        'stats': SimpleLazyObject(lambda: data['stats']),
+        'free_tournaments': SimpleLazyObject(lambda: data['free_tournaments']),
+        'paid_tournaments': SimpleLazyObject(lambda: data['paid_tournaments']),
+        **fragment_context('player', player.id),
     }
 
     return render(request, 'core/profile.html', context)
 
+def metrics(request):
+    """Per-view request histograms in Prometheus format, for admins or a scraper with METRICS_TOKEN"""
+    from django.conf import settings
+    from django.http import HttpResponse, HttpResponseForbidden
+    from django.utils.crypto import constant_time_compare
+    from .metrics import registry
+
+    token = settings.METRICS_TOKEN
+    authorized = token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized:
+        player_id = request.session.get('player_id')
+        if not (player_id and Player.objects.filter(id=player_id, is_admin=True).exists()):
+            return HttpResponseForbidden()
+
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def logout_view(request):
     """Logout user by clearing session"""
     if 'player_id' in request.session:
@@ -262,21 +299,23 @@ def tournament_info(request, tournament_id):
         )
     )
 
-    # Get payouts for this tournament
-    payouts = Payout.objects.filter(tournament=tournament).select_related('player')
-    payouts_dict = {p.player_id: p.amount for p in payouts if p.player_id}
+    def players_data():
+        # Get payouts for this tournament
+        payouts = Payout.objects.filter(tournament=tournament).select_related('player')
+        payouts_dict = {p.player_id: p.amount for p in payouts if p.player_id}
 
-    # Combine registrations with payout info
-    players_data = []
-    for reg in registrations:
-        players_data.append({
-            'registration': reg,
-            'payout': payouts_dict.get(reg.player_id)
-        })
+        # Combine registrations with payout info
+        return [
+            {'registration': reg, 'payout': payouts_dict.get(reg.player_id)}
+            for reg in registrations
+        ]
 
+    # Lazy: only computed when the cached fragment is missing or out of date
+    from django.utils.functional import SimpleLazyObject
     context = {
         'tournament': tournament,
-        'players_data': players_data,
+        'players_data': SimpleLazyObject(players_data),
+        **fragment_context('tournament', tournament.id),
     }
 
     return render(request, 'core/tournament_info.html', context)
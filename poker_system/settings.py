@@ -34,8 +34,38 @@ TELEGRAM_BOT_TOKEN = '8361297949:AAHas9IJPgCVtlM4O7WqIF8__CoXutWS_Tw'  # Replace
 # Site URL for bot links (use env var for production)
 SITE_URL = os.environ.get('SITE_URL', 'http://127.0.0.1:8000')
 
+# Login/registration links sent by the bot expire after this many minutes
+BOT_TOKEN_TTL_MINUTES = int(os.environ.get('BOT_TOKEN_TTL_MINUTES', '30'))
+
+# Cache alias for the bot's per-user rate limits; unset keeps them in process memory
+BOT_RATE_LIMIT_CACHE = os.environ.get('BOT_RATE_LIMIT_CACHE') or None
+
+# Updates the bot handles at once (never two from the same user), and the
+# size of its ORM thread pool - keep it within the database's connection limit.
+# 0 sizes the pool for the database: 4 threads on SQLite, which takes one
+# writer at a time anyway, otherwise 4 per CPU up to 32.
+BOT_CONCURRENT_UPDATES = int(os.environ.get('BOT_CONCURRENT_UPDATES', '64'))
+BOT_DB_THREADS = int(os.environ.get('BOT_DB_THREADS', '0'))
+
+# Queue Telegram messages for level-ups, breaks, seating, moves and results
+# (delivered by the runbot process)
+TELEGRAM_NOTIFICATIONS_ENABLED = os.environ.get('TELEGRAM_NOTIFICATIONS_ENABLED', 'True') == 'True'
+
+# Webhook mode (runbot --webhook): Telegram posts updates to /bot/webhook/
+# with this secret in X-Telegram-Bot-Api-Secret-Token. Empty disables the endpoint.
+TELEGRAM_WEBHOOK_SECRET = os.environ.get('TELEGRAM_WEBHOOK_SECRET', '')
+
+# Bot API endpoint, override to point the bot at a local fake (see fake_telegram)
+TELEGRAM_API_BASE_URL = os.environ.get('TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves /static/ before anything else runs (see STORAGES). WhiteNoise made
+    # async-capable: under ASGI every middleware here has to be, or Django
+    # runs the async read views in a thread anyway
+    'core.static.StaticFilesMiddleware',
+    'core.metrics.RequestMetricsMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -46,6 +76,39 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'poker_system.urls'
 
+# Per-view request metrics, served at /metrics/ to admins, or to a
+# Prometheus scraper sending "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Profile this fraction of requests (0 disables) and keep the cProfile dump
+# of those slower than the threshold, for `python -m pstats` or snakeviz
+METRICS_PROFILE_RATE = float(os.environ.get('METRICS_PROFILE_RATE', '0'))
+METRICS_PROFILE_THRESHOLD_MS = int(os.environ.get('METRICS_PROFILE_THRESHOLD_MS', '500'))
+METRICS_PROFILE_DIR = os.environ.get('METRICS_PROFILE_DIR', str(BASE_DIR / 'profiles'))
+
+# Lobby TV page (/tournament/<id>/tv/): screens cache the page this long, and
+# each keeps one event stream open, ended and reopened every DISPLAY_STREAM_SECONDS.
+# That needs ASGI (uvicorn); under WSGI the stream ends after each update and
+# the screens reconnect every few seconds instead of holding a worker.
+# Each web process checks the journal once per DISPLAY_STREAM_POLL_SECONDS per tournament.
+DISPLAY_PAGE_MAX_AGE = int(os.environ.get('DISPLAY_PAGE_MAX_AGE', '86400'))
+DISPLAY_STREAM_SECONDS = int(os.environ.get('DISPLAY_STREAM_SECONDS', '300'))
+DISPLAY_STREAM_POLL_SECONDS = float(os.environ.get('DISPLAY_STREAM_POLL_SECONDS', '1'))
+
+# Cache alias and lifetime for the rendered tournament_info and profile
+# fragments; record_event invalidates them when their tournament or player changes
+FRAGMENT_CACHE = os.environ.get('FRAGMENT_CACHE', 'default')
+FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', '600'))
+
+# Text/JSON responses smaller than this go out uncompressed
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+
+# Cache alias for pre-compressed stats responses; with several web processes
+# use a shared cache (e.g. Redis) so a finished tournament invalidates all of them
+STATS_CACHE = os.environ.get('STATS_CACHE', 'default')
+STATS_CACHE_TTL = int(os.environ.get('STATS_CACHE_TTL', '600'))
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -66,6 +129,9 @@ TEMPLATES = [
 WSGI_APPLICATION = 'poker_system.wsgi.application'
 
 
+# Default field cap for tournaments without max_entries; 0 means unlimited
+TOURNAMENT_MAX_ENTRIES = int(os.environ.get('TOURNAMENT_MAX_ENTRIES', '0'))
+
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
@@ -115,6 +181,16 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+# collectstatic writes content-hashed copies (main.3f2a1c.js) plus gzip and
+# Brotli versions; WhiteNoise serves the hashed names with a one-year
+# immutable Cache-Control, so browsers fetch each asset once per release
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+# Files referenced by their original name (no hash) may change between releases
+WHITENOISE_MAX_AGE = int(os.environ.get('WHITENOISE_MAX_AGE', '3600'))
+
 CSRF_TRUSTED_ORIGINS = [
     'https://srv1198231.hstgr.cloud',
     'http://srv1198231.hstgr.cloud',
@@ -0,0 +1,112 @@
+// Lobby TV clock. All state arrives over one event stream; the clock runs
+// locally from the absolute level deadline, so a dropped connection (or a
+// whole break without Wi-Fi) doesn't stop it. While running it rolls on
+// through the level schedule until the stream is back.
+(function () {
+    const body = document.body;
+    const el = {
+        name: document.getElementById('name'),
+        level: document.getElementById('level'),
+        clock: document.getElementById('clock'),
+        blinds: document.getElementById('blinds'),
+        next: document.getElementById('next'),
+        players: document.getElementById('players'),
+        average: document.getElementById('average'),
+        pool: document.getElementById('pool'),
+    };
+    const sound = new Audio(body.dataset.sound);
+
+    let state = null;
+    let clockOffset = 0; // server clock minus ours, in ms
+    let shownLevel = null;
+
+    function setText(node, text) {
+        // Only touch the DOM when something changed, cheap TV sticks repaint slowly
+        if (node.textContent !== text) node.textContent = text;
+    }
+
+    function formatTime(seconds) {
+        seconds = Math.max(0, Math.floor(seconds));
+        const h = Math.floor(seconds / 3600);
+        const m = Math.floor((seconds % 3600) / 60);
+        const s = String(seconds % 60).padStart(2, '0');
+        return h ? `${h}:${String(m).padStart(2, '0')}:${s}` : `${String(m).padStart(2, '0')}:${s}`;
+    }
+
+    function blinds(level) {
+        // [number, small blind, big blind, ante, minutes, is_break]
+        if (level[5]) return 'Break';
+        const text = `${level[1].toLocaleString()} / ${level[2].toLocaleString()}`;
+        return level[3] ? `${text} (${level[3].toLocaleString()})` : text;
+    }
+
+    function clock() {
+        let index = state.current_level_index;
+        if (!state.deadline) return { index, remaining: state.remaining_seconds };
+
+        const now = (Date.now() + clockOffset) / 1000;
+        let remaining = state.deadline - now;
+        if (state.status === 'RUNNING') {
+            while (remaining < 0 && index < state.levels.length - 1) {
+                index += 1;
+                remaining += state.levels[index][4] * 60;
+            }
+        }
+        return { index, remaining: Math.max(0, remaining) };
+    }
+
+    function render() {
+        if (!state) return;
+        const { index, remaining } = clock();
+        const level = state.levels[index];
+        const next = state.levels[index + 1];
+
+        body.classList.toggle('paused', state.status === 'PAUSED');
+        body.classList.toggle('break', state.status === 'BREAK' || Boolean(level && level[5]));
+
+        setText(el.name, state.name);
+        setText(el.clock, formatTime(remaining));
+        if (state.status === 'BREAK') {
+            setText(el.level, 'Break');
+            setText(el.blinds, level ? `Next: ${blinds(level)}` : '');
+        } else {
+            setText(el.level, level ? (level[5] ? 'Break' : `Level ${level[0]}`) : state.status);
+            setText(el.blinds, level ? blinds(level) : '');
+        }
+        setText(el.next, next ? `Next level: ${blinds(next)}` : '');
+        setText(el.players, String(state.players_remaining));
+        setText(el.average, state.average_stack.toLocaleString());
+        setText(el.pool, state.prize_pool.toLocaleString());
+
+        if (level && shownLevel !== null && level[0] !== shownLevel) {
+            sound.play().catch(() => {});
+        }
+        shownLevel = level ? level[0] : null;
+    }
+
+    function tick() {
+        render();
+        // Wake on the next whole second instead of polling faster
+        setTimeout(tick, 1000 - ((Date.now() + clockOffset) % 1000) + 5);
+    }
+
+    const stream = new EventSource(body.dataset.stream);
+    stream.addEventListener('state', (event) => {
+        state = JSON.parse(event.data);
+        clockOffset = state.server_time * 1000 - Date.now();
+        render();
+    });
+    let lastOpen = Date.now();
+    stream.onopen = () => {
+        lastOpen = Date.now();
+        body.classList.remove('offline');
+    };
+    // EventSource reconnects by itself (the server ends the stream every few
+    // minutes, or after every update under WSGI); only flag the screen if no
+    // connection got through for a while
+    stream.onerror = () => setTimeout(() => {
+        if (stream.readyState !== EventSource.OPEN && Date.now() - lastOpen > 10000) body.classList.add('offline');
+    }, 10000);
+
+    tick();
+})();